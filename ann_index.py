@@ -0,0 +1,357 @@
+"""
+Approximate nearest-neighbour (IVF) index over the precomputed DDC embeddings.
+
+Turns the semantic signal from a reranking-only feature into a candidate
+generator: each source gets its own inverted-file partition (k-means
+centroids + posting lists of rows), so a `sources` filter simply selects
+partitions and no post-filter scan is needed. A query probes the `nprobe`
+closest lists and scores only their rows exactly against the matrix.
+
+Sources smaller than `min_rows_for_ivf` are searched exhaustively (a single
+list), which is exact and already fast.
+
+The saved index records the fingerprint, model and dtype of the embedding
+matrix it was built from and is rejected (rebuilt) when they change.
+`recall_at_k` compares search() with exact scoring of every row.
+
+Usage:
+    python -m detective_systemv3.ann_index build [--model all-MiniLM-L6-v2] [--nprobe 16] [--queries 200]
+"""
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .embeddings import DEFAULT_MODEL, EmbeddingMatrix, SemanticScorer, default_embeddings_dir
+
+
+INDEX_FILENAME = "ivf.npz"
+
+
+def _index_meta(embeddings: EmbeddingMatrix) -> Dict[str, str]:
+    """
+    What a saved index must match: the embedding matrix it was built from.
+    """
+    return {key: str(embeddings.meta.get(key, "")) for key in ("fingerprint", "model", "dtype")}
+
+
+class IVFPartition:
+    """
+    Inverted-file index for one source.
+
+    Attributes:
+        centroids: (nlist, dim) normalized float32 centroids
+        list_offsets: (nlist + 1,) start of each list in list_rows
+        list_rows: document positions (within the source) grouped by list
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_rows: np.ndarray):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> "IVFPartition":
+        """
+        Cluster vectors with spherical k-means and build the posting lists.
+
+        Args:
+            vectors: (n, dim) normalized vectors of one source
+            nlist: number of lists (clamped to n)
+            iterations: k-means iterations
+            seed: RNG seed (builds are deterministic)
+        """
+        n = len(vectors)
+        nlist = max(1, min(nlist, n))
+        data = np.asarray(vectors, dtype=np.float32)
+
+        if nlist == 1:
+            centroids = data.mean(axis=0, keepdims=True) if n else np.zeros((1, data.shape[1]), np.float32)
+            assign = np.zeros(n, dtype=np.int64)
+        else:
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(n, nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assign = np.argmax(data @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = data[assign == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                    else:
+                        # Re-seed empty clusters with a random point
+                        centroids[c] = data[rng.integers(n)]
+                centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+            assign = np.argmax(data @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids.astype(np.float32), list_offsets, order.astype(np.int64))
+
+    def probe(self, query_vec: np.ndarray, nprobe: int) -> np.ndarray:
+        """
+        Document positions in the nprobe lists closest to the query.
+        """
+        nprobe = min(nprobe, self.nlist)
+        if nprobe >= self.nlist:
+            return self.list_rows
+        closest = np.argpartition(-(self.centroids @ query_vec), nprobe - 1)[:nprobe]
+        return np.concatenate([
+            self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in closest
+        ])
+
+
+class SemanticANNIndex:
+    """
+    Per-source IVF partitions over an EmbeddingMatrix.
+    """
+
+    def __init__(self, embeddings: EmbeddingMatrix, partitions: Dict[str, IVFPartition]):
+        self.embeddings = embeddings
+        self.partitions = partitions
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: EmbeddingMatrix,
+        lists_per_sqrt: float = 1.0,
+        min_rows_for_ivf: int = 2048,
+        iterations: int = 10,
+        seed: int = 0
+    ) -> "SemanticANNIndex":
+        """
+        Build one partition per source.
+
+        Args:
+            embeddings: precomputed document embeddings
+            lists_per_sqrt: nlist = lists_per_sqrt * sqrt(rows in source)
+            min_rows_for_ivf: smaller sources use a single exhaustive list
+            iterations: k-means iterations
+            seed: RNG seed
+        """
+        partitions = {}
+        for source, (start, count) in embeddings.rows.items():
+            vectors = np.asarray(embeddings.source_rows(source), dtype=np.float32)
+            if embeddings.scales is not None:
+                vectors = vectors * embeddings.scales[start:start + count, None]
+            nlist = 1 if count < min_rows_for_ivf else int(lists_per_sqrt * np.sqrt(count))
+            partitions[source] = IVFPartition.build(vectors, nlist, iterations, seed)
+        return cls(embeddings, partitions)
+
+    def save(self, path: Path):
+        """
+        Save all partitions into a single .npz file.
+        """
+        arrays = {"__meta__": np.array(json.dumps(_index_meta(self.embeddings)))}
+        for source, part in self.partitions.items():
+            arrays[f"{source}/centroids"] = part.centroids
+            arrays[f"{source}/offsets"] = part.list_offsets
+            arrays[f"{source}/rows"] = part.list_rows
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Path, embeddings: EmbeddingMatrix) -> Optional["SemanticANNIndex"]:
+        """
+        Load partitions saved with save(), or None if missing or built from
+        another embedding matrix (fingerprint, model, dtype or row counts differ).
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            # Each NpzFile member access decompresses again: read every array once
+            if "__meta__" not in data.files or json.loads(str(data["__meta__"])) != _index_meta(embeddings):
+                return None
+            partitions = {}
+            for source, (_, count) in embeddings.rows.items():
+                if f"{source}/rows" not in data.files:
+                    return None
+                rows = data[f"{source}/rows"]
+                if len(rows) != count:
+                    return None
+                partitions[source] = IVFPartition(data[f"{source}/centroids"], data[f"{source}/offsets"], rows)
+        return cls(embeddings, partitions)
+
+    def search(
+        self,
+        query_vec: np.ndarray,
+        sources: Sequence[str],
+        k_per_source: int = 20,
+        nprobe: int = 16
+    ) -> Dict[str, List[Tuple[int, float]]]:
+        """
+        Top-k semantic neighbours in each requested source.
+
+        Args:
+            query_vec: (dim,) normalized query embedding
+            sources: sources to search (others are never touched)
+            k_per_source: neighbours per source
+            nprobe: lists probed per source
+
+        Returns:
+            Source -> [(doc position within source, similarity)], best first
+        """
+        results = {}
+        for source in sources:
+            part = self.partitions.get(source)
+            if part is None:
+                continue
+            rows = part.probe(query_vec, nprobe)
+            if len(rows) == 0:
+                results[source] = []
+                continue
+            sims = self.embeddings.scores(query_vec, source, rows)
+            k = min(k_per_source, len(rows))
+            top = np.argpartition(-sims, k - 1)[:k]
+            top = top[np.argsort(-sims[top], kind="stable")]
+            results[source] = [(int(rows[i]), float(sims[i])) for i in top]
+        return results
+
+
+def recall_at_k(
+    index: SemanticANNIndex,
+    query_vecs: np.ndarray,
+    sources: Optional[Sequence[str]] = None,
+    k: int = 20,
+    nprobe: int = 16
+) -> Dict[str, float]:
+    """
+    Mean recall@k of index.search() against exact scoring of every row.
+
+    Args:
+        index: IVF index to check
+        query_vecs: (n, dim) normalized query embeddings
+        sources: sources to check (default: all)
+        k: neighbours compared per query
+        nprobe: lists probed per source
+
+    Returns:
+        Source -> mean fraction of the exact top-k that search() returned
+    """
+    embeddings = index.embeddings
+    recall = {}
+    for source in (sources if sources is not None else list(embeddings.rows)):
+        count = embeddings.rows[source][1]
+        if count == 0:
+            continue
+        top = min(k, count)
+        found_fraction = []
+        for query_vec in query_vecs:
+            exact = embeddings.scores(query_vec, source)
+            expected = set(np.argpartition(-exact, top - 1)[:top].tolist())
+            found = {pos for pos, _ in index.search(query_vec, [source], k, nprobe).get(source, [])}
+            found_fraction.append(len(expected & found) / top)
+        recall[source] = float(np.mean(found_fraction)) if found_fraction else 1.0
+    return recall
+
+
+class SemanticCandidateGenerator:
+    """
+    Semantic candidate generator, used alongside exact / prefix / range lookups.
+    """
+
+    def __init__(self, scorer: SemanticScorer, index: SemanticANNIndex, nprobe: int = 16):
+        self.scorer = scorer
+        self.index = index
+        self.nprobe = nprobe
+
+    @classmethod
+    def from_scorer(cls, scorer: SemanticScorer, index_path: Optional[Path] = None, nprobe: int = 16) -> "SemanticCandidateGenerator":
+        """
+        Load the IVF index saved next to the embeddings, building (and
+        saving) it if missing or stale.
+
+        Args:
+            scorer: semantic scorer whose embedding matrix is indexed
+            index_path: index file (default: INDEX_FILENAME in the embedding
+                directory, or default_embeddings_dir() of its model)
+            nprobe: lists probed per source
+        """
+        embeddings = scorer.embeddings
+        if index_path is None:
+            directory = embeddings.directory or default_embeddings_dir(embeddings.model_name)
+            index_path = Path(directory) / INDEX_FILENAME
+        index = SemanticANNIndex.load(index_path, embeddings)
+        if index is None:
+            index = SemanticANNIndex.build(embeddings)
+            try:
+                index.save(index_path)
+            except OSError as e:
+                print(f"[WARN] Could not write ANN index {index_path}: {e}")
+        return cls(scorer, index, nprobe)
+
+    def candidates(
+        self,
+        query: str,
+        all_sources: Dict[str, Sequence],
+        sources: Sequence[str],
+        k_per_source: int = 20
+    ) -> Dict[str, List[Tuple[object, float]]]:
+        """
+        Documents semantically closest to the query text.
+
+        Args:
+            query: query text (keywords / facet subject)
+            all_sources: loaded sources, aligned with the embedding rows
+            sources: sources to search
+            k_per_source: candidates per source
+
+        Returns:
+            Source -> [(DDCDoc, similarity)], best first
+        """
+        query_vec = self.scorer.encode_query(query)
+        found = self.index.search(query_vec, sources, k_per_source, self.nprobe)
+        return {
+            source: [(all_sources[source][pos], score) for pos, score in hits]
+            for source, hits in found.items()
+        }
+
+    def recall_at_k(self, queries: Sequence[str], sources: Optional[Sequence[str]] = None, k: int = 20) -> Dict[str, float]:
+        """
+        recall_at_k() for query texts, encoded with the scorer (one batch).
+        """
+        return recall_at_k(self.index, self.scorer.encode_queries(queries), sources, k, self.nprobe)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the IVF index over the DDC embedding matrix and check its recall")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"SentenceTransformer model (default: {DEFAULT_MODEL})")
+    parser.add_argument("--data-dir", type=Path, default=None, help="data_processed directory")
+    parser.add_argument("--nprobe", type=int, default=16, help="Lists probed per source (default: 16)")
+    parser.add_argument("--k", type=int, default=20, help="Neighbours compared for recall@k (default: 20)")
+    parser.add_argument("--queries", type=int, default=200, help="Document rows sampled as recall queries (default: 200)")
+    args = parser.parse_args()
+
+    directory = default_embeddings_dir(args.model, args.data_dir)
+    embeddings = EmbeddingMatrix.load(directory)
+    if embeddings is None:
+        print(f"[ERROR] No embeddings in {directory}; run: python -m detective_systemv3.embeddings build")
+        raise SystemExit(1)
+
+    index = SemanticANNIndex.build(embeddings)
+    index.save(directory / INDEX_FILENAME)
+    print(f"[+] Wrote {directory / INDEX_FILENAME}")
+
+    # Document vectors stand in for queries: no model needed to check recall
+    rng = np.random.default_rng(0)
+    n_rows = len(embeddings.matrix)
+    sample = rng.choice(n_rows, min(args.queries, n_rows), replace=False) if n_rows else []
+    query_vecs = np.asarray(embeddings.matrix[np.sort(sample)], dtype=np.float32)
+    if embeddings.scales is not None:
+        query_vecs = query_vecs * embeddings.scales[np.sort(sample), None]
+    query_vecs /= np.maximum(np.linalg.norm(query_vecs, axis=1, keepdims=True), 1e-12)
+
+    for source, value in recall_at_k(index, query_vecs, k=args.k, nprobe=args.nprobe).items():
+        status = "[+]" if value >= 0.9 else "[WARN]"
+        print(f"{status} {source:15s} recall@{args.k} {value:.3f} (nlist {index.partitions[source].nlist})")
+
+
+if __name__ == "__main__":
+    main()
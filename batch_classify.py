@@ -0,0 +1,409 @@
+"""
+Batch DDC classification over a catalogue dump.
+Usage: python batch_classify.py subjects.jsonl -o results.jsonl [--concurrency 4] [--max-rounds 5]
+
+Input records (JSONL or CSV):
+  - JSONL: {"id": "rec-1", "subject": "constitutional law", "annif_top2": ["342", "340"]}
+  - CSV:   id,subject,annif1,annif2   (annif columns optional)
+
+One warm Querier and one LLM client are shared by every classification.
+Results are streamed to the JSONL sink as they finish; re-running with the
+same output file skips records that already have a result (resume).
+"""
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Any, Optional, Iterator, Callable, Set
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from detective_systemv3.orchestrator import classify_subject
+from detective_systemv3.agents.querier import Querier
+from detective_systemv3.query_cache import CachingQuerier
+from detective_systemv3.source_index import use_compiled_index
+from detective_systemv3.fast_path import FastPathConfig, TieredClassifier
+from detective_systemv3.suggestions import SuggestionBackend, DockerOmikujiBackend, get_backend, top2_notations
+
+
+def read_subjects(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read subject records from a JSONL or CSV file.
+
+    Args:
+        path: input file (.jsonl/.json or .csv)
+
+    Yields:
+        Dicts with "id", "subject" and "annif_top2" (None when not given)
+    """
+    input_path = Path(path)
+
+    if input_path.suffix.lower() == ".csv":
+        with open(input_path, "r", encoding="utf-8", newline="") as f:
+            for line_no, row in enumerate(csv.DictReader(f), 1):
+                annif = [row.get("annif1"), row.get("annif2")]
+                annif = [a.strip() for a in annif if a and a.strip()]
+                try:
+                    yield _make_record(row, line_no, annif or None)
+                except ValueError as e:
+                    yield _invalid_record(row, line_no, e)
+    else:
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                row = None
+                try:
+                    row = json.loads(line)
+                    yield _make_record(row, line_no, row.get("annif_top2"))
+                except (ValueError, AttributeError) as e:
+                    yield _invalid_record(row, line_no, e)
+
+
+def _make_record(row: Dict[str, Any], line_no: int, annif_top2: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    Normalize an input row into a batch record.
+    """
+    subject = row.get("subject") or row.get("subject_text")
+    if not subject:
+        raise ValueError(f"Record on line {line_no} has no 'subject'")
+
+    if annif_top2 is not None:
+        if not isinstance(annif_top2, (list, tuple)) or not annif_top2:
+            raise ValueError(f"Record on line {line_no}: 'annif_top2' must be a list of 1-2 notations, got {annif_top2!r}")
+        annif_top2 = [str(n) for n in annif_top2][:2]
+        if len(annif_top2) == 1:
+            annif_top2.append("000")
+
+    return {
+        "id": str(row.get("id") or line_no),
+        "subject": subject,
+        "annif_top2": annif_top2
+    }
+
+
+def _invalid_record(row: Optional[Any], line_no: int, error: Exception) -> Dict[str, Any]:
+    """
+    Placeholder for an input line that could not be read; run() writes it as an error row.
+    """
+    row = row if isinstance(row, dict) else {}
+    return {
+        "id": str(row.get("id") or line_no),
+        "subject": row.get("subject") or row.get("subject_text"),
+        "annif_top2": None,
+        "error": f"{type(error).__name__}: line {line_no}: {error}"
+    }
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """
+    Collect ids that already have a successful result in the JSONL sink.
+
+    A truncated last line (crash mid-write) is ignored, so that record is
+    classified again.
+    """
+    done = set()
+    path = Path(output_path)
+    if not path.exists():
+        return done
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "final_ddc" in row and "error" not in row:
+                done.add(str(row["id"]))
+    return done
+
+
+def fetch_annif_top2(subject_text: str) -> List[str]:
+    """
+    Fetch Annif top-2 for a subject via the Docker-backed omikuji helper.
+    """
+    return top2_notations(DockerOmikujiBackend().suggest(subject_text, limit=2))
+
+
+def with_annif(
+    records: Iterator[Dict[str, Any]],
+    backend: SuggestionBackend,
+    batch_size: int = 32,
+    skip_ids: Set[str] = frozenset()
+) -> Iterator[Dict[str, Any]]:
+    """
+    Fill missing annif_top2 in batches, one backend call per batch_size records.
+
+    Only backends that batch natively (override suggest_batch) are used here;
+    for the others records pass through unchanged, so each worker's annif_fn
+    looks them up concurrently instead of one after another in this reader.
+    Records the backend has no suggestions for, or whose batch failed, keep
+    annif_top2=None and fall back to the worker's annif_fn; records in
+    skip_ids (already classified) are passed through without a lookup.
+    """
+    if not backend.batches_natively:
+        yield from records
+        return
+
+    buffer: List[Dict[str, Any]] = []
+
+    def flush():
+        missing = [r for r in buffer if not r["annif_top2"] and r["id"] not in skip_ids and "error" not in r]
+        if missing:
+            try:
+                batches = backend.suggest_batch([r["subject"] for r in missing], limit=2)
+            except Exception as e:
+                print(f"[WARN] Annif batch failed ({e}); falling back to per-record lookups")
+                batches = [[] for _ in missing]
+            for record, suggestions in zip(missing, batches):
+                if suggestions:
+                    record["annif_top2"] = top2_notations(suggestions)
+        yield from buffer
+        buffer.clear()
+
+    for record in records:
+        buffer.append(record)
+        if len(buffer) >= batch_size:
+            yield from flush()
+    yield from flush()
+
+
+class BatchClassifier:
+    """
+    Runs many two-agent classifications concurrently with bounded parallelism.
+
+    The Querier (all loaded sources) and the LLM manager are created once and
+    shared; each subject still gets its own Analyzer state.
+    """
+
+    def __init__(
+        self,
+        llm_manager,
+        max_rounds: int = 5,
+        concurrency: int = 4,
+        querier: Optional[Querier] = None,
+        annif_fn: Optional[Callable[[str], List[str]]] = None,
+        verbose: bool = True,
+        cache_size: int = 4096,
+        fast_path: Optional[FastPathConfig] = None
+    ):
+        """
+        Initialize batch classifier.
+
+        Args:
+            llm_manager: LLM manager shared by all Analyzers (must be thread-safe)
+            max_rounds: maximum rounds per subject
+            concurrency: max classifications in flight
+            querier: warm Querier to share (loaded once when omitted)
+            annif_fn: subject -> Annif top-2, used for records without annif_top2
+            verbose: print one progress line per finished record
+            cache_size: Querier result cache shared by all subjects (0 = off)
+            fast_path: accept confident retrieval-only results without LLM calls
+                (None = always run the two-agent loop)
+        """
+        self.llm_manager = llm_manager
+        self.max_rounds = max_rounds
+        self.concurrency = max(1, concurrency)
+        self.querier = querier if querier is not None else Querier()
+        if cache_size > 0 and not isinstance(self.querier, CachingQuerier):
+            self.querier = CachingQuerier(self.querier, max_entries=cache_size)
+        self.annif_fn = annif_fn or fetch_annif_top2
+        self.verbose = verbose
+        self.tiered = None
+        if fast_path is not None:
+            self.tiered = TieredClassifier(
+                llm_manager, querier=self.querier, config=fast_path, max_rounds=max_rounds, cache_size=0
+            )
+
+        self._write_lock = threading.Lock()
+
+    def classify_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Classify one record, returning the JSON-ready output row.
+        """
+        start = time.time()
+        try:
+            annif_top2 = record["annif_top2"] or self.annif_fn(record["subject"])
+            if self.tiered is not None:
+                result = self.tiered.classify(record["subject"], annif_top2)
+            else:
+                result = classify_subject(
+                    subject_text=record["subject"],
+                    annif_top2=annif_top2,
+                    llm_manager=self.llm_manager,
+                    max_rounds=self.max_rounds,
+                    verbose=False,
+                    querier=self.querier
+                )
+            row = {"id": record["id"], "subject": record["subject"], "annif_top2": annif_top2}
+            row.update(result)
+            return row
+        except Exception as e:
+            return {
+                "id": record["id"],
+                "subject": record["subject"],
+                "error": f"{type(e).__name__}: {e}",
+                "elapsed_seconds": round(time.time() - start, 2)
+            }
+
+    def run(self, records: Iterator[Dict[str, Any]], output_path: str, resume: bool = True) -> Dict[str, Any]:
+        """
+        Classify records, streaming each result to output_path as it finishes.
+
+        Args:
+            records: iterable of records from read_subjects()
+            output_path: JSONL sink (appended to)
+            resume: skip records that already have a result in output_path
+
+        Returns:
+            Summary dict (submitted, succeeded, failed, skipped, elapsed_seconds)
+        """
+        done = completed_ids(output_path) if resume else set()
+        summary = {"submitted": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+        start = time.time()
+
+        with open(output_path, "a", encoding="utf-8") as sink, \
+                ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+            in_flight = set()
+
+            try:
+                for record in records:
+                    if record["id"] in done:
+                        summary["skipped"] += 1
+                        continue
+
+                    # Unreadable input lines are recorded like failed classifications
+                    if "error" in record:
+                        summary["submitted"] += 1
+                        self._write(sink, record, summary)
+                        continue
+
+                    # Bounded parallelism: never hold more than `concurrency` pending records
+                    if len(in_flight) >= self.concurrency:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            self._write(sink, future.result(), summary)
+
+                    in_flight.add(executor.submit(self.classify_record, record))
+                    summary["submitted"] += 1
+            finally:
+                # Results already computed reach the sink even if reading the input fails
+                for future in in_flight:
+                    self._write(sink, future.result(), summary)
+
+        summary["elapsed_seconds"] = round(time.time() - start, 2)
+        if self.tiered is not None:
+            summary["fast_path"] = self.tiered.get_stats()
+        return summary
+
+    def _write(self, sink, row: Dict[str, Any], summary: Dict[str, Any]):
+        """
+        Append one result row to the sink and flush it to disk.
+        """
+        with self._write_lock:
+            sink.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            sink.flush()
+
+            if "error" in row:
+                summary["failed"] += 1
+            else:
+                summary["succeeded"] += 1
+
+        if self.verbose:
+            if "error" in row:
+                print(f"[ERROR] {row['id']}: {row['error']}")
+            else:
+                print(f"[+] {row['id']}: {row['final_ddc']} "
+                      f"(conf {row['confidence']:.2f}, {row['metadata']['elapsed_seconds']}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Classify a file of subjects with the two-agent system",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python batch_classify.py subjects.jsonl -o results.jsonl
+  python batch_classify.py dump.csv -o results.jsonl --concurrency 8 --max-rounds 3
+  python batch_classify.py subjects.jsonl -o results.jsonl --no-resume
+  python batch_classify.py subjects.jsonl -o results.jsonl --fast-path
+  python batch_classify.py subjects.jsonl -o results.jsonl --annif-backend http://localhost:5000/v1/projects/omikuji-ddc
+        """
+    )
+
+    parser.add_argument("input", help="Subjects file (.jsonl or .csv)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results sink (appended, used for resume)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Classifications in flight (default: 4)")
+    parser.add_argument("--max-rounds", type=int, default=5, help="Maximum rounds per subject (default: 5)")
+    parser.add_argument("--no-resume", action="store_true", help="Re-classify records already in the output")
+    parser.add_argument("--annif-backend", type=str, default=None,
+                        help="Suggestion backend: docker, an Annif project URL or static:<file> "
+                             "(default: $ANNIF_BACKEND or docker)")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="Accept confident retrieval-only results without LLM calls; escalate the rest")
+    parser.add_argument(
+        "-m", "--model",
+        type=str,
+        default="x-ai/grok-2-1212",
+        help="OpenRouter model to use (default: x-ai/grok-2-1212)"
+    )
+    parser.add_argument("--llm-cache", type=str, default=None, help="SQLite file caching LLM responses by prompt")
+    parser.add_argument("--replay", action="store_true", help="Serve LLM responses only from --llm-cache (no network calls)")
+
+    args = parser.parse_args()
+
+    from detective_systemv3.llm_cache import CachedLLM
+    if args.replay:
+        cache_path = args.llm_cache or "llm_cache.sqlite"
+        llm_manager = CachedLLM(None, cache_path, mode="replay", model=args.model)
+        print(f"[*] Replaying cached {args.model} responses from {cache_path}")
+    else:
+        from detective_systemv3.llm_openrouter import OpenRouterLLM
+        try:
+            llm_manager = OpenRouterLLM(model=args.model)
+            print(f"[*] Using OpenRouter model: {args.model}")
+        except Exception as e:
+            from detective_systemv3.run_classification import MockLLMManager
+            print(f"[WARN] OpenRouter unavailable ({e}). Falling back to MockLLMManager.")
+            llm_manager = MockLLMManager()
+
+        if args.llm_cache:
+            llm_manager = CachedLLM(llm_manager, args.llm_cache)
+
+    print("[*] Loading DDC sources...")
+    use_compiled_index()
+    querier = Querier()
+    print(f"[+] Loaded {len(querier.all_sources)} source types\n")
+
+    backend = get_backend(args.annif_backend)
+    batch = BatchClassifier(
+        llm_manager,
+        max_rounds=args.max_rounds,
+        concurrency=args.concurrency,
+        querier=querier,
+        annif_fn=lambda subject: top2_notations(backend.suggest(subject, limit=2)),
+        fast_path=FastPathConfig() if args.fast_path else None
+    )
+    skip_ids = completed_ids(args.output) if not args.no_resume else set()
+    records = with_annif(read_subjects(args.input), backend, skip_ids=skip_ids)
+    try:
+        summary = batch.run(records, args.output, resume=not args.no_resume)
+    finally:
+        backend.close()
+
+    print("\n" + "=" * 70)
+    print("  BATCH SUMMARY")
+    print("=" * 70)
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
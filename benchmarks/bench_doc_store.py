@@ -0,0 +1,83 @@
+"""
+Benchmark: DDCDoc object lists vs. the columnar DocStore.
+Usage: python benchmarks/bench_doc_store.py [--sizes 10000 50000 200000]
+
+Uses the synthetic corpus of bench_token_index.py. Reports traced memory of
+the documents (list of DDCDoc vs. DocStore buffers), the cost of scanning
+every heading (attribute access vs. SourceSlice.texts), and exact / prefix number lookups (linear scan over
+objects vs. the store's sorted integer keys).
+"""
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_token_index import make_corpus
+from detective_systemv3.doc_store import DocStore
+
+
+def traced(build):
+    """
+    (result, bytes still allocated) of build().
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def timed(fn, repeat: int = 3) -> float:
+    """
+    Best wall time of fn() in milliseconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(size: int):
+    docs, objects_bytes = traced(lambda: make_corpus(size))
+    store, store_bytes = traced(lambda: DocStore.from_sources({"Sch2": docs}))
+    view = store.source("Sch2")
+
+    probe = docs[size // 2].ddc_number
+    prefix = probe.split(".")[0]
+    return {
+        "size": size,
+        "objects_mb": objects_bytes / 1e6,
+        "store_mb": store_bytes / 1e6,
+        "scan_objects_ms": timed(lambda: sum(len(d.heading) for d in docs)),
+        "scan_store_ms": timed(lambda: sum(len(h) for h in view.texts("heading"))),
+        "lookup_objects_ms": timed(lambda: [d for d in docs if d.ddc_number == probe]),
+        "lookup_store_ms": timed(lambda: store.lookup(probe)),
+        "prefix_objects_ms": timed(lambda: [d for d in docs if d.ddc_number.startswith(prefix)]),
+        "prefix_store_ms": timed(lambda: store.with_prefix(prefix)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DDCDoc lists vs. columnar DocStore")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    args = parser.parse_args()
+
+    print(f"{'docs':>8} {'objects MB':>11} {'store MB':>9} {'ratio':>6} "
+          f"{'scan obj/store ms':>18} {'lookup obj/store ms':>20} {'prefix obj/store ms':>20}")
+    for size in args.sizes:
+        r = run(size)
+        print(f"{r['size']:8d} {r['objects_mb']:11.1f} {r['store_mb']:9.1f} {r['objects_mb'] / r['store_mb']:5.1f}x "
+              f"{r['scan_objects_ms']:8.1f} / {r['scan_store_ms']:7.1f} "
+              f"{r['lookup_objects_ms']:9.2f} / {r['lookup_store_ms']:8.3f} "
+              f"{r['prefix_objects_ms']:9.2f} / {r['prefix_store_ms']:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
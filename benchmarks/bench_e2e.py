@@ -0,0 +1,318 @@
+"""
+End-to-end benchmark harness with a deterministic scripted LLM.
+Usage: python benchmarks/bench_e2e.py [--suites load querier e2e] [--save baseline.json] [--compare baseline.json]
+
+Suites:
+  load     Querier() construction (source loading)
+  querier  single requests over benchmarks/corpus.jsonl, by source mix, semantic off/on
+  e2e      classify_subject() over the corpus with ScriptedLLM (no network)
+
+Each case reports p50/p95/p99/mean latency and throughput; peak RSS is
+recorded after each suite. --save writes the results as a JSON baseline;
+--compare diffs a run against one and exits 1 when any latency, throughput
+or RSS figure regresses by more than --threshold.
+"""
+import re
+import ast
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import dataclasses
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from detective_systemv3.agents.querier import Querier
+from detective_systemv3.orchestrator import classify_subject
+from detective_systemv3.fast_path import probe_request
+
+
+CORPUS_PATH = Path(__file__).parent / "corpus.jsonl"
+
+SOURCE_MIXES = {
+    "schedules": ["Sch2", "Sch3", "Sch2_ranges", "Sch3_ranges"],
+    "manuals": ["ManSc", "ManSc_flow", "ManTB", "ManTB_flow"],
+    "tables": ["T1", "T2", "T3A", "T3B", "T3C"],
+    "all": ["Sch2", "Sch3", "Sch2_ranges", "Sch3_ranges", "ManSc", "ManSc_flow",
+            "ManTB", "ManTB_flow", "T1", "T2", "T3A", "T3B", "T3C"],
+}
+
+
+class ScriptedLLM:
+    """
+    Deterministic Analyzer stand-in (an extension of MockLLMManager).
+
+    Initial call: probe Annif top-1 and its parent. Round 1: check standard
+    subdivisions of top-1. Round 2: stop. Final: Annif top-1. Optional
+    simulated latency (first chunk after `ttft`, full response after `latency`).
+    """
+
+    def __init__(self, latency: float = 0.0, ttft: float = 0.0):
+        self.model = "scripted"
+        self.latency = latency
+        self.ttft = min(ttft, latency)
+        self.annif_top2 = ["000", "000"]
+        self.calls = 0
+
+    def generate(self, messages, temperature=0.2, max_tokens=1200, response_format=None,
+                 stream=False, stream_callback=None):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+
+        match = re.search(r"\*\*Annif top-2 notations\*\*:\s*(.+)", prompt)
+        if match:
+            try:
+                self.annif_top2 = [str(n) for n in ast.literal_eval(match.group(1).strip())]
+            except (ValueError, SyntaxError):
+                self.annif_top2 = re.findall(r"[\d.]+", match.group(1))[:2] or self.annif_top2
+
+        text = json.dumps(self._response(prompt))
+
+        if self.ttft:
+            time.sleep(self.ttft)
+        if stream and stream_callback:
+            for i in range(0, len(text), 64):
+                stream_callback(text[i:i + 64])
+        if self.latency > self.ttft:
+            time.sleep(self.latency - self.ttft)
+        return text
+
+    def _response(self, prompt: str) -> Dict[str, Any]:
+        top1 = self.annif_top2[0]
+        base = top1.split(".")[0]
+        facets = {"subject": None, "discipline": None, "geo": None, "time": None, "form": None, "audience": None}
+        synthesis = {"ddc_number": top1, "components": {"base": base}, "justification": "scripted"}
+
+        def request(numbers, sources, std_subdivisions=False):
+            return {
+                "numbers": numbers,
+                "keywords": [],
+                "facets": {},
+                "sources": sources,
+                "limits": {"k_per_source": 20, "max_docs": 100},
+                "options": {"expand_synonyms": True, "include_std_subdivisions": std_subdivisions},
+            }
+
+        if "Initial Analysis" in prompt:
+            return {
+                "facets": facets,
+                "next_requests": [request([top1, base], ["Sch2", "Sch3", "Sch2_ranges", "ManSc"])],
+                "round_relevance": 0.7, "stop_decision": False, "confidence": 0.6,
+                "reasoning": "scripted initial round", "synthesis": synthesis,
+            }
+        if "Final Synthesis" in prompt:
+            return {
+                "final_ddc": top1, "confidence": 0.8, "justification": "scripted final synthesis",
+                "components": {"base": base, "standard_subdivisions": [], "tables": []},
+                "alternatives": [{"ddc": self.annif_top2[1], "reason_rejected": "scripted"}],
+                "cited_evidence": [{"ddc_number": top1, "source": "Sch2", "score": 0.8, "role": "base"}],
+            }
+        round_match = re.search(r"# Round (\d+)", prompt)
+        if round_match and int(round_match.group(1)) <= 1:
+            return {
+                "facets": facets,
+                "next_requests": [request([top1], ["Sch2", "Sch2_ranges", "T1"], std_subdivisions=True)],
+                "round_relevance": 0.6, "stop_decision": False, "confidence": 0.7,
+                "reasoning": "scripted round", "synthesis": synthesis,
+            }
+        return {
+            "facets": facets, "next_requests": [], "round_relevance": 0.5, "stop_decision": True,
+            "confidence": 0.8, "reasoning": "scripted stop", "synthesis": synthesis,
+        }
+
+
+def read_corpus(path: Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile: the smallest value with at least pct% of values
+    at or below it.
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies_ms: List[float], wall_seconds: float) -> Dict[str, float]:
+    return {
+        "n": len(latencies_ms),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3),
+        "throughput_per_s": round(len(latencies_ms) / wall_seconds, 3) if wall_seconds else 0.0,
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process (None where unavailable).
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def timed(fn, items, repeat: int = 1) -> Dict[str, float]:
+    latencies = []
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies, time.perf_counter() - wall_start)
+
+
+def bench_load(repeat: int) -> Dict[str, Any]:
+    return {"querier_init": timed(lambda _: Querier(), range(repeat))}
+
+
+def bench_querier(querier, corpus: List[Dict[str, Any]], repeat: int, semantic: List[bool]) -> Dict[str, Any]:
+    results = {}
+    for use_semantic in semantic:
+        for mix, sources in SOURCE_MIXES.items():
+            requests = [
+                dataclasses.replace(probe_request(r["subject"], r["annif_top2"], use_semantic), sources=sources)
+                for r in corpus
+            ]
+            name = f"{mix}/{'semantic' if use_semantic else 'lexical'}"
+            try:
+                results[name] = timed(querier.execute, requests, repeat)
+            except Exception as e:
+                print(f"[WARN] {name} skipped: {type(e).__name__}: {e}")
+    return results
+
+
+def bench_e2e(querier, corpus: List[Dict[str, Any]], repeat: int, llm_latency: float, llm_ttft: float) -> Dict[str, Any]:
+    llm = ScriptedLLM(latency=llm_latency, ttft=llm_ttft)
+
+    def run(record):
+        classify_subject(record["subject"], record["annif_top2"], llm, verbose=False, querier=querier)
+
+    result = {"classify_subject": timed(run, corpus, repeat)}
+    result["classify_subject"]["llm_calls"] = llm.calls
+    return result
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Print a metric-by-metric diff; return the regressed metric names.
+    """
+    regressions = []
+    print(f"\n{'metric':55s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    print("-" * 86)
+    for suite, cases in current["results"].items():
+        for case, metrics in cases.items():
+            old_metrics = baseline.get("results", {}).get(suite, {}).get(case)
+            if not old_metrics:
+                continue
+            for metric, value in metrics.items():
+                old = old_metrics.get(metric)
+                if not old or metric in ("n", "llm_calls"):
+                    continue
+                change = (value - old) / old
+                worse = change < -threshold if metric.startswith("throughput") else change > threshold
+                name = f"{suite}.{case}.{metric}"
+                print(f"{name:55s} {old:10.2f} {value:10.2f} {change:+7.1%}{'  REGRESSION' if worse else ''}")
+                if worse:
+                    regressions.append(name)
+
+    old_rss, new_rss = baseline.get("peak_rss_mb"), current.get("peak_rss_mb")
+    if old_rss and new_rss:
+        change = (new_rss - old_rss) / old_rss
+        print(f"{'peak_rss_mb':55s} {old_rss:10.1f} {new_rss:10.1f} {change:+7.1%}")
+        if change > threshold:
+            regressions.append("peak_rss_mb")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end DDC classification benchmarks")
+    parser.add_argument("--suites", nargs="+", choices=["load", "querier", "e2e"], default=["load", "querier", "e2e"])
+    parser.add_argument("--corpus", type=str, default=str(CORPUS_PATH), help="Subjects JSONL with annif_top2")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus per case (default: 3)")
+    parser.add_argument("--semantic", choices=["off", "on", "both"], default="both")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call (default: 0)")
+    parser.add_argument("--llm-ttft", type=float, default=0.0, help="Simulated time to first chunk (default: 0)")
+    parser.add_argument("--save", type=str, default=None, help="Write results as a JSON baseline")
+    parser.add_argument("--compare", type=str, default=None, help="Diff against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regression threshold (default: 0.10)")
+    args = parser.parse_args()
+
+    corpus = read_corpus(Path(args.corpus))
+    semantic = {"off": [False], "on": [True], "both": [False, True]}[args.semantic]
+    report: Dict[str, Any] = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {"path": args.corpus, "subjects": len(corpus)},
+        "repeat": args.repeat,
+        "results": {},
+        "peak_rss_mb_by_suite": {},
+    }
+
+    if "load" in args.suites:
+        print("[*] Benchmarking source loading...")
+        report["results"]["load"] = bench_load(args.repeat)
+        report["peak_rss_mb_by_suite"]["load"] = peak_rss_mb()
+
+    querier = None
+    if "querier" in args.suites or "e2e" in args.suites:
+        querier = Querier()
+
+    if "querier" in args.suites:
+        print("[*] Benchmarking single Querier requests...")
+        report["results"]["querier"] = bench_querier(querier, corpus, args.repeat, semantic)
+        report["peak_rss_mb_by_suite"]["querier"] = peak_rss_mb()
+
+    if "e2e" in args.suites:
+        print("[*] Benchmarking classify_subject with the scripted LLM...")
+        report["results"]["e2e"] = bench_e2e(querier, corpus, args.repeat, args.llm_latency, args.llm_ttft)
+        report["peak_rss_mb_by_suite"]["e2e"] = peak_rss_mb()
+
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    print(f"\n{'case':40s} {'n':>5s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'per s':>8s}")
+    print("-" * 84)
+    for suite, cases in report["results"].items():
+        for case, m in cases.items():
+            print(f"{suite + '.' + case:40s} {m['n']:5d} {m['p50_ms']:9.2f} {m['p95_ms']:9.2f} "
+                  f"{m['p99_ms']:9.2f} {m['throughput_per_s']:8.2f}")
+    print(f"\n[+] Peak RSS: {report['peak_rss_mb']} MB")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n[ERROR] {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"\n[+] No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: one-at-a-time vs. micro-batched SBERT query encoding.
+Usage: python benchmarks/bench_query_encoder.py [--threads 1 4 16] [--queries 512] [--model all-MiniLM-L6-v2]
+
+Encodes the subjects of benchmarks/corpus.jsonl (plus their keywords) from
+N concurrent threads, first with a direct model.encode([text]) per query,
+then through a QueryEncoder (LRU disabled, so every text is encoded).
+Reports queries/s and the mean batch size the encoder reached.
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from detective_systemv3.embeddings import get_sentence_model
+from detective_systemv3.query_encoder import DEFAULT_MODEL, QueryEncoder
+
+
+def load_queries(count: int):
+    """
+    Subjects and their longer words from the benchmark corpus, repeated up to count (all distinct).
+    """
+    texts = []
+    with open(Path(__file__).parent / "corpus.jsonl", "r", encoding="utf-8") as f:
+        for line in f:
+            subject = json.loads(line)["subject"]
+            texts.append(subject)
+            texts.extend(word.lower() for word in subject.split() if len(word) > 3)
+    texts = list(dict.fromkeys(texts))
+    return [f"{texts[i % len(texts)]} {i // len(texts)}" if i >= len(texts) else texts[i] for i in range(count)]
+
+
+def throughput(encode, queries, threads: int) -> float:
+    """
+    Queries per second encoding every query from `threads` concurrent callers.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(encode, queries))
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query encoder batching benchmark")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16], help="Concurrent callers")
+    parser.add_argument("--queries", type=int, default=512, help="Queries per run")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"SentenceTransformer model (default: {DEFAULT_MODEL})")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Encoder batching window")
+    args = parser.parse_args()
+
+    model = get_sentence_model(args.model)
+    queries = load_queries(args.queries)
+    model.encode(queries[:8], convert_to_numpy=True)  # warm-up
+
+    def direct(text):
+        return model.encode([text], convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)[0]
+
+    print(f"[*] {len(queries)} queries, model {args.model}")
+    for threads in args.threads:
+        encoder = QueryEncoder(args.model, max_wait_ms=args.max_wait_ms, cache_size=0, model=model)
+        single = throughput(direct, queries, threads)
+        batched = throughput(encoder.encode, queries, threads)
+        stats = encoder.get_stats()
+        encoder.close()
+        print(f"[+] threads={threads:3d}  direct {single:8.1f} q/s   batched {batched:8.1f} q/s   "
+              f"x{batched / single:4.1f}   mean batch {stats['mean_batch']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: CLI startup and import time.
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--top 10] [--budget 1.0]
+
+Runs each entry point in a fresh interpreter with `-X importtime` and reports
+the best wall time, the total import time and the slowest imports
+(cumulative). Heavy optional dependencies (torch, sentence_transformers,
+requests, rapidfuzz, numpy) are flagged when they load; none of them should
+appear for --help or a non-semantic retrieval-only start.
+
+Exit code 1 when any entry point's best wall time exceeds --budget seconds.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+PACKAGE_DIR = Path(__file__).absolute().parent.parent
+PACKAGE = PACKAGE_DIR.name
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "requests", "rapidfuzz", "numpy")
+
+ENTRY_POINTS = [
+    ("run_classification.py --help", [str(PACKAGE_DIR / "run_classification.py"), "--help"]),
+    ("test_querier.py --help", [str(PACKAGE_DIR / "test_querier.py"), "--help"]),
+    ("quick_classify.py (usage)", [str(PACKAGE_DIR / "quick_classify.py")]),
+    ("batch_classify.py --help", [str(PACKAGE_DIR / "batch_classify.py"), "--help"]),
+    ("serve.py --help", [str(PACKAGE_DIR / "serve.py"), "--help"]),
+    ("import suggestions", ["-c", f"import {PACKAGE}.suggestions"]),
+    ("import llm_openrouter", ["-c", f"import {PACKAGE}.llm_openrouter"]),
+    ("import orchestrator", ["-c", f"import {PACKAGE}.orchestrator"]),
+]
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    (module, self_us, cumulative_us, depth) for each `-X importtime` line (depth 0 = top level).
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            entries.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip(" ")) - 1) // 2))
+        except ValueError:
+            continue
+    return entries
+
+
+def run_entry(argv: List[str], repeat: int) -> Dict[str, Any]:
+    """
+    Best wall time over `repeat` runs, plus the import profile of the last run.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PACKAGE_DIR.parent), os.environ.get("PYTHONPATH")])))
+    best = float("inf")
+    proc = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *argv], capture_output=True, text=True, env=env)
+        best = min(best, time.perf_counter() - start)
+
+    entries = parse_importtime(proc.stderr)
+    errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+    return {
+        "wall_seconds": best,
+        "import_seconds": sum(cumulative for _, _, cumulative, depth in entries if depth == 0) / 1e6,
+        "entries": entries,
+        "heavy": sorted({name.split(".")[0] for name, _, _, _ in entries if name.split(".")[0] in HEAVY_MODULES}),
+        # argparse --help and the usage message exit 0/1; tracebacks mean the entry point is broken
+        "error": errors[-1] if any("Traceback" in line for line in errors) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup / import-time benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per entry point (best wall time is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports listed per entry point")
+    parser.add_argument("--budget", type=float, default=1.0, help="Wall-time budget per entry point in seconds")
+    args = parser.parse_args()
+
+    over_budget = []
+    for label, argv in ENTRY_POINTS:
+        result = run_entry(argv, args.repeat)
+        if result["error"]:
+            print(f"[ERROR] {label}: {result['error']}")
+            continue
+
+        status = "[+]" if result["wall_seconds"] <= args.budget else "[WARN]"
+        if result["wall_seconds"] > args.budget:
+            over_budget.append(label)
+        heavy = f"  heavy: {', '.join(result['heavy'])}" if result["heavy"] else ""
+        print(f"{status} {label:32s} wall {result['wall_seconds'] * 1000:7.1f} ms   "
+              f"imports {result['import_seconds'] * 1000:7.1f} ms{heavy}")
+
+        slowest = sorted(result["entries"], key=lambda e: e[2], reverse=True)[:args.top]
+        for name, _, cumulative, _ in slowest:
+            print(f"      {cumulative / 1000:8.1f} ms  {name}")
+
+    if over_budget:
+        print(f"\n[WARN] Over the {args.budget:.1f}s budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark: full-scan RapidFuzz vs. inverted-index candidate narrowing.
+Usage: python benchmarks/bench_token_index.py [--sizes 1000 5000 20000 50000] [--queries 50]
+       python benchmarks/bench_token_index.py --source Sch2 [--data-dir DIR]
+
+By default uses a synthetic corpus (DDC-like headings/descriptions built
+from a fixed vocabulary, seeded) so numbers are comparable across machines
+and runs; queries include inflections and truncated words that share no
+token with the corpus. With --source the loaded DDC source is used instead,
+queried with the keywords of the benchmarks/corpus.jsonl subjects.
+Reports per-request latency of both paths, how often the index fell back
+to a full scan, and top-10 recall (how many candidates reach the full-scan
+10th-best score, so ties do not count as misses).
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from rapidfuzz import fuzz
+
+from detective_systemv3.retrieval.schemas import DDCDoc
+from detective_systemv3.token_index import TokenIndex
+
+
+WORDS = (
+    "library science information management collections catalogs dictionaries encyclopedias "
+    "software engineering programming computer systems data standards law constitutional "
+    "administrative history ancient medieval modern europe asia africa americas literature "
+    "fiction poetry drama essays philosophy ethics logic religion christianity islam buddhism "
+    "physics chemistry biology botany zoology medicine health agriculture engineering civil "
+    "mechanical electrical music painting sculpture architecture languages grammar linguistics "
+    "economics finance banking labor education teaching schools universities geography travel"
+).split()
+
+
+def make_corpus(size: int, seed: int = 0):
+    """
+    Deterministic synthetic corpus of `size` documents.
+    """
+    rng = random.Random(seed)
+    docs = []
+    for i in range(size):
+        heading = " ".join(rng.sample(WORDS, rng.randint(2, 5)))
+        description = " ".join(rng.sample(WORDS, rng.randint(5, 15)))
+        docs.append(DDCDoc(ddc_number=f"{i % 1000:03d}.{i}", heading=heading, description=description, source="Sch2"))
+    return docs
+
+
+def make_queries(count: int, seed: int = 1):
+    """
+    Keyword lists, some with typos/inflections.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        keywords = rng.sample(WORDS, rng.randint(1, 3))
+        roll = rng.random()
+        if roll < 0.3:
+            keywords[0] = keywords[0][:-1] + "s"
+        elif roll < 0.45:
+            # Truncated word: a substring match for fuzzy scoring, no shared token
+            keywords[0] = keywords[0][:max(4, len(keywords[0]) - 5)]
+        queries.append(keywords)
+    return queries
+
+
+def subject_queries():
+    """
+    Keywords of the benchmark subjects, split as quick_classify.py does.
+    """
+    queries = []
+    with open(Path(__file__).parent / "corpus.jsonl", "r", encoding="utf-8") as f:
+        for line in f:
+            subject = json.loads(line)["subject"]
+            queries.append([word.strip().lower() for word in subject.split() if len(word) > 3])
+    return queries
+
+
+def fuzzy_scores(docs, keywords):
+    """
+    Per-doc max partial_ratio over keywords (heading + description), as in the Querier.
+    """
+    scores = []
+    for doc in docs:
+        best = 0.0
+        for kw in keywords:
+            best = max(best, fuzz.partial_ratio(kw, (doc.heading or "").lower()),
+                       0.5 * fuzz.partial_ratio(kw, (doc.description or "").lower()))
+        scores.append(best)
+    return scores
+
+
+def run(docs, queries, limit: int):
+    """
+    Time both paths over all queries for one corpus.
+    """
+    size = len(docs)
+    start = time.perf_counter()
+    index = TokenIndex.build(docs)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    full_ms, indexed_ms, recalls, fallbacks = [], [], [], 0
+    for keywords in queries:
+        start = time.perf_counter()
+        full = fuzzy_scores(docs, keywords)
+        full_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        positions = index.candidates(keywords, limit=limit)
+        fuzzy_scores([docs[i] for i in positions], keywords)
+        indexed_ms.append((time.perf_counter() - start) * 1000)
+        fallbacks += len(positions) == size and size > limit
+
+        # Tie-aware recall: candidates scoring at least the full-scan 10th best
+        tenth = sorted(full, reverse=True)[min(9, size - 1)]
+        found = sum(1 for i in positions if full[i] >= tenth)
+        recalls.append(min(found, 10) / 10)
+
+    return {
+        "size": size,
+        "build_ms": build_ms,
+        "full_ms": sum(full_ms) / len(full_ms),
+        "indexed_ms": sum(indexed_ms) / len(indexed_ms),
+        "recall_at_10": sum(recalls) / len(recalls),
+        "fallback_rate": fallbacks / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inverted token index vs full-scan fuzzy matching")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=300, help="Candidate limit (default: 300)")
+    parser.add_argument("--source", type=str, default=None, help="Benchmark on this loaded DDC source instead")
+    parser.add_argument("--data-dir", type=Path, default=None, help="data_processed directory (with --source)")
+    args = parser.parse_args()
+
+    if args.source:
+        from detective_systemv3.source_index import load_sources
+        corpora = [load_sources(args.data_dir)[args.source]]
+        queries = subject_queries()
+    else:
+        corpora = [make_corpus(size) for size in args.sizes]
+        queries = make_queries(args.queries)
+
+    print(f"{'docs':>8s} {'build ms':>10s} {'full-scan ms':>13s} {'indexed ms':>11s} {'speedup':>8s} "
+          f"{'fallback':>9s} {'recall@10':>10s}")
+    print("-" * 76)
+    for docs in corpora:
+        r = run(docs, queries, args.limit)
+        print(f"{r['size']:8d} {r['build_ms']:10.1f} {r['full_ms']:13.2f} {r['indexed_ms']:11.2f} "
+              f"{r['full_ms'] / r['indexed_ms']:7.1f}x {r['fallback_rate']:8.0%} {r['recall_at_10']:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
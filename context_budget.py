@@ -0,0 +1,365 @@
+"""
+Token-budgeted evidence packing for Analyzer prompts.
+
+A single Querier request returns 80-90 hits and memory holds up to 500
+artifacts; prompt size is what sets LLM latency. build_budgeted_context()
+packs memory artifacts into the {context} slot of
+ANALYZER_ROUND_PROMPT_TEMPLATE / ANALYZER_FINAL_SYNTHESIS_PROMPT_TEMPLATE
+within a target token count:
+
+1. Near-duplicates collapse: the same DDC number from Sch2 / Sch2_ranges /
+   ManSc becomes one row listing all its sources (best score kept).
+2. Pinned numbers (Annif top-2, current synthesis, cited evidence) always
+   make it in; they count against the budget, but are kept even when they
+   alone exceed it.
+3. Remaining rows are chosen by maximal marginal relevance (score vs.
+   hierarchical / heading overlap with rows already chosen) until the
+   budget is spent.
+4. Rows are rendered as a compact table with abbreviated signal names.
+
+Artifacts may be dicts or objects exposing ddc_number, source, score and
+optionally heading, snippet, signals.
+
+The Analyzer (agents/) renders its own memory into those prompts.
+BudgetedContextLLM wraps its LLM manager and swaps that {context} block for
+a budgeted table of the evidence the caller fed in (TwoAgentOrchestrator
+with context_budget=N).
+"""
+import re
+from typing import Dict, List, Any, Callable, Optional, Sequence, Tuple
+
+from .prompts import ANALYZER_ROUND_PROMPT_TEMPLATE, ANALYZER_FINAL_SYNTHESIS_PROMPT_TEMPLATE
+from .range_tree import notation_key
+
+
+SIGNAL_ABBREVIATIONS = {
+    "exact_number": "ex",
+    "prefix_number": "pf",
+    "range_cover": "rc",
+    "heading_fuzzy": "hf",
+    "desc_fuzzy": "df",
+    "keyword_proximity": "kp",
+    "std_subdiv_flag": "sd",
+    "table_alignment": "ta",
+    "semantic_similarity": "sem",
+}
+
+EVIDENCE_TABLE_LEGEND = (
+    "Evidence table: ddc | sources | score | signals | heading. "
+    "Signals: " + ", ".join(f"{abbr}={name}" for name, abbr in SIGNAL_ABBREVIATIONS.items()) + "."
+)
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~4 characters per token for English/JSON).
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _field(artifact: Any, name: str, default: Any = None) -> Any:
+    if isinstance(artifact, dict):
+        return artifact.get(name, default)
+    return getattr(artifact, name, default)
+
+
+def _dedupe_key(ddc_number: str) -> str:
+    key = notation_key(ddc_number or "")
+    if key is None:
+        return (ddc_number or "").strip().lower()
+    return f"{key[0]}:{key[1]}"
+
+
+def dedupe_artifacts(artifacts: Sequence[Any]) -> List[Dict[str, Any]]:
+    """
+    Collapse artifacts with the same normalized DDC number into one row.
+
+    Returns:
+        Rows (best score first) with ddc_number, sources, score, heading and
+        the per-signal maximum across the group
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for artifact in artifacts:
+        ddc_number = str(_field(artifact, "ddc_number", "") or "")
+        score = float(_field(artifact, "score", 0.0) or 0.0)
+        source = _field(artifact, "source", "?")
+        heading = _field(artifact, "heading") or _field(artifact, "snippet") or ""
+        signals = _field(artifact, "signals") or {}
+
+        key = _dedupe_key(ddc_number)
+        row = groups.get(key)
+        if row is None:
+            row = groups[key] = {
+                "key": key,
+                "ddc_number": ddc_number,
+                "sources": [],
+                "score": score,
+                "heading": heading,
+                "signals": {},
+            }
+        elif score > row["score"]:
+            row.update(ddc_number=ddc_number, score=score, heading=heading or row["heading"])
+
+        if source not in row["sources"]:
+            row["sources"].append(source)
+        for name, value in signals.items():
+            if value > row["signals"].get(name, 0.0):
+                row["signals"][name] = value
+
+    return sorted(groups.values(), key=lambda r: r["score"], reverse=True)
+
+
+def _similarity(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """
+    Redundancy between two rows: shared DDC prefix and heading-word overlap.
+    """
+    ka, kb = a["key"], b["key"]
+    common = 0
+    for ca, cb in zip(ka, kb):
+        if ca != cb:
+            break
+        common += 1
+    prefix = common / max(len(ka), len(kb), 1)
+
+    wa = set(a["heading"].lower().split())
+    wb = set(b["heading"].lower().split())
+    words = len(wa & wb) / len(wa | wb) if wa and wb else 0.0
+    return max(prefix, words)
+
+
+def format_row(row: Dict[str, Any], max_heading_chars: int = 80, min_signal: float = 0.1) -> str:
+    """
+    One compact table line for a deduplicated row.
+    """
+    signals = ",".join(
+        f"{SIGNAL_ABBREVIATIONS.get(name, name)}{value:.2f}".replace("0.", ".")
+        for name, value in sorted(row["signals"].items(), key=lambda x: x[1], reverse=True)
+        if value >= min_signal
+    )
+    heading = " ".join(row["heading"].split())[:max_heading_chars]
+    return f"{row['ddc_number']} | {'/'.join(row['sources'])} | {row['score']:.2f} | {signals} | {heading}"
+
+
+def select_rows(
+    rows: List[Dict[str, Any]],
+    budget_tokens: int,
+    pinned_numbers: Sequence[str] = (),
+    mmr_lambda: float = 0.7
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Pick rows within budget: pinned first, then by maximal marginal relevance.
+
+    Pinned rows are always selected and their cost is counted first, so they
+    crowd out other rows; when they alone exceed the budget, tokens used is
+    over budget_tokens and no other row is added.
+
+    Returns:
+        (selected rows in display order, tokens used)
+    """
+    pinned_keys = {_dedupe_key(n) for n in pinned_numbers}
+    selected: List[Dict[str, Any]] = []
+    used = 0
+
+    remaining = []
+    for row in rows:
+        if row["key"] in pinned_keys:
+            cost = estimate_tokens(format_row(row)) + 1
+            selected.append(row)
+            used += cost
+        else:
+            remaining.append(row)
+
+    # Max similarity to any selected row, updated incrementally as rows are added
+    redundancy = [max((_similarity(row, chosen) for chosen in selected), default=0.0) for row in remaining]
+    while remaining:
+        best_index = max(
+            range(len(remaining)),
+            key=lambda i: mmr_lambda * remaining[i]["score"] - (1.0 - mmr_lambda) * redundancy[i]
+        )
+        row = remaining.pop(best_index)
+        redundancy.pop(best_index)
+
+        cost = estimate_tokens(format_row(row)) + 1
+        if used + cost > budget_tokens:
+            continue
+        selected.append(row)
+        used += cost
+        redundancy = [max(r, _similarity(other, row)) for r, other in zip(redundancy, remaining)]
+
+    selected.sort(key=lambda r: r["score"], reverse=True)
+    return selected, used
+
+
+def build_budgeted_context(
+    artifacts: Sequence[Any],
+    budget_tokens: int = 1500,
+    pinned_numbers: Sequence[str] = (),
+    sections: Optional[Dict[str, str]] = None,
+    mmr_lambda: float = 0.7
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the Analyzer {context} text within a token budget.
+
+    Args:
+        artifacts: memory artifacts (any order)
+        budget_tokens: target size of the returned context
+        pinned_numbers: DDC numbers that must be included when present
+            (Annif top-2, current synthesis, cited evidence)
+        sections: extra "## Title" -> text sections placed before the table
+            (facets, relevance trend); they count against the budget
+        mmr_lambda: relevance vs. diversity trade-off (1.0 = score only)
+
+    Returns:
+        (context text, stats dict with artifact/row counts and token estimate;
+        estimated_tokens may exceed budget_tokens only through pinned rows)
+    """
+    rows = dedupe_artifacts(artifacts)
+    context, selected = _pack(rows, budget_tokens, pinned_numbers, sections, mmr_lambda)
+    pinned_keys = {_dedupe_key(n) for n in pinned_numbers}
+    stats = {
+        "artifacts_in": len(artifacts),
+        "rows_after_dedupe": len(rows),
+        "rows_selected": len(selected),
+        "rows_pinned": sum(1 for row in selected if row["key"] in pinned_keys),
+        "estimated_tokens": estimate_tokens(context),
+        "budget_tokens": budget_tokens,
+    }
+    return context, stats
+
+
+def _pack(
+    rows: List[Dict[str, Any]],
+    budget_tokens: int,
+    pinned_numbers: Sequence[str],
+    sections: Optional[Dict[str, str]],
+    mmr_lambda: float
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Render sections + legend + selected rows; returns (context, selected rows).
+    """
+    parts = [f"## {title}\n{text.strip()}\n" for title, text in (sections or {}).items()]
+    header = "\n".join(parts) + f"## Evidence\n{EVIDENCE_TABLE_LEGEND}\n"
+
+    selected, _ = select_rows(rows, max(0, budget_tokens - estimate_tokens(header)), pinned_numbers, mmr_lambda)
+    return header + ("\n".join(format_row(row) for row in selected) or "(none)"), selected
+
+
+def artifacts_from_response(response: Any) -> List[Dict[str, Any]]:
+    """
+    Artifact dicts (ddc_number, source, score, heading, signals) for a QuerierResponse's hits.
+    """
+    return [
+        {
+            "ddc_number": hit.doc.ddc_number,
+            "source": hit.doc.source,
+            "score": hit.score,
+            "heading": getattr(hit.doc, "heading", "") or "",
+            "signals": dict(hit.signals or {}),
+        }
+        for hit in response.hits
+    ]
+
+
+def _context_pattern(template: str) -> "re.Pattern":
+    """
+    Regex capturing the {context} block of a rendered prompt template.
+    """
+    before, after = template.split("{context}", 1)
+    head = re.escape(before).replace(re.escape("{round_number}"), r"\d+")
+    tail = after[:after.index("\n", 2) + 1]  # "\n\n## Task\n"
+    return re.compile(f"{head}(?P<context>.*?){re.escape(tail)}", re.DOTALL)
+
+
+CONTEXT_PATTERNS = (
+    _context_pattern(ANALYZER_ROUND_PROMPT_TEMPLATE),
+    _context_pattern(ANALYZER_FINAL_SYNTHESIS_PROMPT_TEMPLATE),
+)
+
+
+class BudgetedContextLLM:
+    """
+    LLM manager wrapper that re-renders the Analyzer's evidence context within a budget.
+
+    User messages rendered from ANALYZER_ROUND_PROMPT_TEMPLATE or
+    ANALYZER_FINAL_SYNTHESIS_PROMPT_TEMPLATE get their {context} block
+    replaced by build_budgeted_context() over every artifact passed to
+    add_response() since the last reset(); all other messages pass through.
+    """
+
+    def __init__(
+        self,
+        llm_manager,
+        budget_tokens: int = 1500,
+        mmr_lambda: float = 0.7,
+        sections: Optional[Callable[[], Dict[str, str]]] = None
+    ):
+        """
+        Args:
+            llm_manager: wrapped manager
+            budget_tokens: target size of each rewritten context
+            mmr_lambda: relevance vs. diversity trade-off
+            sections: returns the extra "## Title" -> text sections (facets,
+                relevance trend) at the time of each call
+        """
+        self.llm_manager = llm_manager
+        self.model = getattr(llm_manager, "model", type(llm_manager).__name__)
+        self.budget_tokens = budget_tokens
+        self.mmr_lambda = mmr_lambda
+        self.sections = sections
+
+        self.artifacts: List[Dict[str, Any]] = []
+        self.pinned_numbers: List[str] = []
+        self.calls: List[Dict[str, Any]] = []
+
+    def __getattr__(self, name):
+        if name == "llm_manager":
+            raise AttributeError(name)
+        return getattr(self.llm_manager, name)
+
+    def reset(self, pinned_numbers: Sequence[str] = ()):
+        """
+        Start a new subject: forget the evidence and pin these numbers (e.g. Annif top-2).
+        """
+        self.artifacts = []
+        self.pinned_numbers = list(pinned_numbers)
+        self.calls = []
+
+    def add_response(self, response: Any):
+        """
+        Add a QuerierResponse's hits to the evidence.
+        """
+        self.artifacts.extend(artifacts_from_response(response))
+
+    def rewrite(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Messages with every Analyzer round/final {context} block budgeted.
+        """
+        rewritten = []
+        for message in messages:
+            content = message.get("content")
+            match = None
+            if message.get("role") == "user" and isinstance(content, str):
+                match = next((m for m in (p.match(content) for p in CONTEXT_PATTERNS) if m), None)
+            if match is None:
+                rewritten.append(message)
+                continue
+            context, stats = build_budgeted_context(
+                self.artifacts,
+                budget_tokens=self.budget_tokens,
+                pinned_numbers=self.pinned_numbers,
+                sections=self.sections() if self.sections else None,
+                mmr_lambda=self.mmr_lambda
+            )
+            stats["original_tokens"] = estimate_tokens(match.group("context"))
+            self.calls.append(stats)
+            start, end = match.span("context")
+            rewritten.append({**message, "content": content[:start] + context + content[end:]})
+        return rewritten
+
+    def generate(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        return self.llm_manager.generate(self.rewrite(messages), **kwargs)
+
+    async def agenerate(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        return await self.llm_manager.agenerate(self.rewrite(messages), **kwargs)
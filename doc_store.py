@@ -0,0 +1,459 @@
+"""
+Columnar, array-backed store for DDC documents.
+
+load_all_sources() returns one DDCDoc object per record (plus a str per
+field), and every SearchHit carries a signals dict. With the full schedules,
+manuals and tables loaded that object graph dominates each Querier's RSS.
+A DocStore keeps the same data in a handful of flat buffers:
+
+    text fields     one UTF-8 arena per field + u64 end offsets; fields that
+                    are None for some documents add a u8 null marker column
+    source          interned: u8 code per document + a names table
+    ddc_number      normalized int64 key per document (see encode_key) and a
+                    key-sorted permutation for exact / prefix lookups
+    other fields    one compact JSON arena (values in field order)
+
+Documents are grouped by source, so all_sources[name] becomes a SourceSlice:
+a Sequence of DocView objects (two __slots__, decoded on attribute access)
+that reads like a DDCDoc. Hits use CompactHit (__slots__) with a
+SignalVector, a fixed-order float32 array in SIGNAL_NAMES order that still
+behaves like the old signals dict.
+
+    store = DocStore.from_sources(load_all_sources())
+    all_sources = store.as_sources()          # drop-in for the dict of lists
+    store.lookup("331.381"), store.with_prefix("T2--44")
+
+Buffers are plain bytes/memoryviews (to_buffers / from_buffers), so the
+store can be backed by an mmapped file or shared memory.
+"""
+import json
+import bisect
+import dataclasses
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .range_tree import notation_key, key_successor
+from .retrieval.schemas import DDCDoc
+from .signal_profile import SIGNAL_WEIGHTS
+
+
+# Fixed signal order of SignalVector
+SIGNAL_NAMES: Tuple[str, ...] = tuple(SIGNAL_WEIGHTS)
+_SIGNAL_INDEX = {name: i for i, name in enumerate(SIGNAL_NAMES)}
+
+SOURCE_FIELD = "source"
+
+# Number keys: table code, 15 zero-padded digits, digit count (ordering = lexicographic)
+MAX_KEY_DIGITS = 15
+_KEY_TABLES = ("", "T1", "T2", "T3A", "T3B", "T3C", "T4", "T5", "T6")
+_KEY_TABLE_CODE = {table: code for code, table in enumerate(_KEY_TABLES)}
+_DIGIT_SPAN = 10 ** MAX_KEY_DIGITS
+NO_KEY = -1
+
+
+def encode_key(table: str, digits: str) -> int:
+    """
+    Integer form of a normalized notation key.
+
+    Integer order matches (table, digits) string order, so every key
+    starting with `digits` lies in [encode_key(t, d), encode_key(t, succ(d))).
+
+    Returns:
+        NO_KEY for unknown tables or more than MAX_KEY_DIGITS digits
+    """
+    code = _KEY_TABLE_CODE.get(table)
+    if code is None or len(digits) > MAX_KEY_DIGITS:
+        return NO_KEY
+    padded = int(digits.ljust(MAX_KEY_DIGITS, "0")) if digits else 0
+    return ((code * _DIGIT_SPAN + padded) << 5) | len(digits)
+
+
+def number_key(notation: str) -> int:
+    """
+    Integer key of a DDC notation ("331.381", "T2--44"), or NO_KEY.
+    """
+    key = notation_key(notation)
+    return encode_key(*key) if key else NO_KEY
+
+
+def _prefix_bounds(notation: str) -> Optional[Tuple[int, int]]:
+    """
+    Half-open integer key range of all notations under `notation`.
+    """
+    key = notation_key(notation)
+    if key is None:
+        return None
+    table, digits = key
+    lo = encode_key(table, digits)
+    if lo == NO_KEY:
+        return None
+    successor = key_successor(digits)
+    if successor.isdigit():
+        hi = encode_key(table, successor)
+    else:
+        hi = encode_key(table, "") + (_DIGIT_SPAN << 5)
+    return lo, hi
+
+
+class SignalVector(Mapping):
+    """
+    Signal values as a float32 array in SIGNAL_NAMES order.
+
+    Reads like the signals dict it replaces (items(), get(), [name]); only
+    signals that were set are reported. Names outside SIGNAL_NAMES go to a
+    small overflow dict.
+    """
+
+    __slots__ = ("_values", "_present", "_extra")
+
+    def __init__(self, values: Optional[Mapping[str, float]] = None):
+        self._values = array("f", bytes(4 * len(SIGNAL_NAMES)))
+        self._present = 0
+        self._extra: Optional[Dict[str, float]] = None
+        for name, value in (values or {}).items():
+            self[name] = value
+
+    def __setitem__(self, name: str, value: float):
+        index = _SIGNAL_INDEX.get(name)
+        if index is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[name] = value
+            return
+        self._values[index] = value
+        self._present |= 1 << index
+
+    def __getitem__(self, name: str) -> float:
+        index = _SIGNAL_INDEX.get(name)
+        if index is None:
+            if self._extra is None:
+                raise KeyError(name)
+            return self._extra[name]
+        if not self._present & (1 << index):
+            raise KeyError(name)
+        return self._values[index]
+
+    def __iter__(self) -> Iterator[str]:
+        for i, name in enumerate(SIGNAL_NAMES):
+            if self._present & (1 << i):
+                yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return bin(self._present).count("1") + len(self._extra or ())
+
+    def __repr__(self) -> str:
+        return f"SignalVector({dict(self.items())})"
+
+    @property
+    def values(self) -> array:
+        """
+        The raw array (unset signals are 0.0).
+        """
+        return self._values
+
+
+class CompactHit:
+    """
+    SearchHit counterpart with __slots__ and a SignalVector.
+    """
+
+    __slots__ = ("doc", "score", "signals")
+
+    def __init__(self, doc: Any, score: float, signals: Optional[Mapping[str, float]] = None):
+        self.doc = doc
+        self.score = score
+        self.signals = signals if isinstance(signals, SignalVector) else SignalVector(signals)
+
+    @classmethod
+    def from_hit(cls, hit: Any) -> "CompactHit":
+        return cls(hit.doc, hit.score, hit.signals)
+
+    def __repr__(self) -> str:
+        return f"CompactHit({self.doc.ddc_number!r}, {self.score:.4f})"
+
+
+class DocView:
+    """
+    Read-only DDCDoc-like view of one document in a DocStore.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: "DocStore", index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def ddc_number(self) -> str:
+        return self._store.field("ddc_number", self._index)
+
+    @property
+    def heading(self) -> str:
+        return self._store.field("heading", self._index)
+
+    @property
+    def description(self) -> Optional[str]:
+        return self._store.field("description", self._index)
+
+    @property
+    def source(self) -> str:
+        return self._store.source_of(self._index)
+
+    @property
+    def position(self) -> int:
+        return self._index
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._store.field(name, self._index)
+
+    def to_doc(self) -> DDCDoc:
+        """
+        Materialize a regular DDCDoc.
+        """
+        return DDCDoc(**{name: self._store.field(name, self._index) for name in self._store.fields})
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DocView):
+            return self._store is other._store and self._index == other._index
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self._index))
+
+    def __repr__(self) -> str:
+        return f"DocView({self.ddc_number!r}, {self.source!r})"
+
+
+class SourceSlice(Sequence):
+    """
+    The documents of one source, as a Sequence of DocView.
+    """
+
+    def __init__(self, store: "DocStore", start: int, stop: int):
+        self._store = store
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return DocView(self._store, self._start + index)
+
+    def __iter__(self) -> Iterator[DocView]:
+        return (DocView(self._store, i) for i in range(self._start, self._stop))
+
+    def texts(self, name: str) -> List[Optional[str]]:
+        """
+        Decoded values of a text field for every document of the source
+        (None where the document has no value).
+        """
+        return self._store.texts(name, self._start, self._stop)
+
+
+class DocStore:
+    """
+    Columnar document store (see module docstring for the layout).
+    """
+
+    def __init__(self, header: Dict[str, Any], buffers: Mapping[str, Any]):
+        """
+        Args:
+            header: fields, text_fields, nullable_fields, sources ([name, start,
+                stop] in storage order), count
+            buffers: column name -> bytes-like (see to_buffers)
+        """
+        self.header = header
+        self.fields: List[str] = header["fields"]
+        self.count: int = header["count"]
+        self.source_names: List[str] = [name for name, _, _ in header["sources"]]
+        self._source_ranges = {name: (start, stop) for name, start, stop in header["sources"]}
+        self._extra_fields = [f for f in self.fields if f not in header["text_fields"] and f != SOURCE_FIELD]
+
+        self._buffers = dict(buffers)
+        self._arenas: Dict[str, memoryview] = {}
+        self._offsets: Dict[str, memoryview] = {}
+        for name in list(header["text_fields"]) + (["extras"] if self._extra_fields else []):
+            self._arenas[name] = memoryview(buffers[f"{name}.arena"])
+            self._offsets[name] = memoryview(buffers[f"{name}.offsets"]).cast("B").cast("Q")
+        self._nulls: Dict[str, memoryview] = {
+            name: memoryview(buffers[f"{name}.nulls"]).cast("B") for name in header.get("nullable_fields", ())
+        }
+        self._source_codes = memoryview(buffers["source.codes"]).cast("B")
+        self._keys = memoryview(buffers["number.keys"]).cast("B").cast("q")
+        self._sorted_keys = memoryview(buffers["number.sorted_keys"]).cast("B").cast("q")
+        self._by_key = memoryview(buffers["number.order"]).cast("B").cast("I")
+
+    @classmethod
+    def from_sources(cls, sources: Mapping[str, Sequence[Any]]) -> "DocStore":
+        """
+        Build a store from source name -> documents (DDCDoc or any object
+        with the DDCDoc fields, e.g. CompiledSource entries).
+        """
+        if len(sources) > 255:
+            raise ValueError(f"DocStore supports at most 255 sources, got {len(sources)}")
+        fields = [f.name for f in dataclasses.fields(DDCDoc)]
+        docs = [(code, doc) for code, docs in enumerate(sources.values()) for doc in docs]
+
+        # Optional strings (None for some documents) stay text columns with a null marker
+        text_fields = [
+            name for name in fields
+            if name != SOURCE_FIELD and all(isinstance(getattr(doc, name, None), (str, type(None))) for _, doc in docs)
+        ]
+        nullable_fields = [name for name in text_fields if any(getattr(doc, name, None) is None for _, doc in docs)]
+        extra_fields = [name for name in fields if name not in text_fields and name != SOURCE_FIELD]
+
+        buffers: Dict[str, Any] = {}
+        for name in nullable_fields:
+            buffers[f"{name}.nulls"] = bytes(getattr(doc, name, None) is None for _, doc in docs)
+        columns = [(name, lambda doc, name=name: (getattr(doc, name, None) or "").encode("utf-8")) for name in text_fields]
+        if extra_fields:
+            columns.append(("extras", lambda doc: json.dumps(
+                [getattr(doc, name, None) for name in extra_fields],
+                ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")))
+        for name, encode in columns:
+            arena = bytearray()
+            offsets = array("Q", [0])
+            for _, doc in docs:
+                arena += encode(doc)
+                offsets.append(len(arena))
+            buffers[f"{name}.arena"] = bytes(arena)
+            buffers[f"{name}.offsets"] = offsets.tobytes()
+
+        buffers["source.codes"] = array("B", (code for code, _ in docs)).tobytes()
+        keys = array("q", (number_key(getattr(doc, "ddc_number", "") or "") for _, doc in docs))
+        order = sorted((i for i in range(len(keys)) if keys[i] != NO_KEY), key=keys.__getitem__)
+        buffers["number.keys"] = keys.tobytes()
+        buffers["number.sorted_keys"] = array("q", (keys[i] for i in order)).tobytes()
+        buffers["number.order"] = array("I", order).tobytes()
+
+        source_rows, start = [], 0
+        for name, source_docs in sources.items():
+            source_rows.append([name, start, start + len(source_docs)])
+            start += len(source_docs)
+
+        header = {
+            "fields": fields,
+            "text_fields": text_fields,
+            "nullable_fields": nullable_fields,
+            "extra_fields": extra_fields,
+            "sources": source_rows,
+            "count": len(docs),
+        }
+        return cls(header, buffers)
+
+    @classmethod
+    def from_buffers(cls, header: Dict[str, Any], buffers: Mapping[str, Any]) -> "DocStore":
+        """
+        Attach to buffers produced by to_buffers() (bytes, mmap slices, shared memory).
+        """
+        return cls(header, buffers)
+
+    def to_buffers(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        (header, column name -> bytes-like) for persisting or sharing the store.
+        """
+        return dict(self.header), dict(self._buffers)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Total size of the column buffers.
+        """
+        return sum(memoryview(b).nbytes for b in self._buffers.values())
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> DocView:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return DocView(self, index)
+
+    def text(self, name: str, index: int) -> Optional[str]:
+        nulls = self._nulls.get(name)
+        if nulls is not None and nulls[index]:
+            return None
+        offsets = self._offsets[name]
+        return str(self._arenas[name][offsets[index]:offsets[index + 1]], "utf-8")
+
+    def texts(self, name: str, start: int = 0, stop: Optional[int] = None) -> List[Optional[str]]:
+        """
+        Decoded values of a text field for documents [start, stop), for
+        full scans (fuzzy matching) without a DocView per document; None
+        where a document has no value.
+        """
+        offsets, arena = self._offsets[name], self._arenas[name]
+        stop = self.count if stop is None else stop
+        values = [str(arena[offsets[i]:offsets[i + 1]], "utf-8") for i in range(start, stop)]
+        nulls = self._nulls.get(name)
+        if nulls is not None:
+            values = [None if nulls[i] else value for i, value in zip(range(start, stop), values)]
+        return values
+
+    def source_of(self, index: int) -> str:
+        return self.source_names[self._source_codes[index]]
+
+    def field(self, name: str, index: int) -> Any:
+        """
+        Value of any DDCDoc field of document `index`.
+        """
+        if name in self._offsets and name != "extras":
+            return self.text(name, index)
+        if name == SOURCE_FIELD:
+            return self.source_of(index)
+        if name in self._extra_fields:
+            return json.loads(self.text("extras", index))[self._extra_fields.index(name)]
+        raise AttributeError(name)
+
+    def number_key(self, index: int) -> int:
+        return self._keys[index]
+
+    def source(self, name: str) -> SourceSlice:
+        start, stop = self._source_ranges[name]
+        return SourceSlice(self, start, stop)
+
+    def as_sources(self) -> Dict[str, SourceSlice]:
+        """
+        Source name -> SourceSlice, shaped like load_all_sources() output.
+        """
+        return {name: self.source(name) for name in self.source_names}
+
+    def _key_range(self, lo: int, hi: int, sources: Optional[Iterable[str]]) -> List[DocView]:
+        start = bisect.bisect_left(self._sorted_keys, lo)
+        stop = bisect.bisect_left(self._sorted_keys, hi, start)
+        codes = None
+        if sources is not None:
+            codes = {self.source_names.index(name) for name in sources if name in self._source_ranges}
+        return [
+            DocView(self, self._by_key[i]) for i in range(start, stop)
+            if codes is None or self._source_codes[self._by_key[i]] in codes
+        ]
+
+    def lookup(self, notation: str, sources: Optional[Iterable[str]] = None) -> List[DocView]:
+        """
+        Documents whose ddc_number normalizes to `notation`.
+        """
+        key = number_key(notation)
+        if key == NO_KEY:
+            return []
+        return self._key_range(key, key + 1, sources)
+
+    def with_prefix(self, notation: str, sources: Optional[Iterable[str]] = None) -> List[DocView]:
+        """
+        Documents at or under `notation` ("331" -> 331, 331.1, 331.381, ...).
+        """
+        bounds = _prefix_bounds(notation)
+        if bounds is None:
+            return []
+        return self._key_range(bounds[0], bounds[1], sources)
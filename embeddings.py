@@ -0,0 +1,301 @@
+"""
+Precomputed SBERT embedding matrix for semantic scoring.
+
+Every DDCDoc (heading + description) is encoded once, offline, and stored as
+a row-normalized matrix on disk (float32, or float16 / int8-quantized to cut
+size). At startup the matrix is memory-mapped, so semantic scoring for a
+request is one query encoding plus one matrix-vector product per source
+instead of encoding each document.
+
+Layout of an embedding directory:
+    embeddings.npy        (n_docs, dim) matrix, rows grouped by source
+    scales.npy            per-row float32 scale (int8 only)
+    meta.json             model, dtype, dim, source fingerprint, row ranges per source
+
+Usage:
+    python -m detective_systemv3.embeddings build [--model all-MiniLM-L6-v2] [--dtype float16]
+"""
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .retrieval.loaders import find_data_processed_dir
+from .retrieval.schemas import DDCDoc
+from .source_index import load_sources, source_fingerprint
+from .query_encoder import DEFAULT_MODEL, QueryEncoder, get_query_encoder
+
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+_MODELS: Dict[str, Any] = {}
+
+
+def get_sentence_model(model_name: str = DEFAULT_MODEL):
+    """
+    Load (once per process) and return a SentenceTransformer model.
+    """
+    if model_name not in _MODELS:
+        from sentence_transformers import SentenceTransformer
+        _MODELS[model_name] = SentenceTransformer(model_name)
+    return _MODELS[model_name]
+
+
+def doc_text(doc: DDCDoc) -> str:
+    """
+    Text embedded for a document: heading followed by description.
+    """
+    if doc.description:
+        return f"{doc.heading}. {doc.description}"
+    return doc.heading or doc.ddc_number
+
+
+def default_embeddings_dir(model_name: str = DEFAULT_MODEL, data_dir: Optional[Path] = None) -> Path:
+    """
+    Default embedding directory: data_processed/embeddings/<model>
+    (in source_index.DERIVED_DIRS, so it does not change the source fingerprint).
+    """
+    data_dir = Path(data_dir) if data_dir else find_data_processed_dir()
+    return data_dir / "embeddings" / model_name.replace("/", "__")
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convert a float32 matrix to the storage dtype.
+
+    Returns:
+        (stored matrix, per-row scales or None). int8 uses symmetric per-row
+        scaling: row ≈ stored_row * scale.
+    """
+    if dtype == "float32":
+        return matrix.astype(np.float32), None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        stored = np.round(matrix / scales[:, None]).astype(np.int8)
+        return stored, scales.astype(np.float32)
+    raise ValueError(f"dtype must be one of {EMBEDDING_DTYPES}, got {dtype!r}")
+
+
+def build_embeddings(
+    sources: Dict[str, Sequence[DDCDoc]],
+    output_dir: Path,
+    model_name: str = DEFAULT_MODEL,
+    dtype: str = "float32",
+    fingerprint: str = "",
+    batch_size: int = 256,
+    show_progress: bool = True
+) -> Path:
+    """
+    Encode every document and write the embedding matrix to output_dir.
+
+    Args:
+        sources: source name -> documents (as returned by load_all_sources)
+        output_dir: directory to write embeddings.npy / meta.json into
+        model_name: SentenceTransformer model
+        dtype: "float32", "float16" or "int8"
+        fingerprint: source_fingerprint() of the data the sources came from
+        batch_size: encoder batch size
+        show_progress: show the encoder progress bar
+
+    Returns:
+        output_dir
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"dtype must be one of {EMBEDDING_DTYPES}, got {dtype!r}")
+
+    model = get_sentence_model(model_name)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    texts = []
+    rows = {}
+    for name, docs in sources.items():
+        rows[name] = [len(texts), len(docs)]
+        texts.extend(doc_text(doc) for doc in docs)
+
+    matrix = model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=show_progress
+    ).astype(np.float32)
+
+    stored, scales = quantize(matrix, dtype)
+    np.save(output_dir / "embeddings.npy", stored)
+    if scales is not None:
+        np.save(output_dir / "scales.npy", scales)
+
+    meta = {
+        "model": model_name,
+        "dtype": dtype,
+        "dim": int(matrix.shape[1]) if len(texts) else 0,
+        "fingerprint": fingerprint,
+        "rows": rows,
+    }
+    with open(output_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return output_dir
+
+
+class EmbeddingMatrix:
+    """
+    Memory-mapped document embedding matrix with per-source row ranges.
+    """
+
+    def __init__(self, matrix: np.ndarray, scales: Optional[np.ndarray], meta: Dict[str, Any]):
+        self.matrix = matrix
+        self.scales = scales
+        self.meta = meta
+        self.model_name = meta["model"]
+        self.rows: Dict[str, Tuple[int, int]] = {k: tuple(v) for k, v in meta["rows"].items()}
+        # Set by load(): derived artifacts (ann_index.INDEX_FILENAME) live beside the matrix
+        self.directory: Optional[Path] = None
+
+    @classmethod
+    def load(cls, directory: Path, expected_fingerprint: Optional[str] = None) -> Optional["EmbeddingMatrix"]:
+        """
+        Memory-map an embedding directory.
+
+        Returns:
+            EmbeddingMatrix, or None if missing or built from other source data
+        """
+        directory = Path(directory)
+        meta_path = directory / "meta.json"
+        if not meta_path.exists():
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if expected_fingerprint is not None and meta.get("fingerprint") != expected_fingerprint:
+            return None
+
+        matrix = np.load(directory / "embeddings.npy", mmap_mode="r")
+        scales = None
+        if meta["dtype"] == "int8":
+            scales = np.load(directory / "scales.npy", mmap_mode="r")
+        loaded = cls(matrix, scales, meta)
+        loaded.directory = directory
+        return loaded
+
+    def source_rows(self, source: str) -> np.ndarray:
+        """
+        Stored rows for one source (a view, no copy).
+        """
+        start, count = self.rows[source]
+        return self.matrix[start:start + count]
+
+    def scores(self, query_vec: np.ndarray, source: str, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Cosine similarity of a normalized query vector against a source's docs.
+
+        Args:
+            query_vec: (dim,) normalized query embedding
+            source: source name
+            indices: restrict to these document positions within the source
+
+        Returns:
+            float32 array of similarities, aligned with the source's docs (or indices)
+        """
+        start, count = self.rows[source]
+        if indices is None:
+            block = self.matrix[start:start + count]
+            scales = self.scales[start:start + count] if self.scales is not None else None
+        else:
+            positions = start + np.asarray(indices, dtype=np.int64)
+            block = self.matrix[positions]
+            scales = self.scales[positions] if self.scales is not None else None
+
+        sims = block.astype(np.float32, copy=False) @ query_vec.astype(np.float32, copy=False)
+        if scales is not None:
+            sims = sims * scales
+        return sims
+
+
+class SemanticScorer:
+    """
+    Semantic similarity from the precomputed matrix: only queries are encoded,
+    in micro-batches shared with every other scorer of the same model.
+    """
+
+    def __init__(self, embeddings: EmbeddingMatrix, encoder: Optional[QueryEncoder] = None):
+        """
+        Args:
+            embeddings: document embedding matrix
+            encoder: query encoder (default: the process-wide one for the matrix's model)
+        """
+        self.embeddings = embeddings
+        self.encoder = encoder or get_query_encoder(embeddings.model_name)
+
+    @classmethod
+    def from_data_dir(
+        cls,
+        model_name: str = DEFAULT_MODEL,
+        data_dir: Optional[Path] = None,
+        build_missing: bool = True,
+        dtype: str = "float32"
+    ) -> "SemanticScorer":
+        """
+        Attach to the embedding matrix for the current sources, building it if
+        missing or stale (and build_missing is set).
+        """
+        data_dir = Path(data_dir) if data_dir else find_data_processed_dir()
+        directory = default_embeddings_dir(model_name, data_dir)
+        fingerprint = source_fingerprint(data_dir)
+
+        embeddings = EmbeddingMatrix.load(directory, expected_fingerprint=fingerprint)
+        if embeddings is None:
+            if not build_missing:
+                raise FileNotFoundError(f"No up-to-date embeddings in {directory}")
+            build_embeddings(load_sources(data_dir), directory, model_name, dtype, fingerprint)
+            # Checked against a fresh fingerprint: the next start must accept what was just written
+            embeddings = EmbeddingMatrix.load(directory, expected_fingerprint=source_fingerprint(data_dir))
+            if embeddings is None:
+                raise RuntimeError(f"Embeddings in {directory} are stale right after building (source data changed?)")
+        return cls(embeddings)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """
+        Encode a query into a normalized float32 vector (read-only, may be shared).
+        """
+        return self.encoder.encode(text)
+
+    def encode_queries(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Encode several query texts (e.g. keywords and facet subject) in one batch.
+        """
+        return self.encoder.encode_many(texts)
+
+    def score_source(self, query: str, source: str, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Similarities of a query text to a source's documents (clipped to [0, 1]).
+        """
+        sims = self.embeddings.scores(self.encode_query(query), source, indices)
+        return np.clip(sims, 0.0, 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed DDC embedding matrix")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"SentenceTransformer model (default: {DEFAULT_MODEL})")
+    parser.add_argument("--dtype", choices=EMBEDDING_DTYPES, default="float32", help="Storage dtype (default: float32)")
+    parser.add_argument("--data-dir", type=Path, default=None, help="data_processed directory")
+    parser.add_argument("--output", type=Path, default=None, help="Output directory")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or find_data_processed_dir()
+    output_dir = args.output or default_embeddings_dir(args.model, data_dir)
+
+    sources = load_sources(data_dir)
+    print(f"[*] Encoding {sum(len(d) for d in sources.values())} documents with {args.model}...")
+    build_embeddings(sources, output_dir, args.model, args.dtype, source_fingerprint(data_dir))
+    size = (output_dir / "embeddings.npy").stat().st_size
+    print(f"[+] Wrote {output_dir} ({size / 1e6:.1f} MB, {args.dtype})")
+
+
+if __name__ == "__main__":
+    main()
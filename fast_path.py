@@ -0,0 +1,404 @@
+"""
+Retrieval-only fast path with escalation to the two-agent loop.
+
+classify_subject() always costs at least three LLM calls (initial plan, one
+round, final synthesis), even when retrieval alone already ranks the right
+number first with a clear lead. TieredClassifier runs one deterministic
+Querier probe (the quick_classify.py request, keywords only) and accepts
+its top number without any LLM call when all criteria in FastPathConfig hold:
+
+- Annif top-1 agreement: the top number equals Annif's first suggestion
+- Score: the top number scores at least min_score
+- Margin: it leads the best different number by at least min_margin
+- Evidence: its hits carry the required signals (none by default)
+
+The probe is not seeded with the Annif numbers: seeded, Annif's own top-1
+would collect exact_number and range_cover and the agreement check would
+measure Annif against itself. Everything else escalates to classify_subject().
+
+The default thresholds are placeholders, not calibrated values; the fast
+path is opt-in (--fast-path). Fit min_margin on labelled subjects with
+calibrate_margin(), e.g. python -m detective_systemv3.fast_path calibrate
+labelled.jsonl.
+"""
+import sys
+import json
+import argparse
+import time
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Any, Optional, Tuple
+
+from .agents.querier import Querier
+from .retrieval.schemas import QuerierRequest
+from .orchestrator import classify_subject
+from .query_cache import CachingQuerier
+from .range_tree import notation_key
+from .source_index import use_compiled_index
+
+
+# Minimum LLM calls of a two-agent run (initial plan, one round, final synthesis)
+MIN_LLM_CALLS = 3
+
+PROBE_SOURCES = ["Sch2", "Sch3", "Sch2_ranges", "Sch3_ranges", "ManSc", "ManTB"]
+
+
+@dataclass
+class FastPathConfig:
+    """
+    Acceptance criteria for the retrieval-only tier.
+
+    min_score and min_margin are uncalibrated placeholders; replace them with
+    the output of calibrate_margin() on labelled subjects before relying on
+    the fast path.
+    """
+    min_score: float = 0.6
+    min_margin: float = 0.1
+    require_annif_agreement: bool = True
+    # signal -> minimum of its best value across the top number's hits. The
+    # probe carries no numbers, so number signals (exact_number, range_cover)
+    # only fire for notations typed into the subject itself
+    required_signals: Dict[str, float] = field(default_factory=dict)
+    use_semantic: bool = False
+
+
+def probe_request(subject_text: str, annif_top2: List[str], use_semantic: bool = False) -> QuerierRequest:
+    """
+    The deterministic retrieval probe (same shape as quick_classify.py).
+    """
+    keywords = [word.strip().lower() for word in subject_text.split() if len(word) > 3]
+    return QuerierRequest(
+        numbers=list(annif_top2),
+        keywords=keywords,
+        facets={
+            "subject": subject_text,
+            "discipline": None,
+            "geo": None,
+            "time": None,
+            "form": None,
+            "audience": None
+        },
+        sources=list(PROBE_SOURCES),
+        limits={"k_per_source": 20, "max_docs": 50},
+        options={
+            "expand_synonyms": True,
+            "include_std_subdivisions": True,
+            "use_semantic": use_semantic
+        }
+    )
+
+
+def fast_path_probe(subject_text: str, use_semantic: bool = False) -> QuerierRequest:
+    """
+    The fast-path probe: probe_request() without the Annif numbers, so its
+    ranking is independent of the suggestion it is checked against.
+    """
+    return probe_request(subject_text, [], use_semantic)
+
+
+def _same_number(a: str, b: str) -> bool:
+    ka, kb = notation_key(a), notation_key(b)
+    if ka is None or kb is None:
+        return a.strip() == b.strip()
+    return ka == kb
+
+
+def rank_numbers(response) -> List[Dict[str, Any]]:
+    """
+    Group hits by DDC number: best score, per-signal maxima, contributing hits.
+    """
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for hit in response.hits:
+        number = hit.doc.ddc_number
+        key = notation_key(number) or number
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"ddc_number": number, "score": hit.score, "signals": {}, "hits": []}
+        elif hit.score > group["score"]:
+            group.update(ddc_number=number, score=hit.score)
+        group["hits"].append(hit)
+        for name, value in hit.signals.items():
+            group["signals"][name] = max(group["signals"].get(name, 0.0), value)
+    return sorted(groups.values(), key=lambda g: g["score"], reverse=True)
+
+
+def fast_path_decision(response, annif_top2: List[str], config: FastPathConfig) -> Dict[str, Any]:
+    """
+    Evaluate the acceptance criteria on a probe response (no Annif
+    suggestion counts as disagreement).
+
+    Returns:
+        Dict with accepted, ddc_number, score, margin, failed (criteria names)
+        and the ranked number groups
+    """
+    ranked = rank_numbers(response)
+    if not ranked:
+        return {"accepted": False, "ddc_number": None, "score": 0.0, "margin": 0.0,
+                "failed": ["no_hits"], "ranked": ranked}
+
+    top = ranked[0]
+    margin = top["score"] - (ranked[1]["score"] if len(ranked) > 1 else 0.0)
+
+    failed = []
+    if config.require_annif_agreement and not (annif_top2 and _same_number(top["ddc_number"], annif_top2[0])):
+        failed.append("annif_agreement")
+    if top["score"] < config.min_score:
+        failed.append("min_score")
+    if margin < config.min_margin:
+        failed.append("min_margin")
+    for name, minimum in config.required_signals.items():
+        if top["signals"].get(name, 0.0) < minimum:
+            failed.append(name)
+
+    return {
+        "accepted": not failed,
+        "ddc_number": top["ddc_number"],
+        "score": round(top["score"], 4),
+        "margin": round(margin, 4),
+        "failed": failed,
+        "ranked": ranked,
+    }
+
+
+def calibrate_margin(
+    samples: List[Tuple[Any, List[str], str]],
+    config: Optional[FastPathConfig] = None,
+    target_precision: float = 0.95,
+    margins: Optional[List[float]] = None
+) -> Dict[str, Any]:
+    """
+    Pick the smallest margin whose accepted subjects reach target precision.
+
+    Args:
+        samples: (fast_path_probe() response, annif_top2, gold DDC) for
+            labelled subjects
+        config: other criteria (kept fixed)
+        target_precision: required share of accepted subjects that are correct
+        margins: candidate thresholds (default 0.00-0.50 in 0.02 steps)
+
+    Returns:
+        Dict with min_margin (None if no threshold reaches the target),
+        precision and coverage (share of subjects accepted) at that margin
+    """
+    base = config or FastPathConfig()
+    candidates = margins or [round(0.02 * i, 2) for i in range(26)]
+    for margin in candidates:
+        trial = replace(base, min_margin=margin)
+        accepted = correct = 0
+        for response, annif_top2, gold in samples:
+            decision = fast_path_decision(response, annif_top2, trial)
+            if decision["accepted"]:
+                accepted += 1
+                correct += _same_number(decision["ddc_number"], gold)
+        if accepted and correct / accepted >= target_precision:
+            return {"min_margin": margin, "precision": round(correct / accepted, 3),
+                    "coverage": round(accepted / len(samples), 3)}
+    return {"min_margin": None, "precision": 0.0, "coverage": 0.0}
+
+
+class TieredClassifier:
+    """
+    Retrieval probe first; two-agent loop only for ambiguous subjects.
+    """
+
+    def __init__(
+        self,
+        llm_manager,
+        querier: Optional[Querier] = None,
+        config: Optional[FastPathConfig] = None,
+        max_rounds: int = 5,
+        verbose: bool = False,
+        cache_size: int = 256,
+        **classify_kwargs
+    ):
+        """
+        Args:
+            llm_manager: LLM manager for escalated subjects
+            querier: warm Querier to share (loaded once when omitted)
+            config: fast-path acceptance criteria
+            max_rounds: maximum rounds for escalated subjects
+            verbose: print progress of escalated runs
+            cache_size: Querier result cache (0 = off)
+            **classify_kwargs: forwarded to classify_subject()
+        """
+        self.llm_manager = llm_manager
+        self.config = config or FastPathConfig()
+        self.max_rounds = max_rounds
+        self.verbose = verbose
+        self.classify_kwargs = classify_kwargs
+
+        if querier is None:
+            use_compiled_index()
+            querier = Querier()
+        self.querier = querier
+        if cache_size > 0 and not isinstance(self.querier, CachingQuerier):
+            self.querier = CachingQuerier(self.querier, max_entries=cache_size)
+
+        self.subjects = 0
+        self.accepted = 0
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+
+    def classify(self, subject_text: str, annif_top2: List[str]) -> Dict[str, Any]:
+        """
+        Classify one subject; result has the same shape as classify_subject().
+
+        metadata["tier"] is "retrieval" or "two_agent"; metadata["fast_path"]
+        holds the decision (criteria that failed, score, margin).
+        """
+        start_time = time.time()
+        signals_since = self.querier.signal_snapshot() if isinstance(self.querier, CachingQuerier) else None
+        request = fast_path_probe(subject_text, self.config.use_semantic)
+        tracer = self.classify_kwargs.get("tracer")
+        if tracer is not None:
+            with tracer.span("fast_path.probe", "querier", sources=list(request.sources)):
+                response = self.querier.execute(request)
+        else:
+            response = self.querier.execute(request)
+        decision = fast_path_decision(response, annif_top2, self.config)
+        ranked = decision.pop("ranked")
+
+        if decision["accepted"]:
+            with self._lock:
+                self.subjects += 1
+                self.accepted += 1
+            return self._retrieval_result(subject_text, annif_top2, decision, ranked, start_time, signals_since)
+
+        result = classify_subject(
+            subject_text=subject_text,
+            annif_top2=annif_top2,
+            llm_manager=self.llm_manager,
+            max_rounds=self.max_rounds,
+            verbose=self.verbose,
+            querier=self.querier,
+            **self.classify_kwargs
+        )
+        with self._lock:
+            self.subjects += 1
+            self.llm_calls += len(result["metadata"].get("llm_usage", {}).get("calls", [])) or MIN_LLM_CALLS
+        result["metadata"]["tier"] = "two_agent"
+        result["metadata"]["fast_path"] = decision
+        return result
+
+    def _retrieval_result(
+        self,
+        subject_text: str,
+        annif_top2: List[str],
+        decision: Dict[str, Any],
+        ranked: List[Dict[str, Any]],
+        start_time: float,
+        signals_since: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build a classify_subject()-shaped result from the accepted probe.
+        """
+        top = ranked[0]
+        return {
+            "final_ddc": top["ddc_number"],
+            "confidence": decision["score"],
+            "justification": (
+                f"Retrieval fast path: {top['ddc_number']} agrees with Annif top-1, "
+                f"scores {decision['score']:.2f} and leads the runner-up by {decision['margin']:.2f}."
+            ),
+            "components": {"base": top["ddc_number"]},
+            "alternatives": [
+                {"ddc": group["ddc_number"], "reason_rejected": f"lower retrieval score ({group['score']:.2f})"}
+                for group in ranked[1:3]
+            ],
+            "cited_evidence": [
+                {"ddc_number": hit.doc.ddc_number, "source": hit.doc.source,
+                 "score": round(hit.score, 4), "role": "retrieval evidence"}
+                for hit in top["hits"][:3]
+            ],
+            "metadata": {
+                "subject_text": subject_text,
+                "annif_top2": annif_top2,
+                "rounds_executed": 0,
+                "elapsed_seconds": round(time.time() - start_time, 2),
+                "memory_stats": {"total_artifacts": 0},
+                "querier_stats": (self.querier.get_stats(signals_since=signals_since)
+                                  if isinstance(self.querier, CachingQuerier) else self.querier.get_stats()),
+                "relevance_history": [],
+                "facets": {},
+                "tier": "retrieval",
+                "fast_path": decision
+            }
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Fast-path acceptance and LLM calls avoided.
+
+        Avoided calls are estimated from the mean calls of escalated subjects
+        (MIN_LLM_CALLS when none escalated).
+        """
+        with self._lock:
+            subjects, accepted, llm_calls = self.subjects, self.accepted, self.llm_calls
+        escalated = subjects - accepted
+        per_subject = llm_calls / escalated if escalated else MIN_LLM_CALLS
+        avoided = accepted * per_subject
+        total = avoided + llm_calls
+        return {
+            "subjects": subjects,
+            "fast_path_accepted": accepted,
+            "escalated": escalated,
+            "llm_calls": llm_calls,
+            "llm_calls_avoided": round(avoided, 1),
+            "llm_calls_avoided_fraction": round(avoided / total, 3) if total else 0.0,
+        }
+
+
+def calibration_samples(querier, records: List[Dict[str, Any]], use_semantic: bool = False) -> List[Tuple[Any, List[str], str]]:
+    """
+    Run the fast-path probe over labelled records for calibrate_margin().
+
+    Args:
+        querier: Querier to probe with
+        records: dicts with subject, annif_top2 and ddc (the gold number)
+        use_semantic: probe with semantic scoring (match FastPathConfig.use_semantic)
+    """
+    return [
+        (querier.execute(fast_path_probe(record["subject"], use_semantic)), record["annif_top2"], record["ddc"])
+        for record in records
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fit the fast-path margin on labelled subjects",
+        epilog="""
+Input JSONL: {"subject": "constitutional law", "annif_top2": ["342", "340"], "ddc": "342"}
+
+Examples:
+  python -m detective_systemv3.fast_path calibrate labelled.jsonl
+  python -m detective_systemv3.fast_path calibrate labelled.jsonl --precision 0.98 --min-score 0.5
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", choices=["calibrate"])
+    parser.add_argument("labelled", type=str, help="JSONL with subject, annif_top2 and gold ddc")
+    parser.add_argument("--precision", type=float, default=0.95, help="Target precision (default: 0.95)")
+    parser.add_argument("--min-score", type=float, default=FastPathConfig.min_score,
+                        help=f"Score threshold kept fixed (default: {FastPathConfig.min_score})")
+    parser.add_argument("--semantic", action="store_true", help="Probe with semantic scoring")
+    args = parser.parse_args()
+
+    with open(args.labelled, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        print(f"[ERROR] No labelled subjects in {args.labelled}")
+        sys.exit(1)
+
+    print(f"[*] Probing {len(records)} labelled subjects...")
+    config = FastPathConfig(min_score=args.min_score, use_semantic=args.semantic)
+    use_compiled_index()
+    samples = calibration_samples(Querier(), records, use_semantic=args.semantic)
+    result = calibrate_margin(samples, config, target_precision=args.precision)
+    if result["min_margin"] is None:
+        print(f"[WARN] No margin reaches precision {args.precision}; keep the fast path off")
+        sys.exit(1)
+    print(f"[+] min_margin={result['min_margin']} precision={result['precision']} coverage={result['coverage']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+On-disk response cache for LLM managers.
+
+Re-running a subject, or an evaluation set after a scorer-only change,
+repeats every Analyzer call at full latency and cost. CachedLLM wraps any
+LLM manager (generate(messages, **kwargs) -> str) and memoizes responses in
+SQLite, keyed on a hash of model, messages, temperature, max_tokens and
+response_format (omitted params take the wrapped generate()'s defaults).
+
+Modes:
+    "readwrite"  serve hits, call the LLM on misses and store the result
+    "replay"     serve hits only; a miss raises LLMCacheMiss (no network calls)
+    "refresh"    always call the LLM and overwrite the stored response
+
+The cache is bounded by entry count and total response bytes; the least
+recently used entries are evicted first.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import inspect
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+
+CACHE_MODES = ("readwrite", "replay", "refresh")
+
+KEY_PARAMS = ("temperature", "max_tokens", "response_format")
+
+# OpenRouterLLM.generate() defaults, used when the wrapped manager's own
+# cannot be read (e.g. replay mode without a manager)
+DEFAULT_PARAMS = {"temperature": 0.2, "max_tokens": 1200, "response_format": None}
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+def generate_defaults(llm_manager) -> Dict[str, Any]:
+    """
+    Defaults of the manager's generate() for the key params, falling back to DEFAULT_PARAMS.
+    """
+    defaults = dict(DEFAULT_PARAMS)
+    try:
+        parameters = inspect.signature(llm_manager.generate).parameters
+    except (AttributeError, TypeError, ValueError):
+        return defaults
+    for name in KEY_PARAMS:
+        param = parameters.get(name)
+        if param is not None and param.default is not inspect.Parameter.empty:
+            defaults[name] = param.default
+    return defaults
+
+
+def prompt_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    params: Dict[str, Any],
+    defaults: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Stable hash of everything that determines the LLM's response.
+
+    Params omitted (or passed as None) take their value from `defaults`, so
+    generate(messages) and generate(messages, temperature=0.2) share a key
+    when 0.2 is the manager's default.
+    """
+    defaults = defaults or {}
+    material = {
+        "model": model,
+        "messages": messages,
+        **{name: params[name] if params.get(name) is not None else defaults.get(name) for name in KEY_PARAMS},
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CachedLLM:
+    """
+    LLM manager wrapper backed by an SQLite response cache.
+    """
+
+    def __init__(
+        self,
+        llm_manager,
+        path: str = "llm_cache.sqlite",
+        mode: str = "readwrite",
+        max_entries: int = 50000,
+        max_bytes: int = 512 * 1024 * 1024,
+        model: Optional[str] = None
+    ):
+        """
+        Args:
+            llm_manager: wrapped manager (may be None in replay mode)
+            path: SQLite file
+            mode: "readwrite", "replay" or "refresh"
+            max_entries: evict LRU entries beyond this count
+            max_bytes: evict LRU entries beyond this total response size
+            model: model name used in cache keys (default: llm_manager.model);
+                needed for replay without a live manager
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"mode must be one of {CACHE_MODES}, got {mode!r}")
+        if llm_manager is None and mode != "replay":
+            raise ValueError("llm_manager is required unless mode='replay'")
+
+        self.llm_manager = llm_manager
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.model = model or getattr(llm_manager, "model", type(llm_manager).__name__)
+        self.defaults = generate_defaults(llm_manager)
+
+        self.hits = 0
+        self.misses = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT,"
+            " size INTEGER, created_at REAL, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+
+    def generate(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        Cached generate(); kwargs are forwarded unchanged to the wrapped manager.
+
+        On a hit with stream=True, stream_callback receives the whole response
+        as a single chunk.
+        """
+        key = prompt_key(self.model, messages, kwargs, self.defaults)
+        cached = self._cached_response(key, kwargs)
+        if cached is not None:
+            return cached
+
+        response = self.llm_manager.generate(messages, **kwargs)
+        self._store(key, response)
+        return response
+
+    async def agenerate(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        Cached agenerate() for managers that provide one.
+        """
+        key = prompt_key(self.model, messages, kwargs, self.defaults)
+        cached = self._cached_response(key, kwargs)
+        if cached is not None:
+            return cached
+
+        response = await self.llm_manager.agenerate(messages, **kwargs)
+        self._store(key, response)
+        return response
+
+    def _cached_response(self, key: str, kwargs: Dict[str, Any]) -> Optional[str]:
+        """
+        Serve a hit (replaying it to stream_callback), or None to call the LLM.
+        """
+        if self.mode == "refresh":
+            return None
+        cached = self._lookup(key)
+        if cached is not None:
+            callback = kwargs.get("stream_callback")
+            if kwargs.get("stream") and callback:
+                callback(cached)
+            return cached
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No cached response for prompt {key[:12]} (replay mode)")
+        return None
+
+    def _lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def _store(self, key: str, response: str):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.model, response, size, now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """
+        Drop least recently used entries until both bounds hold.
+        """
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        drop = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used ASC"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            drop.append((key,))
+            count -= 1
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", drop)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
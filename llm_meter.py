@@ -0,0 +1,179 @@
+"""
+Per-call LLM metering: prompt/completion tokens, time-to-first-token and
+prompt-prefix reuse.
+
+MeteredLLM wraps any LLM manager (generate(messages, **kwargs) -> str). Calls
+are streamed only when the caller asks (stream=True, or measure_ttft=True and
+the innermost manager supports streaming); then the first chunk is timed and
+the returned text is unchanged. Token counts are estimates
+(context_budget.estimate_tokens).
+
+While `loop` is set (TwoAgentOrchestrator.aclassify), calls made from the
+Analyzer's executor thread are awaited on that loop as agenerate() when
+every wrapped manager provides one, so the HTTP waits of all in-flight
+classifications share the loop's async session.
+
+prefix_reuse is the fraction of this call's serialized messages that is a
+byte-identical prefix of the previous call's; provider prompt caching only
+helps when it stays high from round to round.
+"""
+import json
+import time
+import asyncio
+import inspect
+import threading
+from typing import Dict, List, Any, Callable, Optional
+
+from .context_budget import estimate_tokens
+
+
+def supports_streaming(llm_manager) -> bool:
+    """
+    Whether the innermost wrapped manager's generate() accepts stream/stream_callback.
+    """
+    manager = llm_manager
+    while getattr(manager, "llm_manager", None) is not None:
+        manager = manager.llm_manager
+    try:
+        params = inspect.signature(manager.generate).parameters
+    except (TypeError, ValueError, AttributeError):
+        return False
+    return "stream" in params and "stream_callback" in params
+
+
+def supports_async(llm_manager) -> bool:
+    """
+    Whether every manager in the wrapping chain provides agenerate().
+    """
+    manager = llm_manager
+    while manager is not None:
+        if not callable(getattr(type(manager), "agenerate", None)):
+            return False
+        manager = getattr(manager, "llm_manager", None)
+    return True
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    lo, hi = 0, limit
+    # Binary search on slice equality (C-speed compares instead of a Python loop)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class MeteredLLM:
+    """
+    LLM manager wrapper that records one entry per generate() call.
+    """
+
+    def __init__(self, llm_manager, measure_ttft: bool = False, tracer=None):
+        """
+        Args:
+            llm_manager: wrapped manager
+            measure_ttft: opt in to streaming every call (when supported) to time
+                the first chunk and feed chunk_listener; otherwise only calls
+                made with stream=True are streamed
+            tracer: optional tracing.Tracer; each call becomes an "llm.generate"
+                span (plus "llm.ttft" when the first chunk was timed)
+        """
+        self.llm_manager = llm_manager
+        self.tracer = tracer
+        self.model = getattr(llm_manager, "model", type(llm_manager).__name__)
+        self.stream_ttft = measure_ttft and supports_streaming(llm_manager)
+        self.async_calls = supports_async(llm_manager)
+        self.round = 0
+        # Event loop to await agenerate() on (set by aclassify for its duration)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Called with every streamed chunk (e.g. an incremental JSON parser)
+        self.chunk_listener: Optional[Callable[[str], None]] = None
+
+        self.calls: List[Dict[str, Any]] = []
+        self._last_prompt = ""
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == "llm_manager":
+            raise AttributeError(name)
+        return getattr(self.llm_manager, name)
+
+    def generate(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        prompt = json.dumps(messages, ensure_ascii=False)
+        first_chunk_at: List[float] = []
+
+        if kwargs.get("stream") or self.stream_ttft:
+            callback = kwargs.get("stream_callback")
+            listener = self.chunk_listener
+
+            def timed_callback(chunk: str):
+                if not first_chunk_at:
+                    first_chunk_at.append(time.perf_counter())
+                if listener:
+                    listener(chunk)
+                if callback:
+                    callback(chunk)
+
+            kwargs["stream"] = True
+            kwargs["stream_callback"] = timed_callback
+
+        start = time.perf_counter()
+        response = self._call(messages, kwargs)
+        elapsed = time.perf_counter() - start
+
+        self._record(prompt, response, start, elapsed, first_chunk_at)
+        return response
+
+    def _call(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> str:
+        """
+        Wrapped generate(), or agenerate() on `loop` when called from another thread.
+        """
+        loop = self.loop
+        if loop is None or not self.async_calls or loop.is_closed():
+            return self.llm_manager.generate(messages, **kwargs)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            # Blocking on the loop from its own thread would deadlock
+            return self.llm_manager.generate(messages, **kwargs)
+        future = asyncio.run_coroutine_threadsafe(self.llm_manager.agenerate(messages, **kwargs), loop)
+        return future.result()
+
+    def _record(self, prompt: str, response: str, start: float, elapsed: float, first_chunk_at: List[float]):
+        with self._lock:
+            shared = _common_prefix_length(prompt, self._last_prompt)
+            self._last_prompt = prompt
+            call = {
+                "round": self.round,
+                "prompt_tokens": estimate_tokens(prompt),
+                "completion_tokens": estimate_tokens(response or ""),
+                "ttft_seconds": round(first_chunk_at[0] - start, 3) if first_chunk_at else None,
+                "elapsed_seconds": round(elapsed, 3),
+                "prefix_reuse": round(shared / len(prompt), 3) if prompt else 0.0,
+            }
+            self.calls.append(call)
+
+        if self.tracer is not None:
+            self.tracer.add_span("llm.generate", start, elapsed, "llm", call)
+            if first_chunk_at:
+                self.tracer.add_span("llm.ttft", start, first_chunk_at[0] - start, "llm", {"round": call["round"]})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Per-call entries plus totals for result metadata.
+        """
+        with self._lock:
+            calls = list(self.calls)
+        ttfts = [c["ttft_seconds"] for c in calls if c["ttft_seconds"] is not None]
+        return {
+            "calls": calls,
+            "total_prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+            "total_completion_tokens": sum(c["completion_tokens"] for c in calls),
+            "mean_ttft_seconds": round(sum(ttfts) / len(ttfts), 3) if ttfts else None,
+            "llm_seconds": round(sum(c["elapsed_seconds"] for c in calls), 3),
+        }
@@ -1,10 +1,16 @@
 import os
 import json
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
 from typing import List, Dict, Any, Optional
-import requests
 
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 
+# Transient statuses worth retrying (rate limits on :free models, gateway errors)
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
 class OpenRouterLLM:
 	"""
 	Lightweight LLM manager for OpenRouter.
@@ -12,15 +18,72 @@ class OpenRouterLLM:
 	- Reads API key from `api.txt` in the same directory if OPENROUTER_API_KEY env not set
 	- Default model: x-ai/grok-4-fast:free
 	- Interface: generate(messages: List[Dict[str,str]], **kwargs) -> str
+	- Keeps a pooled keep-alive session (one TLS handshake, reused every round)
+	- Retries 429/5xx and connection errors with jittered exponential backoff,
+	  honouring Retry-After, within an overall per-call deadline
 	"""
 
-	def __init__(self, model: str = "x-ai/grok-4-fast:free", api_key: Optional[str] = None, timeout: int = 60):
+	def __init__(
+		self,
+		model: str = "x-ai/grok-4-fast:free",
+		api_key: Optional[str] = None,
+		timeout: int = 60,
+		pool_size: int = 10,
+		max_retries: int = 4,
+		backoff_base: float = 0.5,
+		backoff_max: float = 20.0,
+		deadline: Optional[float] = 180.0,
+	):
+		"""
+		Args:
+			model: OpenRouter model id
+			api_key: API key (default: OPENROUTER_API_KEY or api.txt)
+			timeout: per-attempt HTTP timeout in seconds
+			pool_size: max pooled connections (match the number of concurrent callers)
+			max_retries: retries after the first attempt for transient failures
+			backoff_base: first backoff ceiling in seconds (doubles per retry)
+			backoff_max: cap on a single backoff sleep (a server's Retry-After is honoured in full)
+			deadline: overall seconds per generate() call, retries included (None = no limit)
+		"""
 		self.model = model
 		self.timeout = timeout
+		self.max_retries = max_retries
+		self.backoff_base = backoff_base
+		self.backoff_max = backoff_max
+		self.deadline = deadline
 		self.api_key = api_key or os.getenv("OPENROUTER_API_KEY") or self._read_api_key()
 		if not self.api_key:
 			raise RuntimeError("OpenRouter API key not found. Set OPENROUTER_API_KEY or place api.txt beside this file.")
 
+		# requests is imported here, not at module level, so CLIs start without it
+		import requests
+		from requests.adapters import HTTPAdapter
+
+		self.session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+		self.session.mount("https://", adapter)
+		self.session.headers.update({
+			"Authorization": f"Bearer {self.api_key}",
+			"Content-Type": "application/json",
+		})
+		self.pool_size = pool_size
+		self.retry_count = 0
+
+		# aiohttp session for agenerate(), bound to the event loop that created it
+		self._async_session = None
+		self._async_loop = None
+
+	def close(self):
+		"""Close pooled connections."""
+		self.session.close()
+
+	async def aclose(self):
+		"""Close the async session (call from the loop that used agenerate)."""
+		if self._async_session is not None:
+			await self._async_session.close()
+			self._async_session = None
+			self._async_loop = None
+
 	def _read_api_key(self) -> Optional[str]:
 		this_dir = os.path.dirname(os.path.abspath(__file__))
 		candidate = os.path.join(this_dir, "api.txt")
@@ -29,11 +92,7 @@ class OpenRouterLLM:
 				return f.read().strip()
 		return None
 
-	def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 1200, response_format: Optional[str] = None, stream: bool = False, stream_callback: Optional[callable] = None) -> str:
-		headers = {
-			"Authorization": f"Bearer {self.api_key}",
-			"Content-Type": "application/json",
-		}
+	def _build_payload(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int, response_format: Optional[str], stream: bool) -> Dict[str, Any]:
 		payload: Dict[str, Any] = {
 			"model": self.model,
 			"messages": messages,
@@ -43,13 +102,18 @@ class OpenRouterLLM:
 		# Some models support response_format
 		if response_format:
 			payload["response_format"] = {"type": response_format}
-		
 		if stream:
 			payload["stream"] = True
+		return payload
+
+	def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 1200, response_format: Optional[str] = None, stream: bool = False, stream_callback: Optional[callable] = None) -> str:
+		headers: Dict[str, str] = {}  # per-call extras; auth/content-type live on the session
+		payload = self._build_payload(messages, temperature, max_tokens, response_format, stream)
+
+		if stream:
 			return self._stream_generate(headers, payload, stream_callback)
 		else:
-			resp = requests.post(OPENROUTER_API_URL, headers=headers, data=json.dumps(payload), timeout=self.timeout)
-			resp.raise_for_status()
+			resp = self._post(headers, payload)
 			data = resp.json()
 			# Extract assistant content
 			try:
@@ -59,26 +123,209 @@ class OpenRouterLLM:
 	
 	def _stream_generate(self, headers: Dict, payload: Dict, callback: Optional[callable] = None) -> str:
 		"""Stream response and optionally call callback for each chunk."""
-		resp = requests.post(OPENROUTER_API_URL, headers=headers, data=json.dumps(payload), timeout=self.timeout, stream=True)
-		resp.raise_for_status()
+		resp = self._post(headers, payload, stream=True)
 		
 		full_text = ""
 		for line in resp.iter_lines():
 			if not line:
 				continue
-			line_str = line.decode('utf-8')
-			if line_str.startswith("data: "):
-				data_str = line_str[6:]
-				if data_str == "[DONE]":
-					break
-				try:
-					chunk = json.loads(data_str)
-					delta = chunk.get("choices", [{}])[0].get("delta", {})
-					content = delta.get("content", "")
-					if content:
-						full_text += content
-						if callback:
-							callback(content)
-				except Exception:
-					pass
+			content, done = _parse_sse_line(line.decode('utf-8'))
+			if done:
+				break
+			if content:
+				full_text += content
+				if callback:
+					callback(content)
 		return full_text
+
+	async def agenerate(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 1200, response_format: Optional[str] = None, stream: bool = False, stream_callback: Optional[callable] = None) -> str:
+		"""
+		Async counterpart of generate(), for overlapping many LLM waits on one loop.
+
+		Uses aiohttp (pooled, same retry/backoff/deadline policy) when installed;
+		otherwise runs generate() in a worker thread.
+		"""
+		try:
+			import aiohttp  # noqa: F401
+		except ImportError:
+			return await asyncio.to_thread(self.generate, messages, temperature, max_tokens, response_format, stream, stream_callback)
+
+		payload = self._build_payload(messages, temperature, max_tokens, response_format, stream)
+		resp = await self._apost(payload)
+		try:
+			if stream:
+				return await self._astream_generate(resp, stream_callback)
+			data = await resp.json(content_type=None)
+			try:
+				return data["choices"][0]["message"]["content"]
+			except Exception:
+				return json.dumps(data)
+		finally:
+			resp.release()
+
+	async def _astream_generate(self, resp, callback: Optional[callable] = None) -> str:
+		"""Async SSE streaming, same chunk handling as _stream_generate."""
+		full_text = ""
+		async for raw in resp.content:
+			line = raw.decode('utf-8').strip()
+			if not line:
+				continue
+			content, done = _parse_sse_line(line)
+			if done:
+				break
+			if content:
+				full_text += content
+				if callback:
+					callback(content)
+		return full_text
+
+	def _get_async_session(self):
+		"""aiohttp session for the running loop (created on first use)."""
+		import aiohttp
+
+		loop = asyncio.get_running_loop()
+		if self._async_session is None or self._async_loop is not loop or self._async_session.closed:
+			self._async_session = aiohttp.ClientSession(
+				headers={
+					"Authorization": f"Bearer {self.api_key}",
+					"Content-Type": "application/json",
+				},
+				connector=aiohttp.TCPConnector(limit=self.pool_size),
+			)
+			self._async_loop = loop
+		return self._async_session
+
+	async def _apost(self, payload: Dict):
+		"""Async POST with the same retry policy as _post."""
+		import aiohttp
+
+		session = self._get_async_session()
+		started = time.monotonic()
+		body = json.dumps(payload)
+		attempt = 0
+		while True:
+			remaining = None
+			if self.deadline is not None:
+				remaining = self.deadline - (time.monotonic() - started)
+				if remaining <= 0:
+					raise TimeoutError(f"OpenRouter call exceeded deadline of {self.deadline}s")
+			timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+
+			try:
+				resp = await session.post(OPENROUTER_API_URL, data=body, timeout=aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout))
+			except (aiohttp.ClientError, asyncio.TimeoutError):
+				if attempt >= self.max_retries:
+					raise
+				resp = None
+
+			if resp is not None and resp.status not in RETRY_STATUSES:
+				resp.raise_for_status()
+				return resp
+			if resp is not None and attempt >= self.max_retries:
+				resp.raise_for_status()
+
+			retry_after = self._retry_after(resp)
+			delay = self._retry_delay(attempt, retry_after, started)
+			if delay is None:
+				resp.raise_for_status()  # told to wait past the deadline: give up now
+			if resp is not None:
+				await resp.read()  # drain so the connection goes back to the pool
+				resp.release()
+			attempt += 1
+			self.retry_count += 1
+			await asyncio.sleep(delay)
+
+	def _post(self, headers: Dict, payload: Dict, stream: bool = False) -> "requests.Response":
+		"""POST with retries on transient failures; raises on final failure."""
+		import requests
+
+		started = time.monotonic()
+		body = json.dumps(payload)
+		attempt = 0
+		while True:
+			remaining = None
+			if self.deadline is not None:
+				remaining = self.deadline - (time.monotonic() - started)
+				if remaining <= 0:
+					raise TimeoutError(f"OpenRouter call exceeded deadline of {self.deadline}s")
+			timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+
+			try:
+				resp = self.session.post(OPENROUTER_API_URL, headers=headers, data=body, timeout=timeout, stream=stream)
+			except (requests.ConnectionError, requests.Timeout):
+				if attempt >= self.max_retries:
+					raise
+				resp = None
+
+			if resp is not None and resp.status_code not in RETRY_STATUSES:
+				resp.raise_for_status()
+				return resp
+			if resp is not None and attempt >= self.max_retries:
+				resp.raise_for_status()
+
+			retry_after = self._retry_after(resp)
+			delay = self._retry_delay(attempt, retry_after, started)
+			if delay is None:
+				resp.raise_for_status()  # told to wait past the deadline: give up now
+			if resp is not None:
+				resp.content  # drain so the connection goes back to the pool
+			attempt += 1
+			self.retry_count += 1
+			time.sleep(delay)
+
+	def _retry_after(self, resp) -> Optional[float]:
+		"""Seconds the server asked us to wait (Retry-After, seconds or HTTP date), or None."""
+		if resp is None:
+			return None
+		retry_after = resp.headers.get("Retry-After")
+		if not retry_after:
+			return None
+		try:
+			return max(0.0, float(retry_after))
+		except ValueError:
+			try:
+				return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+			except (TypeError, ValueError):
+				return None
+
+	def _backoff_delay(self, attempt: int) -> float:
+		"""Full-jitter exponential backoff, capped at backoff_max."""
+		return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+	def _retry_delay(self, attempt: int, retry_after: Optional[float], started: float) -> Optional[float]:
+		"""
+		Sleep before the next attempt: the full Retry-After when the server sent
+		one (backoff_max only caps our own backoff), else jittered backoff; both
+		bounded by the remaining deadline. None when Retry-After is longer than
+		the time left, so the caller gives up instead of retrying early.
+		"""
+		delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+		if self.deadline is None:
+			return delay
+		left = max(0.0, self.deadline - (time.monotonic() - started))
+		if retry_after is not None and retry_after > left:
+			return None
+		return min(delay, left)
+
+
+def _parse_sse_line(line: str):
+	"""Parse one SSE line: returns (content delta or "", done flag); raises on error payloads."""
+	if not line.startswith("data: "):
+		return "", False
+	data_str = line[6:]
+	if data_str == "[DONE]":
+		return "", True
+	try:
+		chunk = json.loads(data_str)
+	except ValueError as e:
+		raise RuntimeError(f"OpenRouter stream sent an unparseable chunk: {data_str[:200]!r}") from e
+	if not isinstance(chunk, dict):
+		raise RuntimeError(f"OpenRouter stream sent an unexpected chunk: {data_str[:200]!r}")
+	if chunk.get("error"):
+		# Mid-stream failures arrive as a data line with an error object
+		error = chunk["error"]
+		message = error.get("message", error) if isinstance(error, dict) else error
+		raise RuntimeError(f"OpenRouter stream error: {message}")
+	choices = chunk.get("choices") or [{}]
+	delta = choices[0].get("delta") or {}
+	return delta.get("content", "") or "", False
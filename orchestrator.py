@@ -1,10 +1,65 @@
 """
 Orchestrator for two-agent loop: Analyzer ↔ Querier.
 """
+import json
 import time
+import asyncio
+import dataclasses
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 from .agents.analyzer import Analyzer
 from .agents.querier import Querier
+from .retrieval.loaders import find_data_processed_dir
+from .retrieval.schemas import QuerierRequest
+from .query_cache import CachingQuerier
+from .context_budget import BudgetedContextLLM
+from .source_index import source_fingerprint, use_compiled_index
+from .llm_meter import MeteredLLM
+from .prefetch import SpeculativePrefetcher, best_schedule_number, speculative_requests
+from .stream_json import NextRequestsParser
+from .tracing import Tracer
+
+
+EXECUTOR_TYPES = ("thread", "process")
+
+# Per-process Querier used by the "process" executor (one load per worker)
+_worker_querier: Optional[Querier] = None
+
+
+def _init_worker_querier(cache_size: int = 0, shared_corpus: Optional[str] = None, fingerprint: Optional[str] = None):
+    """
+    Initializer for process-pool workers: load sources once per process, or
+    attach to a published shared corpus instead of parsing them again.
+
+    The corpus's sources, embeddings and token index replace the worker's own
+    loaders (see shared_corpus.use_shared_corpus). A bundle built from other
+    source data than fingerprint is refused and the worker loads normally.
+    """
+    global _worker_querier
+    corpus = None
+    if shared_corpus:
+        from . import shared_corpus as corpus_module
+
+        try:
+            corpus = corpus_module.attach_corpus(shared_corpus, expected_fingerprint=fingerprint)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Shared corpus not used: {e}")
+    if corpus is not None:
+        installed = corpus_module.use_shared_corpus(corpus)
+        if "sources" not in installed:
+            print(f"[WARN] Querier does not load via load_all_sources; {shared_corpus} sources not used")
+    else:
+        use_compiled_index()
+    _worker_querier = Querier()
+    if cache_size > 0:
+        _worker_querier = CachingQuerier(_worker_querier, max_entries=cache_size)
+
+
+def _execute_in_worker(request):
+    """
+    Execute a Querier request inside a process-pool worker.
+    """
+    return _worker_querier.execute(request)
 
 
 class TwoAgentOrchestrator:
@@ -21,7 +76,21 @@ class TwoAgentOrchestrator:
     4. Final synthesis from Analyzer
     """
 
-    def __init__(self, llm_manager, max_rounds: int = 5, verbose: bool = True):
+    def __init__(
+        self,
+        llm_manager,
+        max_rounds: int = 5,
+        verbose: bool = True,
+        parallel_workers: int = 1,
+        executor_type: str = "thread",
+        querier: Optional[Querier] = None,
+        cache_size: int = 0,
+        prefetch: bool = False,
+        stream_requests: bool = False,
+        tracer: Optional[Tracer] = None,
+        shared_corpus: Optional[str] = None,
+        context_budget: Optional[int] = None
+    ):
         """
         Initialize orchestrator.
 
@@ -29,14 +98,64 @@ class TwoAgentOrchestrator:
             llm_manager: LLM manager for Analyzer
             max_rounds: maximum rounds
             verbose: whether to print progress
+            parallel_workers: max Querier requests executed concurrently per round
+                (1 = series)
+            executor_type: "thread" (shares this Querier) or "process"
+                (each worker loads its own Querier once)
+            querier: already-loaded Querier to reuse (e.g. across a batch);
+                a new one is created when omitted
+            cache_size: LRU capacity of the Querier result cache (0 = off, the default)
+            prefetch: opt in to speculatively running likely next-round requests
+                while the Analyzer's LLM call is in flight (thread executor only)
+            stream_requests: opt in to streaming the Analyzer's LLM calls and
+                starting each next_requests element as soon as it arrives,
+                before the LLM finishes (streaming managers, thread executor only)
+            tracer: span recorder (e.g. one that already holds the Annif
+                fetch); a new one is created when omitted
+            shared_corpus: spec of a shared_corpus bundle ("<path>" or
+                "shm:<name>") that "process" workers attach to instead of
+                loading the sources themselves
+            context_budget: opt in to replacing the evidence context of the
+                Analyzer's round and final prompts with a deduplicated,
+                MMR-selected table of this many tokens (Annif top-2 pinned);
+                None keeps the Analyzer's own rendering
         """
+        if executor_type not in EXECUTOR_TYPES:
+            raise ValueError(f"executor_type must be one of {EXECUTOR_TYPES}, got {executor_type!r}")
+
         self.llm_manager = llm_manager
         self.max_rounds = max_rounds
         self.verbose = verbose
-
-        self.analyzer = Analyzer(llm_manager, max_rounds=max_rounds, verbose=verbose)
-        self.querier = Querier()
-
+        self.parallel_workers = max(1, parallel_workers)
+        self.executor_type = executor_type
+
+        # Metering wrapper: per-call prompt tokens, TTFT and prefix reuse for metadata;
+        # calls are streamed only when stream_requests asks for the chunks
+        self.tracer = tracer if tracer is not None else Tracer()
+        self.context = None
+        if context_budget is not None:
+            self.context = BudgetedContextLLM(llm_manager, budget_tokens=context_budget, sections=self._context_sections)
+        self.llm = MeteredLLM(self.context or llm_manager, measure_ttft=stream_requests, tracer=self.tracer)
+        self.analyzer = Analyzer(self.llm, max_rounds=max_rounds, verbose=verbose)
+        self.cache_size = cache_size
+        self.shared_corpus = shared_corpus
+        if querier is None:
+            use_compiled_index()
+            querier = Querier()
+        self.querier = querier
+        if cache_size > 0 and not isinstance(self.querier, CachingQuerier):
+            self.querier = CachingQuerier(self.querier, max_entries=cache_size)
+
+        self.prefetch = prefetch
+        self.stream_requests = stream_requests
+        self.prefetcher = None
+        if (prefetch or stream_requests) and executor_type == "thread":
+            self.prefetcher = SpeculativePrefetcher(self.querier)
+        self._last_round: tuple = ([], [])
+
+        self._executor: Optional[Executor] = None
+        self._classify_start = 0.0
+        self._signals_since = None
         self.execution_log = []
 
     def classify(
@@ -55,29 +174,29 @@ class TwoAgentOrchestrator:
             Dict with final classification result and metadata
         """
         start_time = time.time()
+        self._classify_start = self.tracer.now()
+        self._signals_since = self._signal_snapshot()
+        if self.context is not None:
+            self.context.reset(annif_top2)
+        if self.prefetcher is not None:
+            self.prefetcher.clear()
 
         self._log(f"Starting two-agent classification for: {subject_text}")
         self._log(f"Annif top-2: {annif_top2}")
 
         # Initialize Analyzer
-        self.analyzer.initialize(subject_text, annif_top2)
+        self._traced("analyzer.initialize", self.analyzer.initialize, subject_text, annif_top2)
 
         # Plan initial round
         self._log("\n=== Round 0: Initial Planning ===")
-        initial_requests = self.analyzer.plan_initial_round()
+        self.llm.round = 0
+        self._listen_for_requests()
+        initial_requests = self._traced("analyzer.plan", self.analyzer.plan_initial_round)
+        self.llm.chunk_listener = None
         self._log(f"Analyzer planned {len(initial_requests)} initial request(s)")
 
         # Execute initial requests
-        for i, request in enumerate(initial_requests):
-            self._log(f"\nExecuting request {i+1}/{len(initial_requests)}")
-            self._log(f"  Numbers: {request.numbers}")
-            self._log(f"  Keywords: {request.keywords}")
-            self._log(f"  Sources: {request.sources}")
-
-            response = self.querier.execute(request)
-            self._log(f"  -> Got {len(response.hits)} hits")
-
-            self.analyzer.integrate_response(response)
+        self._execute_round(initial_requests)
 
         # Main loop
         round_num = 1
@@ -87,8 +206,12 @@ class TwoAgentOrchestrator:
             # Get last facet candidates (if any)
             facet_candidates = {}  # Could be extracted from last response
 
-            # Plan next round
-            next_requests = self.analyzer.plan_next_round(facet_candidates)
+            # Plan next round (speculative Querier probes run meanwhile)
+            self.llm.round = round_num
+            self._start_prefetch()
+            self._listen_for_requests()
+            next_requests = self._traced("analyzer.plan", self.analyzer.plan_next_round, facet_candidates)
+            self.llm.chunk_listener = None
 
             if not next_requests:
                 self._log("Analyzer decided to stop")
@@ -97,24 +220,122 @@ class TwoAgentOrchestrator:
             self._log(f"Analyzer planned {len(next_requests)} request(s)")
 
             # Execute requests
-            for i, request in enumerate(next_requests):
-                self._log(f"\nExecuting request {i+1}/{len(next_requests)}")
-                self._log(f"  Numbers: {request.numbers}")
-                self._log(f"  Keywords: {request.keywords}")
-                self._log(f"  Sources: {request.sources}")
-
-                response = self.querier.execute(request)
-                self._log(f"  -> Got {len(response.hits)} hits")
-
-                self.analyzer.integrate_response(response)
+            self._execute_round(next_requests)
 
             round_num += 1
 
         # Final synthesis
         self._log("\n=== Final Synthesis ===")
-        final_result = self.analyzer.synthesize_final()
+        self.llm.round = round_num
+        final_result = self._traced("analyzer.synthesize", self.analyzer.synthesize_final)
+
+        return self._build_result(subject_text, annif_top2, final_result, round_num, start_time)
+
+    async def aclassify(
+        self,
+        subject_text: str,
+        annif_top2: List[str],
+        executor: Optional[Executor] = None
+    ) -> Dict[str, Any]:
+        """
+        Asyncio-friendly variant of classify().
+
+        The Analyzer calls generate() synchronously, so its steps and the
+        Querier rounds run in an executor. Its LLM calls are awaited on this
+        loop as llm_manager.agenerate() when the manager provides one
+        (OpenRouterLLM: a pooled aiohttp session), so the HTTP
+        waits of many classifications overlap on one event loop; the
+        executor thread only parks until its call returns. At most as many
+        classifications make progress as the executor has threads (the
+        loop's default executor: min(32, CPUs + 4)); pass a larger
+        ThreadPoolExecutor to overlap more. Use one orchestrator per
+        in-flight classification (the Analyzer holds per-subject state) and
+        share the Querier via the `querier` argument.
+
+        Args:
+            subject_text: the subject to classify
+            annif_top2: Annif's top 2 DDC suggestions
+            executor: executor for the blocking steps (None = the loop's default)
 
+        Returns:
+            Dict with final classification result and metadata
+        """
+        loop = asyncio.get_running_loop()
+        self.llm.loop = loop
+        try:
+            start_time = time.time()
+            self._classify_start = self.tracer.now()
+            self._signals_since = self._signal_snapshot()
+            if self.context is not None:
+                self.context.reset(annif_top2)
+            if self.prefetcher is not None:
+                self.prefetcher.clear()
+
+            self._log(f"Starting two-agent classification for: {subject_text}")
+            self._log(f"Annif top-2: {annif_top2}")
+
+            await loop.run_in_executor(
+                executor, self._traced, "analyzer.initialize", self.analyzer.initialize, subject_text, annif_top2
+            )
+
+            self._log("\n=== Round 0: Initial Planning ===")
+            self.llm.round = 0
+            self._listen_for_requests()
+            initial_requests = await loop.run_in_executor(
+                executor, self._traced, "analyzer.plan", self.analyzer.plan_initial_round
+            )
+            self.llm.chunk_listener = None
+            self._log(f"Analyzer planned {len(initial_requests)} initial request(s)")
+
+            await loop.run_in_executor(executor, self._execute_round, initial_requests)
+
+            round_num = 1
+            while round_num <= self.max_rounds:
+                self._log(f"\n=== Round {round_num} ===")
+
+                facet_candidates = {}
+                self.llm.round = round_num
+                self._start_prefetch()
+                self._listen_for_requests()
+                next_requests = await loop.run_in_executor(
+                    executor, self._traced, "analyzer.plan", self.analyzer.plan_next_round, facet_candidates
+                )
+                self.llm.chunk_listener = None
+
+                if not next_requests:
+                    self._log("Analyzer decided to stop")
+                    break
+
+                self._log(f"Analyzer planned {len(next_requests)} request(s)")
+                await loop.run_in_executor(executor, self._execute_round, next_requests)
+
+                round_num += 1
+
+            self._log("\n=== Final Synthesis ===")
+            self.llm.round = round_num
+            final_result = await loop.run_in_executor(
+                executor, self._traced, "analyzer.synthesize", self.analyzer.synthesize_final
+            )
+
+            return self._build_result(subject_text, annif_top2, final_result, round_num, start_time)
+        finally:
+            self.llm.loop = None
+
+    def _build_result(
+        self,
+        subject_text: str,
+        annif_top2: List[str],
+        final_result: Dict[str, Any],
+        round_num: int,
+        start_time: float
+    ) -> Dict[str, Any]:
+        """
+        Assemble the classification result and metadata.
+        """
         elapsed = time.time() - start_time
+        self.tracer.add_span("classify", self._classify_start, self.tracer.now() - self._classify_start,
+                             "orchestrator", {"rounds": round_num})
+        trace_summary = self.tracer.summary()
 
         # Build complete result
         result = {
@@ -130,7 +351,12 @@ class TwoAgentOrchestrator:
                 "rounds_executed": round_num,
                 "elapsed_seconds": round(elapsed, 2),
                 "memory_stats": self.analyzer.get_memory_stats(),
-                "querier_stats": self.querier.get_stats(),
+                "querier_stats": self._querier_stats(),
+                "llm_usage": self.llm.get_stats(),
+                "prefetch_stats": self.prefetcher.get_stats() if self.prefetcher else None,
+                "context_budget": self.context.calls if self.context is not None else None,
+                "trace_summary": trace_summary,
+                "time_breakdown": _time_breakdown(trace_summary),
                 "relevance_history": self.analyzer.state.relevance_history,
                 "facets": self.analyzer.state.facets
             }
@@ -143,6 +369,192 @@ class TwoAgentOrchestrator:
 
         return result
 
+    def _signal_snapshot(self):
+        """
+        Signal profiler counters at the start of a subject (None without a cache).
+        """
+        if isinstance(self.querier, CachingQuerier):
+            return self.querier.signal_snapshot()
+        return None
+
+    def _querier_stats(self) -> Dict[str, Any]:
+        """
+        Querier stats with signal statistics limited to the current subject.
+        """
+        if isinstance(self.querier, CachingQuerier):
+            return self.querier.get_stats(signals_since=self._signals_since)
+        return self.querier.get_stats()
+
+    def _execute_round(self, requests: List[Any]):
+        """
+        Execute one round of Querier requests and integrate the responses.
+
+        With parallel_workers > 1 the requests are fanned out to the executor,
+        so round latency tracks the slowest request. Responses are always
+        integrated in request order, keeping Analyzer memory deterministic.
+
+        Args:
+            requests: QuerierRequest list planned by the Analyzer
+        """
+        if self.parallel_workers == 1 or len(requests) <= 1:
+            responses = []
+            for i, request in enumerate(requests):
+                self._log_request(i, len(requests), request)
+
+                with self.tracer.span("querier.wait", "querier", request=i):
+                    response = self._execute_request(request)
+                self._log(f"  -> Got {len(response.hits)} hits")
+
+                self._integrate(response)
+                responses.append(response)
+            self._last_round = (requests, responses)
+            return
+
+        executor = self._get_executor()
+        futures = []
+        for i, request in enumerate(requests):
+            self._log_request(i, len(requests), request)
+            if self.executor_type == "process":
+                futures.append(executor.submit(_execute_in_worker, request))
+            else:
+                futures.append(executor.submit(self._execute_request, request))
+
+        # Integrate in planning order regardless of completion order
+        responses = []
+        for i, future in enumerate(futures):
+            with self.tracer.span("querier.wait", "querier", request=i):
+                response = future.result()
+            self._log(f"  -> Request {i+1}/{len(requests)}: got {len(response.hits)} hits")
+
+            self._integrate(response)
+            responses.append(response)
+        self._last_round = (requests, responses)
+
+    def _integrate(self, response: Any):
+        """
+        Hand a response to the Analyzer (and to the budgeted context, when on).
+        """
+        self._traced("analyzer.integrate", self.analyzer.integrate_response, response)
+        if self.context is not None:
+            self.context.add_response(response)
+
+    def _context_sections(self) -> Dict[str, str]:
+        """
+        Facets and relevance trend placed before the budgeted evidence table.
+        """
+        state = self.analyzer.state
+        return {
+            "Facets": json.dumps(state.facets, ensure_ascii=False),
+            "Relevance trend": ", ".join(f"{r:.2f}" for r in state.relevance_history) or "none yet",
+        }
+
+    def _execute_request(self, request: Any):
+        """
+        Execute one request, taking over a matching speculative probe if any.
+        """
+        with self.tracer.span("querier.execute", "querier", sources=list(request.sources or [])) as args:
+            response = self.prefetcher.take(request) if self.prefetcher is not None else None
+            args["prefetched"] = response is not None
+            if response is None:
+                response = self.querier.execute(request)
+            args["hits"] = len(response.hits)
+            args["hits_per_source"] = _hits_per_source(response)
+        return response
+
+    def _traced(self, name: str, fn, *args):
+        """
+        Run fn(*args) inside a tracer span tagged with the current round.
+        """
+        with self.tracer.span(name, "analyzer", round=self.llm.round):
+            return fn(*args)
+
+    def _start_prefetch(self):
+        """
+        Start a round on the prefetcher: launch speculative probes derived from
+        the last round's best schedule hit (prefetch mode) and drop what is left.
+        """
+        if self.prefetcher is None:
+            return
+        requests, responses = self._last_round
+        probes = []
+        if self.prefetch and requests:
+            probes = speculative_requests(
+                best_schedule_number(responses),
+                self.analyzer.state.facets,
+                template=requests[0]
+            )
+        # Runs in stream-only mode too, so untaken streamed requests do not pile up
+        self.prefetcher.start(probes)
+
+    def _listen_for_requests(self):
+        """
+        Feed the next LLM stream to a fresh parser; each next_requests element
+        is started on the prefetcher as soon as its closing brace arrives.
+        """
+        if self.prefetcher is None or not self.stream_requests:
+            return
+        parser = NextRequestsParser()
+        fields = {f.name for f in dataclasses.fields(QuerierRequest)}
+
+        def on_chunk(chunk: str):
+            for element in parser.feed(chunk):
+                try:
+                    request = QuerierRequest(**{k: v for k, v in element.items() if k in fields})
+                except (TypeError, ValueError):
+                    continue
+                self.prefetcher.add(request)
+
+        self.llm.chunk_listener = on_chunk
+
+    def _log_request(self, index: int, total: int, request: Any):
+        """
+        Log the parameters of a Querier request.
+        """
+        self._log(f"\nExecuting request {index+1}/{total}")
+        self._log(f"  Numbers: {request.numbers}")
+        self._log(f"  Keywords: {request.keywords}")
+        self._log(f"  Sources: {request.sources}")
+
+    def _get_executor(self) -> Executor:
+        """
+        Lazily create the request executor (reused across rounds and subjects).
+        """
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.parallel_workers,
+                    initializer=_init_worker_querier,
+                    initargs=(self.cache_size, self.shared_corpus, self._source_fingerprint())
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.parallel_workers,
+                    thread_name_prefix="querier"
+                )
+        return self._executor
+
+    def _source_fingerprint(self) -> Optional[str]:
+        """
+        Fingerprint of the current source data, checked by workers against the shared corpus.
+        """
+        if not self.shared_corpus:
+            return None
+        try:
+            data_dir = find_data_processed_dir()
+            return source_fingerprint(data_dir) if data_dir else None
+        except OSError:
+            return None
+
+    def close(self):
+        """
+        Shut down the request and prefetch executors, if started.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
     def _log(self, message: str):
         """
         Log a message if verbose is enabled.
@@ -162,13 +574,52 @@ class TwoAgentOrchestrator:
         return self.execution_log
 
 
+def _hits_per_source(response) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for hit in response.hits:
+        counts[hit.doc.source] = counts.get(hit.doc.source, 0) + 1
+    return counts
+
+
+def _time_breakdown(trace_summary: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """
+    Where the time went: LLM calls, Querier requests, memory integration, and
+    Analyzer work outside the LLM call (prompt building, JSON parsing).
+
+    querier_ms is always the wall-clock time the main thread spent waiting for
+    Querier responses; querier_worker_ms sums per-request execution time, which
+    exceeds the wait when requests run in parallel (not traced inside
+    "process" workers).
+    """
+    def total(name: str) -> float:
+        return trace_summary.get(name, {}).get("total_ms", 0.0)
+
+    analyzer = total("analyzer.initialize") + total("analyzer.plan") + total("analyzer.synthesize")
+    return {
+        "total_ms": total("classify"),
+        "llm_ms": total("llm.generate"),
+        "querier_ms": total("querier.wait"),
+        "querier_worker_ms": total("querier.execute"),
+        "integrate_ms": total("analyzer.integrate"),
+        "analyzer_local_ms": round(max(0.0, analyzer - total("llm.generate")), 3),
+    }
+
+
 # Convenience function for easy usage
 def classify_subject(
     subject_text: str,
     annif_top2: List[str],
     llm_manager,
     max_rounds: int = 5,
-    verbose: bool = True
+    verbose: bool = True,
+    parallel_workers: int = 1,
+    executor_type: str = "thread",
+    querier: Optional[Querier] = None,
+    cache_size: int = 0,
+    prefetch: bool = False,
+    stream_requests: bool = False,
+    tracer: Optional[Tracer] = None,
+    context_budget: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Convenience function to classify a subject using the two-agent system.
@@ -179,6 +630,60 @@ def classify_subject(
         llm_manager: LLM manager instance
         max_rounds: maximum rounds
         verbose: whether to print progress
+        parallel_workers: max Querier requests executed concurrently per round
+        executor_type: "thread" or "process"
+        querier: already-loaded Querier to reuse
+        cache_size: LRU capacity of the Querier result cache (0 = off, the default)
+        prefetch: opt in to speculatively running likely next-round requests during LLM calls
+        stream_requests: opt in to starting streamed next_requests before the LLM finishes
+        tracer: span recorder to extend (e.g. holding the Annif fetch span)
+        context_budget: opt in to a token-budgeted evidence context in the Analyzer's prompts
+
+    Returns:
+        Classification result dict
+    """
+    orchestrator = TwoAgentOrchestrator(
+        llm_manager=llm_manager,
+        max_rounds=max_rounds,
+        verbose=verbose,
+        parallel_workers=parallel_workers,
+        executor_type=executor_type,
+        querier=querier,
+        cache_size=cache_size,
+        prefetch=prefetch,
+        stream_requests=stream_requests,
+        tracer=tracer,
+        context_budget=context_budget
+    )
+
+    try:
+        return orchestrator.classify(subject_text, annif_top2)
+    finally:
+        orchestrator.close()
+
+
+async def aclassify_subject(
+    subject_text: str,
+    annif_top2: List[str],
+    llm_manager,
+    max_rounds: int = 5,
+    verbose: bool = False,
+    querier: Optional[Querier] = None,
+    cache_size: int = 0,
+    executor: Optional[Executor] = None
+) -> Dict[str, Any]:
+    """
+    Async convenience function; run many with asyncio.gather() sharing one Querier.
+
+    Args:
+        subject_text: the subject to classify
+        annif_top2: Annif's top 2 DDC suggestions
+        llm_manager: LLM manager instance
+        max_rounds: maximum rounds
+        verbose: whether to print progress
+        querier: already-loaded Querier to reuse
+        cache_size: LRU capacity of the Querier result cache (0 = off, the default)
+        executor: executor for the blocking Analyzer/Querier steps (None = the loop's default)
 
     Returns:
         Classification result dict
@@ -186,7 +691,12 @@ def classify_subject(
     orchestrator = TwoAgentOrchestrator(
         llm_manager=llm_manager,
         max_rounds=max_rounds,
-        verbose=verbose
+        verbose=verbose,
+        querier=querier,
+        cache_size=cache_size
     )
 
-    return orchestrator.classify(subject_text, annif_top2)
\ No newline at end of file
+    try:
+        return await orchestrator.aclassify(subject_text, annif_top2, executor)
+    finally:
+        orchestrator.close()
@@ -0,0 +1,198 @@
+"""
+Speculative Querier prefetch while the Analyzer's LLM call is in flight.
+
+During plan_next_round() the Querier is idle for the whole LLM call. Most
+next-round requests are predictable from the current best number: its
+parent, its children / standard subdivisions, and T1/T2 probes for the
+detected facets. SpeculativePrefetcher runs those probes in the background
+(filling the CachingQuerier) and hands the result straight to the
+orchestrator when the Analyzer asks for the same request. The same
+machinery starts requests parsed from the LLM stream ("streamed" kind, see
+stream_json.py) before the response is complete.
+
+Probes reuse the previous round's request as a template (same sources,
+limits, options and keywords), since the Analyzer tends to keep those
+stable between rounds; requests match on canonical_request_key().
+"""
+import dataclasses
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Hashable
+
+from .query_cache import canonical_request_key
+
+
+SCHEDULE_SOURCES = ("Sch2", "Sch3", "Sch2_ranges", "Sch3_ranges")
+
+# Facets probed against each table: T1 form/time/audience, T2 geography
+FACET_TABLES = {"form": "T1", "time": "T1", "audience": "T1", "geo": "T2"}
+
+
+def parent_number(ddc_number: str) -> Optional[str]:
+    """
+    Parent notation: one digit shorter ("005.13" -> "005.1", "005.1" -> "005", "342" -> "340").
+    """
+    number = ddc_number.strip()
+    if "." in number:
+        base, decimals = number.split(".", 1)
+        return f"{base}.{decimals[:-1]}" if len(decimals) > 1 else base
+    if len(number) == 3 and number.isdigit():
+        if number[2] != "0":
+            return number[:2] + "0"
+        if number[1] != "0":
+            return number[0] + "00"
+    return None
+
+
+def best_schedule_number(responses: List[Any]) -> Optional[str]:
+    """
+    Highest-scoring schedule hit across a round's responses (synthesis proxy).
+    """
+    best: Tuple[float, Optional[str]] = (-1.0, None)
+    for response in responses:
+        for hit in response.hits:
+            if hit.doc.source in SCHEDULE_SOURCES and hit.score > best[0]:
+                best = (hit.score, hit.doc.ddc_number)
+    return best[1]
+
+
+def speculative_requests(
+    ddc_number: Optional[str],
+    facets: Dict[str, Any],
+    template: Any,
+    max_probes: int = 4
+) -> List[Any]:
+    """
+    Predict likely next-round requests.
+
+    Args:
+        ddc_number: current best number (None = facet probes only)
+        facets: Analyzer facets (subject, discipline, geo, time, form, audience)
+        template: previous QuerierRequest, reused for sources/limits/options
+        max_probes: cap on returned requests
+
+    Returns:
+        QuerierRequest list (parent, children/std subdivisions, T1/T2 probes)
+    """
+    probes = []
+    if ddc_number and "-" not in ddc_number:
+        parent = parent_number(ddc_number)
+        if parent:
+            probes.append(dataclasses.replace(template, numbers=[parent]))
+
+        options = dict(template.options or {})
+        options["include_std_subdivisions"] = True
+        probes.append(dataclasses.replace(template, numbers=[ddc_number], options=options))
+
+    table_keywords: Dict[str, List[str]] = {}
+    for facet, table in FACET_TABLES.items():
+        value = (facets or {}).get(facet)
+        if isinstance(value, str) and value.strip():
+            table_keywords.setdefault(table, []).append(value.strip())
+    for table, keywords in sorted(table_keywords.items()):
+        probes.append(dataclasses.replace(template, numbers=[], keywords=keywords, sources=[table]))
+
+    return probes[:max_probes]
+
+
+class SpeculativePrefetcher:
+    """
+    Runs speculative probes in background threads and tracks whether they pay off.
+    """
+
+    def __init__(self, querier, max_workers: int = 2):
+        """
+        Args:
+            querier: (Caching)Querier shared with the orchestrator
+            max_workers: background threads for probes
+        """
+        self.querier = querier
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Hashable, Tuple[Future, str]] = {}
+        self._lock = threading.Lock()
+
+        # Per kind ("speculative" probes, "streamed" requests parsed from the LLM stream)
+        self.issued: Dict[str, int] = {"speculative": 0, "streamed": 0}
+        self.used: Dict[str, int] = {"speculative": 0, "streamed": 0}
+
+    def start(self, requests: List[Any]):
+        """
+        Launch speculative probes not already pending; replaces the previous round's probes.
+
+        Call once per round in every mode: whatever is still pending (untaken
+        probes and streamed requests) is dropped, so nothing carries over to
+        later rounds or subjects.
+        """
+        with self._lock:
+            previous = self._pending
+            self._pending = {}
+            for request in requests:
+                key = canonical_request_key(request)
+                if key in self._pending:
+                    continue
+                entry = previous.pop(key, None)
+                self._pending[key] = entry or self._submit(request, "speculative")
+            for future, _ in previous.values():
+                future.cancel()
+
+    def clear(self):
+        """
+        Drop every pending request (cancelling those not started yet).
+        """
+        self.start([])
+
+    def add(self, request: Any, kind: str = "streamed"):
+        """
+        Start one request early (e.g. parsed from the LLM stream) unless already pending.
+        """
+        key = canonical_request_key(request)
+        with self._lock:
+            if key not in self._pending:
+                self._pending[key] = self._submit(request, kind)
+
+    def _submit(self, request: Any, kind: str) -> Tuple[Future, str]:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prefetch")
+        self.issued[kind] = self.issued.get(kind, 0) + 1
+        return self._executor.submit(self.querier.execute, request), kind
+
+    def take(self, request: Any) -> Optional[Any]:
+        """
+        Response for a prefetched request (waiting if still running), else None.
+        """
+        with self._lock:
+            entry = self._pending.pop(canonical_request_key(request), None)
+        if entry is None or entry[0].cancelled():
+            return None
+        future, kind = entry
+        try:
+            response = future.result()
+        except Exception:
+            return None
+        with self._lock:
+            self.used[kind] = self.used.get(kind, 0) + 1
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Issued/used counts and hit rate per kind.
+        """
+        with self._lock:
+            return {
+                kind: {
+                    "issued": issued,
+                    "used": self.used.get(kind, 0),
+                    "hit_rate": round(self.used.get(kind, 0) / issued, 3) if issued else 0.0,
+                }
+                for kind, issued in self.issued.items()
+            }
+
+    def close(self):
+        with self._lock:
+            for future, _ in self._pending.values():
+                future.cancel()
+            self._pending = {}
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,323 @@
+"""
+Result cache for Querier.execute.
+
+The Analyzer re-issues nearly identical requests across rounds (e.g.
+["005", "620"], then ["005", "005.1"], or "005.30218" three times in one
+list), and batch runs over similar subjects repeat the same probes. The
+Querier is deterministic and stateless, so its responses can be cached.
+
+Requests are keyed on a canonical form: numbers/keywords/sources sorted and
+deduplicated, limits/options/facets serialized with sorted keys. With
+`split_sources` enabled each source is executed and cached separately, so a
+request for ["Sch2", "ManSc"] reuses the Sch2 part of an earlier
+["Sch2", "T1"] request.
+
+Callers get their own copy of the hits (and signal dicts), so edits never
+reach the cache; concurrent misses on the same key share one execution.
+"""
+import copy
+import json
+import time
+import threading
+import dataclasses
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Tuple, Hashable
+
+from .signal_profile import PROFILER, SignalProfiler
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def canonical_request_key(request: Any, sources: Optional[List[str]] = None) -> Tuple[Hashable, ...]:
+    """
+    Canonical, hashable form of a QuerierRequest.
+
+    Facets are part of the key because scoring reads them, and they carry the
+    subject text (facets["subject"]): entries are only reused by requests for
+    the same subject, e.g. repeated or prefetched requests within one run.
+
+    Args:
+        request: QuerierRequest
+        sources: override the request's sources (used for per-source entries)
+    """
+    numbers = tuple(sorted({str(n).strip() for n in (request.numbers or []) if str(n).strip()}))
+    keywords = tuple(sorted({k.strip().lower() for k in (request.keywords or []) if k and k.strip()}))
+    source_list = tuple(sorted(set(sources if sources is not None else (request.sources or []))))
+    return (
+        numbers,
+        keywords,
+        source_list,
+        _canonical_json(request.limits or {}),
+        _canonical_json(request.options or {}),
+        _canonical_json(request.facets or {}),
+    )
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with optional TTL.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CachingQuerier:
+    """
+    Querier wrapper that memoizes execute() results.
+
+    Exposes the same interface as Querier (execute, get_stats, all_sources,
+    ...); unknown attributes are forwarded to the wrapped Querier.
+    """
+
+    def __init__(
+        self,
+        querier,
+        max_entries: int = 512,
+        ttl_seconds: Optional[float] = None,
+        split_sources: bool = False,
+        profiler: Optional[SignalProfiler] = PROFILER
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            querier: Querier to wrap
+            max_entries: LRU capacity (whole requests, or per-source parts)
+            ttl_seconds: expire entries after this long (None = never)
+            split_sources: execute and cache each source separately, then
+                merge by score; lets partially overlapping requests share work
+            profiler: signal profiler fed by executed (uncached) requests;
+                None disables signal profiling
+        """
+        self.querier = querier
+        self.split_sources = split_sources
+        self.profiler = profiler
+        self.cache = LRUCache(max_entries, ttl_seconds)
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def __getattr__(self, name):
+        if name == "querier":
+            raise AttributeError(name)
+        return getattr(self.querier, name)
+
+    def execute(self, request):
+        """
+        Execute a QuerierRequest, serving it (or its per-source parts) from cache.
+        """
+        if not self.split_sources or len(request.sources or []) <= 1:
+            return _copy_response(self._get_or_execute(canonical_request_key(request), request))
+
+        sources = sorted(set(request.sources))
+        parts = [
+            self._get_or_execute(canonical_request_key(request, [source]), dataclasses.replace(request, sources=[source]))
+            for source in sources
+        ]
+        return _copy_response(_merge_responses(sources, parts, (request.limits or {}).get("max_docs")))
+
+    def _get_or_execute(self, key: Hashable, request):
+        """
+        Cached response for key; on a miss, execute once and share the result
+        with concurrent callers missing on the same key (single flight).
+        """
+        response = self.cache.get(key)
+        if response is not None:
+            return response
+
+        with self._lock:
+            # Re-check: an owner caches its result before leaving _in_flight
+            cached = key in self.cache
+            future = None if cached else self._in_flight.get(key)
+            owner = not cached and future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+            elif future is not None:
+                self.coalesced += 1
+        if cached:
+            response = self.cache.get(key)
+            # Evicted in between: go through the miss path again
+            return response if response is not None else self._get_or_execute(key, request)
+        if not owner:
+            return future.result()
+
+        try:
+            response = self._execute_profiled(request)
+            self.cache.put(key, response)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        future.set_result(response)
+        return response
+
+    def _execute_profiled(self, request):
+        """
+        Execute on the wrapped Querier; per-signal timings of this request go
+        to diagnostics["signal_profile"] and its hit signals to the profiler.
+        """
+        if self.profiler is None:
+            return self.querier.execute(request)
+
+        self.profiler.begin_request()
+        try:
+            response = self.querier.execute(request)
+        finally:
+            timings = self.profiler.end_request()
+        self.profiler.observe_hits(response.hits)
+        if timings and isinstance(response.diagnostics, dict):
+            response.diagnostics["signal_profile"] = timings
+        return response
+
+    def signal_snapshot(self) -> Optional[Dict[str, Dict[str, float]]]:
+        """
+        Profiler counters to pass to get_stats(signals_since=...), or None
+        when profiling is off.
+        """
+        return self.profiler.snapshot() if self.profiler is not None else None
+
+    def get_stats(self, signals_since: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Any]:
+        """
+        Wrapped Querier stats plus cache hit/miss counters under "cache" and
+        per-signal cost/value statistics under "signals".
+
+        Args:
+            signals_since: a signal_snapshot(); "signals" then covers only the
+                work recorded after it (e.g. one subject) instead of the
+                process lifetime of the shared profiler
+        """
+        stats = dict(self.querier.get_stats())
+        stats["cache"] = self.cache.get_stats()
+        stats["cache"]["coalesced"] = self.coalesced
+        if self.profiler is not None:
+            stats["signals"] = self.profiler.get_stats(since=signals_since)
+        return stats
+
+
+def _copy_hit(hit):
+    """
+    Copy of a hit with its own signals dict; the document is shared (read-only).
+    """
+    if dataclasses.is_dataclass(hit):
+        return dataclasses.replace(hit, signals=dict(hit.signals))
+    hit = copy.copy(hit)
+    hit.signals = dict(hit.signals)
+    return hit
+
+
+def _copy_response(response):
+    """
+    Copy handed to a caller: hits, signals, numbers, candidates and
+    diagnostics are its own, so edits never reach the cached response.
+    """
+    if not dataclasses.is_dataclass(response):
+        return copy.deepcopy(response)
+    changes = {
+        "hits": [_copy_hit(hit) for hit in response.hits],
+        "numbers_found": list(response.numbers_found),
+        "diagnostics": copy.deepcopy(response.diagnostics),
+    }
+    if getattr(response, "facet_candidates", None) is not None:
+        changes["facet_candidates"] = copy.deepcopy(response.facet_candidates)
+    return dataclasses.replace(response, **changes)
+
+
+def _merge_responses(sources: List[str], parts: List[Any], max_docs: Optional[int]):
+    """
+    Merge per-source responses: hits by score, numbers/candidates by union.
+
+    Diagnostics keep each source's own diagnostics under "per_source" and
+    recompute "top_signals" (mean signal values) over the merged hits.
+    """
+    hits = sorted((hit for part in parts for hit in part.hits), key=lambda h: h.score, reverse=True)
+    if max_docs:
+        hits = hits[:max_docs]
+
+    numbers_found = []
+    facet_candidates: Dict[str, List[Any]] = {}
+    diagnostics: Dict[str, Any] = {"per_source": {}}
+    for source, part in zip(sources, parts):
+        for number in part.numbers_found:
+            if number not in numbers_found:
+                numbers_found.append(number)
+        for facet, values in (getattr(part, "facet_candidates", None) or {}).items():
+            merged = facet_candidates.setdefault(facet, [])
+            for value in values:
+                if value not in merged:
+                    merged.append(value)
+        diagnostics["per_source"][source] = part.diagnostics
+
+    signal_totals: Dict[str, float] = {}
+    for hit in hits:
+        for name, value in hit.signals.items():
+            signal_totals[name] = signal_totals.get(name, 0.0) + value
+    diagnostics["top_signals"] = {
+        name: total / len(hits)
+        for name, total in sorted(signal_totals.items(), key=lambda x: x[1], reverse=True)
+    }
+
+    changes = {"hits": hits, "numbers_found": numbers_found, "diagnostics": diagnostics}
+    if hasattr(parts[0], "facet_candidates"):
+        changes["facet_candidates"] = facet_candidates
+    return dataclasses.replace(parts[0], **changes)
@@ -0,0 +1,264 @@
+"""
+Micro-batching SBERT query encoder shared by all requests in a process.
+
+A semantic request encodes its keywords and facet subject one text at a
+time, and parallel Querier workers, batch_classify.py and serve.py each do
+the same for their own subjects. Transformer inference on CPU is far
+cheaper per text in batches, so QueryEncoder collects the texts submitted
+by concurrent callers within a short window (max_wait_ms, or until
+max_batch texts are queued), encodes them in one model.encode() call and
+hands each caller its own row.
+
+Identical texts share one encoding: finished ones come from an LRU of query
+embeddings, in-flight ones join the pending result. Returned vectors are
+normalized float32 and read-only, since cached rows are shared between
+callers.
+
+Usage:
+    encoder = get_query_encoder("all-MiniLM-L6-v2")
+    vec = encoder.encode("constitutional law")
+    vecs = encoder.encode_many(["constitutional law", "library science"])   # (2, dim)
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+from .query_cache import LRUCache
+
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Queue sentinel: stop the worker thread
+_STOP = object()
+
+
+class QueryEncoder:
+    """
+    Encodes query texts in micro-batches on a background thread, with an LRU
+    of finished embeddings.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        cache_size: int = 4096,
+        model: Any = None
+    ):
+        """
+        Args:
+            model_name: SentenceTransformer model (loaded via embeddings.get_sentence_model)
+            max_batch: most texts per model.encode() call
+            max_wait_ms: how long the first queued text waits for others to join its batch
+            cache_size: query embeddings kept in the LRU (0 disables it)
+            model: already loaded model with a SentenceTransformer-style encode()
+        """
+        self.model_name = model_name
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.cache = LRUCache(max_entries=cache_size) if cache_size > 0 else None
+        self._model = model
+
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Dict[str, Future] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.encoded = 0
+        self.max_batch_seen = 0
+        self.encode_seconds = 0.0
+        self.errors = 0
+
+    def _get_model(self):
+        if self._model is None:
+            # sentence-transformers only loads when the first batch is encoded
+            from .embeddings import get_sentence_model
+            self._model = get_sentence_model(self.model_name)
+        return self._model
+
+    def _ensure_worker(self):
+        # Called with self._lock held. A forked process worker inherits the
+        # encoder but not its thread, so it starts a fresh queue of its own.
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._pending = {}
+            self._thread = None
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name="query-encoder", daemon=True)
+            self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Future for the embedding of one text (already resolved on a cache hit).
+        """
+        future: Future
+        with self._lock:
+            self.requests += 1
+            cached = self.cache.get(text) if self.cache is not None else None
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+                return future
+
+            future = self._pending.get(text)
+            if future is not None:
+                self.coalesced += 1
+                return future
+
+            future = Future()
+            self._pending[text] = future
+            self._ensure_worker()
+            self._queue.put(text)
+            return future
+
+    def encode(self, text: str) -> np.ndarray:
+        """
+        Normalized float32 embedding of one query text.
+        """
+        return self.submit(text).result()
+
+    def encode_many(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        (len(texts), dim) embeddings; the texts are queued together, so they
+        share a batch with each other and with any concurrent callers.
+        """
+        futures = [self.submit(text) for text in texts]
+        if not futures:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([future.result() for future in futures])
+
+    def _collect(self, work: "queue.Queue", first: Any) -> List[Any]:
+        """
+        The first text plus whatever arrives within the window, up to max_batch.
+        """
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = work.get(timeout=remaining) if remaining > 0 else work.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self, work: "queue.Queue"):
+        while True:
+            first = work.get()
+            if first is _STOP:
+                return
+            batch = self._collect(work, first)
+            stop = batch[-1] is _STOP
+            texts = [text for text in batch if text is not _STOP]
+            self._encode_batch(texts)
+            if stop:
+                return
+
+    def _encode_batch(self, texts: List[str]):
+        """
+        Encode one batch and resolve its futures; every pending future popped
+        here gets a result or an exception, whatever fails (model, row count,
+        cache or stats).
+        """
+        start = time.perf_counter()
+        matrix = None
+        error: Optional[BaseException] = None
+        futures: Optional[List[Optional[Future]]] = None
+        try:
+            try:
+                matrix = self._get_model().encode(
+                    texts,
+                    batch_size=len(texts),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
+                matrix = np.asarray(matrix, dtype=np.float32)
+                if matrix.ndim != 2 or matrix.shape[0] != len(texts):
+                    raise RuntimeError(f"encoder returned shape {matrix.shape} for {len(texts)} texts")
+                matrix.flags.writeable = False
+            except Exception as e:
+                error = e
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                futures = [self._pending.pop(text, None) for text in texts]
+                self.batches += 1
+                self.encoded += len(texts)
+                self.max_batch_seen = max(self.max_batch_seen, len(texts))
+                self.encode_seconds += elapsed
+                if error is not None:
+                    self.errors += 1
+                elif self.cache is not None:
+                    for text, row in zip(texts, matrix):
+                        self.cache.put(text, row)
+        except Exception as e:
+            error = e
+        finally:
+            if futures is None:
+                with self._lock:
+                    futures = [self._pending.pop(text, None) for text in texts]
+            for i, future in enumerate(futures):
+                if future is None or future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(matrix[i])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Request, coalescing, batch-size and cache counters.
+        """
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "batches": self.batches,
+                "encoded": self.encoded,
+                "mean_batch": round(self.encoded / self.batches, 2) if self.batches else 0.0,
+                "max_batch": self.max_batch_seen,
+                "encode_ms_per_text": round(self.encode_seconds * 1000 / self.encoded, 3) if self.encoded else 0.0,
+                "errors": self.errors,
+                "cache": self.cache.get_stats() if self.cache is not None else None,
+            }
+
+    def close(self):
+        """
+        Stop the background thread after the texts already queued are encoded.
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            if thread is not None and os.getpid() == self._pid:
+                self._queue.put(_STOP)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+_ENCODERS: Dict[str, QueryEncoder] = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def get_query_encoder(model_name: str = DEFAULT_MODEL, **kwargs) -> QueryEncoder:
+    """
+    The process-wide QueryEncoder for a model (created on first use with kwargs).
+    """
+    with _ENCODERS_LOCK:
+        if model_name not in _ENCODERS:
+            _ENCODERS[model_name] = QueryEncoder(model_name, **kwargs)
+        return _ENCODERS[model_name]
@@ -8,12 +8,7 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# Import everything we need
-from detective_systemv3.retrieval.loaders import load_all_sources
-from detective_systemv3.retrieval.search import DDCSearchEngine
-from detective_systemv3.agents.querier import Querier
-from detective_systemv3.retrieval.schemas import QuerierRequest
-from detective_system.omikuji import get_suggestions
+from detective_systemv3.suggestions import get_backend
 
 
 def quick_classify(subject_text, annif_top2=None):
@@ -22,10 +17,19 @@ def quick_classify(subject_text, annif_top2=None):
 
     This is useful for testing the retrieval engine without needing an LLM.
     """
+    # Retrieval stack imported on first use so the usage message starts instantly
+    from detective_systemv3.agents.querier import Querier
+    from detective_systemv3.retrieval.schemas import QuerierRequest
+    from detective_systemv3.source_index import use_compiled_index
+
     if annif_top2 is None:
-        # Required: get Annif suggestions via Docker (no fallback)
+        # Required: get Annif suggestions from $ANNIF_BACKEND (default: Docker; no fallback)
         try:
-            suggestions = get_suggestions(subject_text, limit=2, use_docker=True)
+            backend = get_backend()
+            try:
+                suggestions = backend.suggest(subject_text, limit=2)
+            finally:
+                backend.close()
             if len(suggestions) >= 2:
                 annif_top2 = [suggestions[0].notation, suggestions[1].notation]
                 print(f"[Annif] Got top-2: {annif_top2} (scores: {suggestions[0].score:.3f}, {suggestions[1].score:.3f})")
@@ -36,7 +40,7 @@ def quick_classify(subject_text, annif_top2=None):
                 print("[ERROR] Annif returned no suggestions.")
                 sys.exit(1)
         except RuntimeError as e:
-            print(f"[ERROR] Annif Docker failed: {e}")
+            print(f"[ERROR] Annif backend failed: {e}")
             print("Ensure 'annif-omikuji:latest' is built: cd D:\\Projects\\Annif pro && python annifctl.py build")
             sys.exit(1)
 
@@ -49,6 +53,7 @@ def quick_classify(subject_text, annif_top2=None):
 
     # Initialize Querier
     print("[*] Loading DDC sources...")
+    use_compiled_index()  # memory-mapped index instead of parsing the JSON
     querier = Querier()
     print(f"[+] Loaded {len(querier.all_sources)} source types\n")
     print()
@@ -169,4 +174,4 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Error: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
@@ -0,0 +1,298 @@
+"""
+Interval tree and notation trie for DDC range coverage and prefix lookups.
+
+DDC notations are normalized to keys: (table, digits), e.g. "331.381" ->
+("", "331381"), "T1--0922" -> ("T1", "0922"). Keys compare as strings, so a
+shorter key is the ancestor of every longer key that starts with it.
+
+Ranges become half-open intervals [lo, succ(hi)) over keys, where succ
+increments the last digit with carry ("008" -> "009", "099" -> "1"). That
+gives the loose-span semantics of the range schedules: "001-008" covers
+001, 005.1, 008.9 but not 009. Shorthand right bounds ("920.03-.09") are
+expanded, descending bounds ("822.3301-822.2") swapped, and malformed right
+bounds ("220.1-220.Summary") are kept as explicit prefix entries covering
+every number under the left bound.
+
+Range coverage is an O(log n + k) stab of a static centered interval tree;
+prefix / parent lookups walk a trie in O(len(key) + k).
+"""
+import re
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Iterable
+
+from .retrieval.schemas import DDCDoc
+
+
+RANGE_SOURCES = ("Sch2_ranges", "Sch3_ranges", "ManSc", "ManSc_flow", "ManTB", "ManTB_flow")
+
+_TABLE_RE = re.compile(r"^\s*(T\d[A-C]?)\s*-+\s*", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"^\d+(\.\d*)?$")
+_UNBOUNDED = "\uffff"  # sorts after every digit key
+
+Key = Tuple[str, str]
+
+
+def notation_key(notation: str) -> Optional[Key]:
+    """
+    Normalize a single DDC notation to (table, digits).
+
+    Returns:
+        Key, or None if the notation is not a plain number
+    """
+    if not notation:
+        return None
+    table = ""
+    match = _TABLE_RE.match(notation)
+    if match:
+        table = match.group(1).upper()
+        notation = notation[match.end():]
+    notation = notation.strip().rstrip(".")
+    if not _NUMBER_RE.match(notation):
+        return None
+    return table, notation.replace(".", "")
+
+
+def key_successor(digits: str) -> str:
+    """
+    Smallest key greater than every key starting with `digits`.
+
+    Returns _UNBOUNDED for all-nines (nothing sorts after it).
+    """
+    stripped = digits.rstrip("9")
+    if not stripped:
+        return _UNBOUNDED
+    return stripped[:-1] + str(int(stripped[-1]) + 1)
+
+
+def parse_range_key(notation: str) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    Parse a range notation into (table, lo, hi_exclusive).
+
+    hi_exclusive is None for a malformed right bound, meaning "prefix
+    coverage under lo". Returns None when the notation is not a range.
+    """
+    if not notation:
+        return None
+    text = notation.strip()
+    table = ""
+    match = _TABLE_RE.match(text)
+    if match:
+        table = match.group(1).upper()
+        text = text[match.end():]
+
+    if "-" not in text:
+        return None
+    left, right = (part.strip() for part in text.split("-", 1))
+    right = _TABLE_RE.sub("", right)
+
+    left_key = notation_key(left)
+    if left_key is None:
+        return None
+    lo = left_key[1]
+
+    # Shorthand right bound: "920.03-.09" -> "920.09"
+    if right.startswith(".") and "." in left:
+        right = left.split(".", 1)[0] + right
+
+    right_key = notation_key(right)
+    if right_key is None or not right_key[1]:
+        return table, lo, None
+
+    hi = right_key[1]
+    if hi < lo and not lo.startswith(hi):
+        lo, hi = hi, lo
+    return table, lo, key_successor(hi)
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over half-open string intervals [lo, hi).
+    """
+
+    __slots__ = ("center", "by_lo", "by_hi", "left", "right")
+
+    def __init__(self, intervals: List[Tuple[str, str, Any]]):
+        endpoints = sorted(lo for lo, _, _ in intervals)
+        self.center = endpoints[len(endpoints) // 2]
+
+        here, left, right = [], [], []
+        for interval in intervals:
+            lo, hi, _ = interval
+            if hi <= self.center:
+                left.append(interval)
+            elif lo > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        self.by_lo = sorted(here, key=lambda x: x[0])
+        self.by_hi = sorted(here, key=lambda x: x[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    @classmethod
+    def build(cls, intervals: Iterable[Tuple[str, str, Any]]) -> Optional["IntervalTree"]:
+        intervals = list(intervals)
+        return cls(intervals) if intervals else None
+
+    def stab(self, point: str) -> List[Any]:
+        """
+        Payloads of all intervals containing `point`.
+        """
+        found = []
+        node = self
+        while node is not None:
+            if point < node.center:
+                # Every interval here ends after center > point: check starts only
+                for lo, _, payload in node.by_lo:
+                    if lo > point:
+                        break
+                    found.append(payload)
+                node = node.left
+            else:
+                # Every interval here starts at or before center <= point: check ends only
+                for _, hi, payload in node.by_hi:
+                    if hi <= point:
+                        break
+                    found.append(payload)
+                node = node.right
+        return found
+
+
+class NotationTrie:
+    """
+    Digit trie over normalized notation keys.
+    """
+
+    __slots__ = ("root",)
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+
+    def insert(self, digits: str, payload: Any):
+        node = self.root
+        for ch in digits:
+            node = node.setdefault(ch, {})
+        node.setdefault(None, []).append(payload)
+
+    def ancestors(self, digits: str) -> List[Any]:
+        """
+        Payloads stored at `digits` or any prefix of it (parents first).
+        """
+        found = []
+        node = self.root
+        found.extend(node.get(None, ()))
+        for ch in digits:
+            node = node.get(ch)
+            if node is None:
+                break
+            found.extend(node.get(None, ()))
+        return found
+
+    def descendants(self, digits: str, limit: Optional[int] = None) -> List[Any]:
+        """
+        Payloads stored at `digits` or under it (shorter keys first).
+        """
+        node = self.root
+        for ch in digits:
+            node = node.get(ch)
+            if node is None:
+                return []
+
+        found = []
+        level = [node]
+        while level and (limit is None or len(found) < limit):
+            next_level = []
+            for current in level:
+                found.extend(current.get(None, ()))
+                next_level.extend(child for ch, child in sorted(current.items(), key=lambda x: x[0] or "") if ch is not None)
+            level = next_level
+        return found[:limit] if limit is not None else found
+
+
+class RangeIndex:
+    """
+    Range and prefix lookups over loaded sources.
+
+    Payloads are (source, position) pairs indexing into the sources mapping
+    the index was built from.
+    """
+
+    def __init__(self):
+        self._intervals: Dict[str, Optional[IntervalTree]] = {}
+        self._prefix_ranges: Dict[str, NotationTrie] = {}
+        self._numbers: Dict[str, NotationTrie] = {}
+
+    @classmethod
+    def build(cls, all_sources: Dict[str, Sequence[DDCDoc]], range_sources: Sequence[str] = RANGE_SOURCES) -> "RangeIndex":
+        """
+        Index every document: ranges into interval trees (per table),
+        malformed ranges into prefix tries, plain numbers into notation tries.
+        """
+        index = cls()
+        intervals: Dict[str, List[Tuple[str, str, Any]]] = {}
+
+        for source, docs in all_sources.items():
+            for pos, doc in enumerate(docs):
+                payload = (source, pos)
+                parsed = parse_range_key(doc.ddc_number) if source in range_sources else None
+                if parsed is not None:
+                    table, lo, hi = parsed
+                    if hi is None:
+                        index._prefix_ranges.setdefault(table, NotationTrie()).insert(lo, payload)
+                    else:
+                        intervals.setdefault(table, []).append((lo, hi, payload))
+                    continue
+
+                key = notation_key(doc.ddc_number)
+                if key is not None:
+                    index._numbers.setdefault(key[0], NotationTrie()).insert(key[1], payload)
+
+        index._intervals = {table: IntervalTree.build(items) for table, items in intervals.items()}
+        return index
+
+    def covering(self, number: str, sources: Optional[Sequence[str]] = None) -> List[Tuple[str, int]]:
+        """
+        Range documents covering `number` (interval ranges and prefix fallbacks).
+        """
+        key = notation_key(number)
+        if key is None:
+            return []
+        table, digits = key
+
+        found = []
+        tree = self._intervals.get(table)
+        if tree is not None:
+            found.extend(tree.stab(digits))
+        trie = self._prefix_ranges.get(table)
+        if trie is not None:
+            found.extend(trie.ancestors(digits))
+        return _filter_sources(found, sources)
+
+    def with_prefix(self, number: str, sources: Optional[Sequence[str]] = None, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Documents whose notation is `number` or starts with it (children).
+        """
+        key = notation_key(number)
+        trie = self._numbers.get(key[0]) if key else None
+        if trie is None:
+            return []
+        found = trie.descendants(key[1], None if sources else limit)
+        found = _filter_sources(found, sources)
+        return found[:limit] if limit is not None else found
+
+    def ancestors(self, number: str, sources: Optional[Sequence[str]] = None) -> List[Tuple[str, int]]:
+        """
+        Documents whose notation is a prefix of `number` (parents, then itself).
+        """
+        key = notation_key(number)
+        trie = self._numbers.get(key[0]) if key else None
+        if trie is None:
+            return []
+        return _filter_sources(trie.ancestors(key[1]), sources)
+
+
+def _filter_sources(found: List[Tuple[str, int]], sources: Optional[Sequence[str]]) -> List[Tuple[str, int]]:
+    if not sources:
+        return found
+    allowed = set(sources)
+    return [payload for payload in found if payload[0] in allowed]
@@ -9,9 +9,10 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from detective_systemv3.orchestrator import classify_subject
 from detective_systemv3.llm_openrouter import OpenRouterLLM
-from detective_system.omikuji import get_suggestions
+from detective_systemv3.llm_cache import CachedLLM
+from detective_systemv3.suggestions import get_backend
+from detective_systemv3.tracing import Tracer
 
 
 class MockLLMManager:
@@ -128,7 +129,15 @@ Examples:
         "--annif-top2",
         nargs=2,
         default=None,
-        help="Override Annif top 2 suggestions (default: fetch from Annif Docker)"
+        help="Override Annif top 2 suggestions (default: fetch from --annif-backend)"
+    )
+
+    parser.add_argument(
+        "--annif-backend",
+        type=str,
+        default=None,
+        help="Suggestion backend: docker, an Annif project URL (http://host:5000/v1/projects/<id>) "
+             "or static:<file.json> (default: $ANNIF_BACKEND or docker)"
     )
 
     parser.add_argument(
@@ -150,6 +159,33 @@ Examples:
         help="Stream output (same as --verbose for now)"
     )
 
+    parser.add_argument(
+        "--parallel-workers",
+        type=int,
+        default=1,
+        help="Querier requests executed concurrently per round (default: 1 = series)"
+    )
+
+    parser.add_argument(
+        "--executor",
+        choices=["thread", "process"],
+        default="thread",
+        help="Executor for parallel Querier requests (default: thread)"
+    )
+
+    parser.add_argument(
+        "--context-budget",
+        type=int,
+        default=None,
+        help="Token budget for the evidence table in the Analyzer's round/final prompts (default: Analyzer's own context)"
+    )
+
+    parser.add_argument(
+        "--fast-path",
+        action="store_true",
+        help="Accept a confident retrieval-only result without LLM calls; escalate otherwise"
+    )
+
     parser.add_argument(
         "-m", "--model",
         type=str,
@@ -157,15 +193,50 @@ Examples:
         help="OpenRouter model to use (default: x-ai/grok-2-1212). Popular options: anthropic/claude-3.5-sonnet, google/gemini-2.0-flash-exp:free, openai/gpt-4o"
     )
 
+    parser.add_argument(
+        "--llm-cache",
+        type=str,
+        default=None,
+        help="SQLite file caching LLM responses by prompt (default: no cache)"
+    )
+
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Serve LLM responses only from --llm-cache (no network calls; fails on a miss)"
+    )
+
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Write a Chrome trace (chrome://tracing, ui.perfetto.dev) of the run to this JSON file"
+    )
+
     args = parser.parse_args()
+    tracer = Tracer()
+
+    # The retrieval/agent stack loads only after argument parsing (fast --help)
+    from detective_systemv3.orchestrator import classify_subject
+    from detective_systemv3.fast_path import TieredClassifier
+    from detective_systemv3.agents.querier import Querier
+    from detective_systemv3.source_index import use_compiled_index
+
+    if args.replay:
+        cache_path = args.llm_cache or "llm_cache.sqlite"
+        llm_manager = CachedLLM(None, cache_path, mode="replay", model=args.model)
+        print(f"[*] Replaying cached {args.model} responses from {cache_path}\n")
+    else:
+        # Create OpenRouter LLM manager; fallback to mock if missing API key
+        try:
+            llm_manager = OpenRouterLLM(model=args.model)
+            print(f"[*] Using OpenRouter model: {args.model}\n")
+        except Exception as e:
+            print(f"[WARN] OpenRouter unavailable ({e}). Falling back to MockLLMManager.")
+            llm_manager = MockLLMManager()
 
-    # Create OpenRouter LLM manager; fallback to mock if missing API key
-    try:
-        llm_manager = OpenRouterLLM(model=args.model)
-        print(f"[*] Using OpenRouter model: {args.model}\n")
-    except Exception as e:
-        print(f"[WARN] OpenRouter unavailable ({e}). Falling back to MockLLMManager.")
-        llm_manager = MockLLMManager()
+        if args.llm_cache:
+            llm_manager = CachedLLM(llm_manager, args.llm_cache)
 
     print("\n" + "=" * 70)
     print("  Detective System v3 - DDC Classification")
@@ -174,15 +245,20 @@ Examples:
     print(f"Max rounds: {args.max_rounds}")
     print("=" * 70 + "\n")
 
-    # Fetch Annif suggestions (required; use Docker)
+    # Fetch Annif suggestions (required)
     annif_top2 = args.annif_top2
     if annif_top2 is None:
-        # User did not override, fetch from Annif via Docker
-        print("[*] Fetching Annif suggestions via Docker...")
+        # User did not override, fetch from the configured Annif backend
+        print("[*] Fetching Annif suggestions...")
         try:
-            sugg = get_suggestions(args.subject, limit=10, use_docker=True)
+            backend = get_backend(args.annif_backend)
+            try:
+                with tracer.span("annif.suggest", "annif", backend=args.annif_backend or "default"):
+                    sugg = backend.suggest(args.subject, limit=10)
+            finally:
+                backend.close()
             if not sugg:
-                print("[ERROR] Annif returned no suggestions. Ensure Docker image 'annif-omikuji:latest' is built.")
+                print("[ERROR] Annif returned no suggestions. Check the --annif-backend service (Docker image 'annif-omikuji:latest' for docker).")
                 sys.exit(1)
             
             # Display top 10
@@ -200,20 +276,47 @@ Examples:
                 annif_top2 = [sugg[0].notation, "000"]
                 print(f"\n[+] Using top-1 for classification: {annif_top2}\n")
         except RuntimeError as e:
-            print(f"\n[ERROR] Annif Docker failed: {e}")
-            print("Ensure 'annif-omikuji:latest' is built: cd D:\\Projects\\Annif pro && python annifctl.py build")
+            print(f"\n[ERROR] Annif backend failed: {e}")
+            print("For docker, ensure 'annif-omikuji:latest' is built: cd D:\\Projects\\Annif pro && python annifctl.py build")
             sys.exit(1)
     else:
         print(f"\n[+] Using user-provided Annif top-2: {annif_top2}\n")
 
+    # Load the sources once; the fast path and the two-agent loop share the Querier
+    use_compiled_index()
+    querier = Querier()
+
     # Run classification
-    result = classify_subject(
-        subject_text=args.subject,
-        annif_top2=annif_top2,
-        llm_manager=llm_manager,
-        max_rounds=args.max_rounds,
-        verbose=args.verbose or args.stream
-    )
+    if args.fast_path:
+        tiered = TieredClassifier(
+            llm_manager,
+            querier=querier,
+            max_rounds=args.max_rounds,
+            verbose=args.verbose or args.stream,
+            parallel_workers=args.parallel_workers,
+            executor_type=args.executor,
+            tracer=tracer,
+            context_budget=args.context_budget
+        )
+        result = tiered.classify(args.subject, annif_top2)
+        decision = result["metadata"]["fast_path"]
+        if result["metadata"]["tier"] == "retrieval":
+            print("[+] Retrieval fast path accepted (no LLM calls)")
+        else:
+            print(f"[*] Escalated to two-agent loop (failed: {', '.join(decision['failed'])})")
+    else:
+        result = classify_subject(
+            subject_text=args.subject,
+            annif_top2=annif_top2,
+            llm_manager=llm_manager,
+            max_rounds=args.max_rounds,
+            verbose=args.verbose or args.stream,
+            parallel_workers=args.parallel_workers,
+            executor_type=args.executor,
+            tracer=tracer,
+            context_budget=args.context_budget,
+            querier=querier
+        )
 
     # Display results
     print("\n" + "=" * 70)
@@ -242,8 +345,16 @@ Examples:
     print(f"  Rounds: {result['metadata']['rounds_executed']}")
     print(f"  Time: {result['metadata']['elapsed_seconds']}s")
     print(f"  Artifacts: {result['metadata']['memory_stats']['total_artifacts']}")
+    breakdown = result['metadata'].get('time_breakdown')
+    if breakdown:
+        print(f"  Time breakdown: LLM {breakdown['llm_ms']:.0f}ms, Querier {breakdown['querier_ms']:.0f}ms, "
+              f"Analyzer (non-LLM) {breakdown['analyzer_local_ms']:.0f}ms, integration {breakdown['integrate_ms']:.0f}ms")
     print()
 
+    if args.trace:
+        tracer.save(args.trace)
+        print(f"[+] Trace written to {args.trace}\n")
+
     if result['metadata'].get('facets'):
         print("Facets Detected:")
         for facet, value in result['metadata']['facets'].items():
@@ -0,0 +1,447 @@
+"""
+Local classification server with a warm Querier, LLM client and Annif backend.
+Usage: python serve.py [--port 8765 | --unix /tmp/ddc.sock] [--workers 4] [--queue-size 32]
+
+Every run_classification.py call pays for imports, source loading, the SBERT
+model and the Annif start. This server keeps all of them warm:
+
+    POST /classify  {"subject": "...", "annif_top2": ["342", "340"]?, "id": "..."?}
+    POST /search    {"subject": "...", "annif_top2": [...]?, "semantic": false, "limit": 10}
+    POST /suggest   {"text": "...", "limit": 10}
+    GET  /health    liveness and warm-state summary
+    GET  /metrics   request counts, latency percentiles, queue, coalescing and Querier cache stats
+
+Identical in-flight requests share one execution: same endpoint and JSON
+body, except that /classify matches on subject and annif_top2 only (each
+caller gets its own "id" back). Work runs on a fixed pool; at most --queue-size requests wait
+behind it, beyond that the server answers 503 with Retry-After.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import socketserver
+from collections import deque
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from detective_systemv3.agents.querier import Querier
+from detective_systemv3.source_index import use_compiled_index
+from detective_systemv3.batch_classify import BatchClassifier
+from detective_systemv3.fast_path import FastPathConfig, probe_request, rank_numbers
+from detective_systemv3.suggestions import get_backend, top2_notations
+
+
+LATENCY_WINDOW = 1000
+
+
+class QueueFull(Exception):
+    """
+    Raised when the bounded work queue cannot take another request.
+    """
+
+
+class Coalescer:
+    """
+    Bounded executor that shares one execution between identical in-flight requests.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 32):
+        """
+        Args:
+            workers: requests executed concurrently
+            queue_size: requests allowed to wait for a worker (beyond that: QueueFull)
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="serve")
+        self.capacity = workers + queue_size
+        self.workers = workers
+        self.queue_size = queue_size
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def submit(self, key: str, fn: Callable, *args) -> Future:
+        """
+        Future for fn(*args), shared with any in-flight request with the same key.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            if len(self._in_flight) >= self.capacity:
+                self.rejected += 1
+                raise QueueFull()
+            future = self.executor.submit(fn, *args)
+            self._in_flight[key] = future
+            self.submitted += 1
+        future.add_done_callback(lambda _: self._release(key, future))
+        return future
+
+    def _release(self, key: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.workers),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class ClassificationService:
+    """
+    Warm Querier, LLM manager and Annif backend behind the HTTP endpoints.
+    """
+
+    def __init__(
+        self,
+        llm_manager,
+        querier=None,
+        backend=None,
+        max_rounds: int = 5,
+        fast_path: Optional[FastPathConfig] = None,
+        workers: int = 4,
+        queue_size: int = 32,
+        cache_size: int = 4096
+    ):
+        """
+        Args:
+            llm_manager: LLM manager shared by all classifications (must be thread-safe)
+            querier: warm Querier (loaded once when omitted)
+            backend: SuggestionBackend (default: get_backend())
+            max_rounds: maximum rounds per classification
+            fast_path: accept confident retrieval-only results without LLM calls
+            workers: requests executed concurrently
+            queue_size: requests allowed to wait for a worker
+            cache_size: Querier result cache (0 = off)
+        """
+        self.backend = backend if backend is not None else get_backend()
+        self.classifier = BatchClassifier(
+            llm_manager,
+            max_rounds=max_rounds,
+            concurrency=workers,
+            querier=querier,
+            annif_fn=self.annif_top2,
+            verbose=False,
+            cache_size=cache_size,
+            fast_path=fast_path
+        )
+        self.querier = self.classifier.querier
+        self.coalescer = Coalescer(workers, queue_size)
+        self.started_at = time.time()
+
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._latencies: Dict[str, deque] = {}
+
+    def annif_top2(self, subject: str) -> List[str]:
+        return top2_notations(self.backend.suggest(subject, limit=2))
+
+    def classify(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        subject = _require(payload, "subject")
+        record = {"id": payload.get("id", ""), "subject": subject, "annif_top2": _annif_top2(payload)}
+        row = self.classifier.classify_record(record)
+        if "error" in row:
+            raise RuntimeError(row["error"])
+        return row
+
+    def search(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Retrieval only (no LLM), as in quick_classify.py.
+        """
+        subject = _require(payload, "subject")
+        annif_top2 = _annif_top2(payload) or self.annif_top2(subject)
+        limit = int(payload.get("limit", 10))
+        response = self.querier.execute(probe_request(subject, annif_top2, bool(payload.get("semantic", False))))
+        return {
+            "subject": subject,
+            "annif_top2": annif_top2,
+            "ranked_numbers": [
+                {"ddc_number": group["ddc_number"], "score": round(group["score"], 4)}
+                for group in rank_numbers(response)[:limit]
+            ],
+            "hits": [
+                {
+                    "ddc_number": hit.doc.ddc_number,
+                    "heading": hit.doc.heading,
+                    "source": hit.doc.source,
+                    "score": round(hit.score, 4),
+                    "signals": {name: round(value, 4) for name, value in hit.signals.items() if value},
+                }
+                for hit in response.hits[:limit]
+            ],
+            "numbers_found": list(response.numbers_found),
+        }
+
+    def suggest(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        text = _require(payload, "text")
+        suggestions = self.backend.suggest(text, limit=int(payload.get("limit", 10)))
+        return {"suggestions": [{"notation": s.notation, "label": s.label, "score": s.score} for s in suggestions]}
+
+    def handle(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run an endpoint through the coalescing, bounded executor (blocks until done).
+        """
+        handler = {"classify": self.classify, "search": self.search, "suggest": self.suggest}[endpoint]
+        start = time.perf_counter()
+        try:
+            shared = payload
+            if endpoint == "classify":
+                # The caller's id only labels the row: share work on what is classified
+                shared = {"subject": _require(payload, "subject"), "annif_top2": _annif_top2(payload)}
+            key = endpoint + "\0" + json.dumps(shared, sort_keys=True, separators=(",", ":"))
+            result = self.coalescer.submit(key, handler, shared).result()
+            if endpoint == "classify":
+                result = dict(result, id=payload.get("id", ""))
+            self._record(endpoint, "ok", time.perf_counter() - start)
+            return result
+        except QueueFull:
+            self._record(endpoint, "rejected", None)
+            raise
+        except Exception:
+            self._record(endpoint, "error", time.perf_counter() - start)
+            raise
+
+    def _record(self, endpoint: str, outcome: str, seconds: Optional[float]):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, {"ok": 0, "error": 0, "rejected": 0})
+            counts[outcome] += 1
+            if seconds is not None:
+                self._latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "sources": len(getattr(self.querier, "all_sources", {}) or {}),
+            "backend": type(self.backend).__name__,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {endpoint: dict(c) for endpoint, c in self._counts.items()}
+            latencies = {endpoint: sorted(values) for endpoint, values in self._latencies.items()}
+        endpoints = {}
+        for endpoint, c in counts.items():
+            values = latencies.get(endpoint, [])
+            endpoints[endpoint] = dict(c, **{
+                f"p{p}_ms": round(values[min(len(values) - 1, int(len(values) * p / 100))] * 1000, 1)
+                for p in (50, 95, 99) if values
+            })
+        metrics = {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "endpoints": endpoints,
+            "queue": self.coalescer.get_stats(),
+            "querier": self.querier.get_stats(),
+        }
+        if self.classifier.tiered is not None:
+            metrics["fast_path"] = self.classifier.tiered.get_stats()
+        return metrics
+
+    def close(self):
+        self.coalescer.close()
+        self.backend.close()
+
+
+def _require(payload: Dict[str, Any], field: str) -> str:
+    value = payload.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"'{field}' (non-empty string) is required")
+    return value
+
+
+def _annif_top2(payload: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Validated optional annif_top2 (1-2 notations, padded with "000"), or None when absent.
+    """
+    value = payload.get("annif_top2")
+    if value is None:
+        return None
+    if not isinstance(value, list) or not 1 <= len(value) <= 2 \
+            or not all(isinstance(n, str) and n.strip() for n in value):
+        raise ValueError(f"'annif_top2' must be a list of 1-2 notation strings, got {value!r}")
+    notations = [n.strip() for n in value]
+    return notations if len(notations) == 2 else notations + ["000"]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    JSON-over-HTTP front end; the service is attached to the server.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, service.health())
+        elif self.path == "/metrics":
+            self._send(200, service.metrics())
+        else:
+            self._send(404, {"error": f"unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        endpoint = self.path.strip("/")
+        if endpoint not in ("classify", "search", "suggest"):
+            self._send(404, {"error": f"unknown endpoint {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("request body must be a JSON object")
+        except ValueError as e:
+            self._send(400, {"error": f"invalid JSON body: {e}"})
+            return
+
+        try:
+            self._send(200, self.server.service.handle(endpoint, payload))
+        except QueueFull:
+            self._send(503, {"error": "server busy, retry later"}, {"Retry-After": "1"})
+        except (ValueError, RuntimeError) as e:
+            self._send(400 if isinstance(e, ValueError) else 502, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # Unix-socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: ClassificationService, host: str = "127.0.0.1", port: int = 8765,
+                unix_socket: Optional[str] = None, verbose: bool = False):
+    """
+    HTTP server (TCP, or a Unix socket when unix_socket is given) for the service.
+    """
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = UnixHTTPServer(unix_socket, ServiceHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve DDC classification over HTTP with warm models and sources",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python serve.py --port 8765 --workers 4
+  python serve.py --unix /tmp/ddc.sock --fast-path --annif-backend http://localhost:5000/v1/projects/omikuji-ddc
+  curl -s localhost:8765/classify -d '{"subject": "constitutional law"}'
+        """
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765)")
+    parser.add_argument("--unix", type=str, default=None, help="Serve on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=4, help="Requests executed concurrently (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=32, help="Requests waiting for a worker before 503 (default: 32)")
+    parser.add_argument("--max-rounds", type=int, default=5, help="Maximum rounds per classification (default: 5)")
+    parser.add_argument("--annif-backend", type=str, default=None,
+                        help="Suggestion backend: docker, an Annif project URL or static:<file> "
+                             "(default: $ANNIF_BACKEND or docker)")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="Accept confident retrieval-only results without LLM calls; escalate the rest")
+    parser.add_argument(
+        "-m", "--model",
+        type=str,
+        default="x-ai/grok-2-1212",
+        help="OpenRouter model to use (default: x-ai/grok-2-1212)"
+    )
+    parser.add_argument("--llm-cache", type=str, default=None, help="SQLite file caching LLM responses by prompt")
+    parser.add_argument("--replay", action="store_true", help="Serve LLM responses only from --llm-cache (no network calls)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    from detective_systemv3.llm_cache import CachedLLM
+    if args.replay:
+        cache_path = args.llm_cache or "llm_cache.sqlite"
+        llm_manager = CachedLLM(None, cache_path, mode="replay", model=args.model)
+        print(f"[*] Replaying cached {args.model} responses from {cache_path}")
+    else:
+        from detective_systemv3.llm_openrouter import OpenRouterLLM
+        try:
+            llm_manager = OpenRouterLLM(model=args.model)
+            print(f"[*] Using OpenRouter model: {args.model}")
+        except Exception as e:
+            from detective_systemv3.run_classification import MockLLMManager
+            print(f"[WARN] OpenRouter unavailable ({e}). Falling back to MockLLMManager.")
+            llm_manager = MockLLMManager()
+
+        if args.llm_cache:
+            llm_manager = CachedLLM(llm_manager, args.llm_cache)
+
+    print("[*] Loading DDC sources...")
+    use_compiled_index()
+    querier = Querier()
+    print(f"[+] Loaded {len(querier.all_sources)} source types")
+
+    service = ClassificationService(
+        llm_manager,
+        querier=querier,
+        backend=get_backend(args.annif_backend),
+        max_rounds=args.max_rounds,
+        fast_path=FastPathConfig() if args.fast_path else None,
+        workers=args.workers,
+        queue_size=args.queue_size
+    )
+    server = make_server(service, args.host, args.port, args.unix, args.verbose)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"[+] Serving on {where} ({args.workers} workers, queue {args.queue_size}); Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[*] Shutting down")
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""
+Shared, read-only corpus for multi-process Querier workers.
+
+Every process-pool worker (orchestrator executor_type="process", a service
+worker) used to call load_all_sources() and keep its own copy of the
+documents, number index and embedding matrix. Here one loader process
+publishes them once, as a single bundle:
+
+    DocStore column buffers (documents + integer number index, see doc_store)
+    embedding matrix (+ int8 scales) from embeddings.EmbeddingMatrix
+    token index (SourceTokenIndex flat columns, see token_index.to_buffers)
+
+plus the source fingerprint it was built from, and workers attach read-only
+in milliseconds; use_shared_corpus() then routes a worker's loaders
+(load_all_sources, SemanticScorer.from_data_dir, SourceTokenIndex.build) to
+the bundle. Two transports share the same layout:
+
+    "<path>"        file written once and memory-mapped; pages are shared
+                    through the OS page cache
+    "shm:<name>"    multiprocessing.shared_memory block, owned by the publisher
+
+Layout: magic (8 bytes) | header length (u32) | header JSON | segments, each
+aligned to SEGMENT_ALIGN; header "segments" maps name -> [offset, nbytes],
+offsets relative to the start of the bundle.
+
+Usage:
+    corpus = publish_corpus(load_all_sources(), "shm:ddc-corpus", embeddings=matrix,
+                            fingerprint=source_fingerprint(data_dir))
+    orchestrator = TwoAgentOrchestrator(llm, parallel_workers=4, executor_type="process",
+                                        shared_corpus=corpus.spec)
+
+    python -m detective_systemv3.shared_corpus build --output corpus.bundle [--embeddings] [--token-index]
+    python -m detective_systemv3.shared_corpus info corpus.bundle
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from .doc_store import DocStore, SourceSlice
+
+
+BUNDLE_MAGIC = b"DDCSHM\r\n"
+BUNDLE_VERSION = 2
+SEGMENT_ALIGN = 64
+SHM_PREFIX = "shm:"
+
+_HEADER_LEN = struct.Struct("<I")
+
+# Shared-memory blocks created by this process (their tracker registration is kept)
+_PUBLISHED = set()
+
+
+def _align(position: int) -> int:
+    return (position + SEGMENT_ALIGN - 1) // SEGMENT_ALIGN * SEGMENT_ALIGN
+
+
+def _layout(sources: Mapping[str, Sequence[Any]], embeddings=None, token_index=None, fingerprint=None):
+    """
+    (header bytes, [(offset, bytes-like), ...], total size) of a bundle.
+    """
+    store = sources if isinstance(sources, DocStore) else DocStore.from_sources(sources)
+    store_header, store_buffers = store.to_buffers()
+
+    segments: Dict[str, Any] = {f"store/{name}": buf for name, buf in store_buffers.items()}
+    embedding_meta = None
+    if embeddings is not None:
+        import numpy as np
+
+        matrix = np.ascontiguousarray(embeddings.matrix)
+        segments["embeddings/matrix"] = matrix
+        embedding_meta = {"meta": embeddings.meta, "dtype": matrix.dtype.str, "shape": list(matrix.shape)}
+        if embeddings.scales is not None:
+            scales = np.ascontiguousarray(embeddings.scales)
+            segments["embeddings/scales"] = scales
+            embedding_meta["scales_dtype"] = scales.dtype.str
+            embedding_meta["scales_shape"] = list(scales.shape)
+    token_index_header = None
+    if token_index is not None:
+        token_index_header, token_index_buffers = token_index.to_buffers()
+        segments.update({f"token_index/{name}": buf for name, buf in token_index_buffers.items()})
+
+    sizes = {name: memoryview(buf).nbytes for name, buf in segments.items()}
+    header = {
+        "version": BUNDLE_VERSION,
+        "source_fingerprint": fingerprint,
+        "store": store_header,
+        "embeddings": embedding_meta,
+        "token_index": token_index_header,
+        "segments": {},
+    }
+    # Offsets depend on the header length, which depends on the offsets: reserve room for digits
+    header["segments"] = {name: [0, size] for name, size in sizes.items()}
+    reserve = len(json.dumps(header)) + 24 * len(sizes) + 64
+    position = _align(len(BUNDLE_MAGIC) + _HEADER_LEN.size + reserve)
+    placed = []
+    for name, buf in segments.items():
+        header["segments"][name] = [position, sizes[name]]
+        placed.append((position, buf))
+        position = _align(position + sizes[name])
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (reserve - len(header_bytes))
+    return header_bytes, placed, position
+
+
+def _write(target, header_bytes: bytes, placed):
+    """
+    Write magic, header and segments into a writable buffer or binary file.
+    """
+    def put(offset: int, data):
+        data = memoryview(data).cast("B")
+        if hasattr(target, "seek"):
+            target.seek(offset)
+            target.write(data)
+        else:
+            target[offset:offset + data.nbytes] = data
+
+    put(0, BUNDLE_MAGIC + _HEADER_LEN.pack(len(header_bytes)) + header_bytes)
+    for offset, buf in placed:
+        put(offset, buf)
+
+
+class SharedCorpus:
+    """
+    An attached (or published) bundle: store, sources, embeddings, token index.
+
+    Attributes:
+        spec: how other processes attach ("<path>" or "shm:<name>")
+        store: DocStore over the shared buffers
+        sources: source name -> SourceSlice (load_all_sources() shape)
+        embeddings: EmbeddingMatrix over the shared matrix, or None
+        token_index: SourceTokenIndex over the shared columns, or None
+        fingerprint: source_fingerprint() of the data it was built from, or None
+    """
+
+    def __init__(self, spec: str, buffer, handle=None, owner: bool = False, expected_fingerprint: Optional[str] = None):
+        self.spec = spec
+        self._buffer = buffer
+        self._handle = handle
+        self._owner = owner
+
+        view = memoryview(buffer).toreadonly()
+        if bytes(view[:len(BUNDLE_MAGIC)]) != BUNDLE_MAGIC:
+            raise ValueError(f"{spec} is not a corpus bundle")
+        (length,) = _HEADER_LEN.unpack(view[len(BUNDLE_MAGIC):len(BUNDLE_MAGIC) + _HEADER_LEN.size])
+        start = len(BUNDLE_MAGIC) + _HEADER_LEN.size
+        self.header = json.loads(bytes(view[start:start + length]))
+        if self.header.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"{spec}: unsupported bundle version {self.header.get('version')}")
+        self.fingerprint: Optional[str] = self.header.get("source_fingerprint")
+        if expected_fingerprint is not None and self.fingerprint is not None and self.fingerprint != expected_fingerprint:
+            raise ValueError(f"{spec} was built from other source data (stale bundle); rebuild it")
+
+        segments = {name: view[offset:offset + size] for name, (offset, size) in self.header["segments"].items()}
+        self._segments = segments
+        self.store = DocStore.from_buffers(self.header["store"], {
+            name[len("store/"):]: buf for name, buf in segments.items() if name.startswith("store/")
+        })
+        self.sources: Dict[str, SourceSlice] = self.store.as_sources()
+        self.embeddings = self._attach_embeddings(self.header.get("embeddings"))
+        self.token_index = self._attach_token_index(self.header.get("token_index"))
+
+    def _attach_embeddings(self, meta: Optional[Dict[str, Any]]):
+        if meta is None:
+            return None
+        import numpy as np
+        from .embeddings import EmbeddingMatrix
+
+        matrix = np.frombuffer(self._segments["embeddings/matrix"], dtype=np.dtype(meta["dtype"])).reshape(meta["shape"])
+        scales = None
+        if "embeddings/scales" in self._segments:
+            scales = np.frombuffer(self._segments["embeddings/scales"], dtype=np.dtype(meta["scales_dtype"]))
+            scales = scales.reshape(meta["scales_shape"])
+        return EmbeddingMatrix(matrix, scales, meta["meta"])
+
+    def _attach_token_index(self, header: Optional[Dict[str, Any]]):
+        if header is None:
+            return None
+        from .token_index import SourceTokenIndex
+
+        prefix = "token_index/"
+        return SourceTokenIndex.from_buffers(header, {
+            name[len(prefix):]: buf for name, buf in self._segments.items() if name.startswith(prefix)
+        })
+
+    @property
+    def nbytes(self) -> int:
+        return memoryview(self._buffer).nbytes
+
+    def close(self, unlink: Optional[bool] = None):
+        """
+        Detach; the publisher of a shared-memory bundle also removes it
+        (unless unlink=False). Views handed out before close() become invalid.
+        """
+        self._segments = {}
+        self._buffer = None
+        self.store = self.sources = self.embeddings = self.token_index = None
+        if self._handle is None:
+            return
+        try:
+            self._handle.close()
+        except BufferError:
+            # Views still held elsewhere; the mapping is released with them
+            pass
+        if not isinstance(self._handle, mmap.mmap) and (unlink if unlink is not None else self._owner):
+            self._handle.unlink()
+            _PUBLISHED.discard(self._handle.name)
+        self._handle = None
+
+
+def publish_corpus(
+    sources: Mapping[str, Sequence[Any]],
+    target: str,
+    embeddings=None,
+    token_index=None,
+    fingerprint: Optional[str] = None
+) -> SharedCorpus:
+    """
+    Publish sources (and optionally embeddings / token index) as a bundle.
+
+    Args:
+        sources: load_all_sources() output or a DocStore
+        target: file path, or "shm:<name>" for a shared-memory block
+        embeddings: embeddings.EmbeddingMatrix to include
+        token_index: token_index.SourceTokenIndex to include
+        fingerprint: source_index.source_fingerprint() of the data the
+            sources came from; attach_corpus() checks it when asked to
+
+    Returns:
+        SharedCorpus attached to the published bundle (keep it open while
+        workers use a shared-memory bundle; close() removes it)
+    """
+    header_bytes, placed, size = _layout(sources, embeddings, token_index, fingerprint)
+
+    if target.startswith(SHM_PREFIX):
+        from multiprocessing import shared_memory
+
+        shm = shared_memory.SharedMemory(name=target[len(SHM_PREFIX):], create=True, size=size)
+        _write(shm.buf, header_bytes, placed)
+        _PUBLISHED.add(shm.name)
+        return SharedCorpus(target, shm.buf, shm, owner=True)
+
+    path = Path(target)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.truncate(size)
+        _write(f, header_bytes, placed)
+    os.replace(tmp_path, path)
+    return attach_corpus(str(path))
+
+
+def attach_corpus(spec: str, expected_fingerprint: Optional[str] = None) -> SharedCorpus:
+    """
+    Attach read-only to a published bundle ("<path>" or "shm:<name>").
+
+    Args:
+        spec: bundle spec
+        expected_fingerprint: source_fingerprint() of the current data; a
+            bundle built from other data raises ValueError (bundles published
+            without a fingerprint are not checked)
+    """
+    if spec.startswith(SHM_PREFIX):
+        from multiprocessing import shared_memory, resource_tracker
+
+        shm = shared_memory.SharedMemory(name=spec[len(SHM_PREFIX):])
+        # Attaching registers the block with this process's resource tracker, which
+        # would unlink it when the worker exits; only the publisher owns it
+        if shm.name not in _PUBLISHED:
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return SharedCorpus(spec, shm.buf, shm, expected_fingerprint=expected_fingerprint)
+
+    with open(spec, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return SharedCorpus(spec, buffer, buffer, expected_fingerprint=expected_fingerprint)
+
+
+def use_shared_corpus(corpus: SharedCorpus, querier_module=None) -> List[str]:
+    """
+    Route this process's loaders to an attached bundle (e.g. in a worker initializer).
+
+    agents.querier.load_all_sources returns corpus.sources; when the bundle
+    carries them, SemanticScorer.from_data_dir() (same model) wraps the shared
+    embedding matrix and SourceTokenIndex.build(corpus.sources) returns the
+    shared token index instead of building one. Other arguments still reach
+    the original functions.
+
+    Returns:
+        Parts installed, out of "sources", "embeddings", "token_index"
+    """
+    if querier_module is None:
+        from .agents import querier as querier_module
+
+    installed = []
+    if hasattr(querier_module, "load_all_sources"):
+        querier_module.load_all_sources = lambda *args, **kwargs: corpus.sources
+        installed.append("sources")
+
+    if corpus.embeddings is not None:
+        from .embeddings import DEFAULT_MODEL, SemanticScorer
+
+        embeddings = corpus.embeddings
+        from_data_dir = SemanticScorer.from_data_dir.__func__
+
+        def shared_scorer(cls, model_name: str = DEFAULT_MODEL, *args, **kwargs):
+            if model_name != embeddings.model_name:
+                return from_data_dir(cls, model_name, *args, **kwargs)
+            return cls(embeddings)
+
+        SemanticScorer.from_data_dir = classmethod(shared_scorer)
+        installed.append("embeddings")
+
+    if corpus.token_index is not None:
+        from .token_index import SourceTokenIndex
+
+        token_index, sources = corpus.token_index, corpus.sources
+        build = SourceTokenIndex.build.__func__
+
+        def shared_index(cls, all_sources):
+            if all_sources is sources or (
+                set(all_sources) == set(sources) and all(all_sources[name] is sources[name] for name in sources)
+            ):
+                return token_index
+            return build(cls, all_sources)
+
+        SourceTokenIndex.build = classmethod(shared_index)
+        installed.append("token_index")
+    return installed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a shared corpus bundle")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("bundle", nargs="?", default=None, help="Bundle file (info)")
+    parser.add_argument("--output", type=Path, default=None, help="Bundle file to write (build)")
+    parser.add_argument("--data-dir", type=Path, default=None, help="data_processed directory")
+    parser.add_argument("--embeddings", action="store_true", help="Include the precomputed embedding matrix")
+    parser.add_argument("--token-index", action="store_true", help="Include the token index")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from .retrieval.loaders import find_data_processed_dir
+        from .source_index import load_sources, source_fingerprint
+
+        if args.output is None:
+            parser.error("build requires --output")
+        sources = load_sources(args.data_dir)
+        embeddings = token_index = None
+        if args.embeddings:
+            from .embeddings import SemanticScorer
+
+            embeddings = SemanticScorer.from_data_dir(data_dir=args.data_dir, build_missing=False).embeddings
+        if args.token_index:
+            from .token_index import SourceTokenIndex
+
+            token_index = SourceTokenIndex.build(sources)
+        data_dir = args.data_dir or find_data_processed_dir()
+        fingerprint = source_fingerprint(data_dir) if data_dir else None
+        publish_corpus(sources, str(args.output), embeddings, token_index, fingerprint).close()
+        bundle = str(args.output)
+        print(f"[+] Wrote {bundle} ({args.output.stat().st_size / 1e6:.1f} MB)")
+    else:
+        if args.bundle is None:
+            parser.error("info requires a bundle path")
+        bundle = args.bundle
+
+    start = time.perf_counter()
+    try:
+        corpus = attach_corpus(bundle)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Bundle: {bundle} ({corpus.nbytes / 1e6:.1f} MB, attached in {elapsed_ms:.1f} ms)")
+    for name, docs in corpus.sources.items():
+        print(f"  {name:15s} {len(docs):8d} docs")
+    if corpus.embeddings is not None:
+        print(f"  embeddings      {corpus.embeddings.matrix.shape} {corpus.embeddings.matrix.dtype}")
+    print(f"  token index     {'yes' if corpus.token_index is not None else 'no'}")
+    print(f"  fingerprint     {corpus.fingerprint or 'none'}")
+    corpus.close()
+
+
+if __name__ == "__main__":
+    main()
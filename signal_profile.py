@@ -0,0 +1,352 @@
+"""
+Per-signal cost profiling and gating for the scoring pipeline.
+
+SearchHit.signals shows what each signal contributes, not what it costs:
+QUERIER_ANALYSIS.md reports table_alignment averaging 0.000 and
+keyword_proximity 0.056, yet both are computed for every candidate.
+
+Scoring functions report their wall time through the @profiled decorator
+(or `with PROFILER.timed(name)`), and observe_hits() accumulates the values
+each signal actually produced:
+
+    @profiled("heading_fuzzy")
+    def heading_fuzzy(doc, keywords): ...
+
+    PROFILER.get_stats()["keyword_proximity"]
+    # {"calls": 41200, "total_ms": 380.2, "mean_us": 9.2, "mean_value": 0.056,
+    #  "max_value": 0.41, "nonzero_rate": 0.12, "expected_contribution": 0.017}
+
+SignalGatingConfig.from_stats() turns those numbers into a config that
+disables signals that never fire and lazily evaluates signals whose
+weight x expected value is negligible. score_candidates() applies it:
+lazy signals are computed only for candidates whose soft-OR upper bound can
+still reach the top-k. Gating is opt-in: without a config every signal is
+computed, and a derived config is only as good as the sample it came from.
+"""
+import time
+import heapq
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+
+# Signal weights of the soft-OR combiner (README "Scoring Signals"; semantic_weight default)
+SIGNAL_WEIGHTS: Dict[str, float] = {
+    "exact_number": 0.7,
+    "prefix_number": 0.4,
+    "range_cover": 0.6,
+    "heading_fuzzy": 0.6,
+    "desc_fuzzy": 0.3,
+    "keyword_proximity": 0.3,
+    "std_subdiv_flag": 0.2,
+    "table_alignment": 0.3,
+    "semantic_similarity": 0.25,
+}
+
+
+def combine_soft_or(signals: Mapping[str, float], weights: Mapping[str, float] = SIGNAL_WEIGHTS) -> float:
+    """
+    Soft-OR (probabilistic sum): S = 1 - prod(1 - w*s).
+    """
+    remaining = 1.0
+    for name, value in signals.items():
+        remaining *= 1.0 - weights.get(name, 0.0) * value
+    return 1.0 - remaining
+
+
+class SignalProfiler:
+    """
+    Thread-safe per-signal call counts, wall time and value statistics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._calls: Dict[str, int] = {}
+            self._seconds: Dict[str, float] = {}
+            self._observed: Dict[str, int] = {}
+            self._value_sum: Dict[str, float] = {}
+            self._value_max: Dict[str, float] = {}
+            self._nonzero: Dict[str, int] = {}
+
+    def record(self, signal: str, seconds: float, calls: int = 1):
+        """
+        Add `calls` evaluations of `signal` taking `seconds` in total.
+        """
+        with self._lock:
+            self._calls[signal] = self._calls.get(signal, 0) + calls
+            self._seconds[signal] = self._seconds.get(signal, 0.0) + seconds
+        request = getattr(self._local, "request", None)
+        if request is not None:
+            calls_so_far, seconds_so_far = request.get(signal, (0, 0.0))
+            request[signal] = (calls_so_far + calls, seconds_so_far + seconds)
+
+    @contextmanager
+    def timed(self, signal: str, calls: int = 1):
+        """
+        Time the enclosed block as `calls` evaluations of `signal`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(signal, time.perf_counter() - start, calls)
+
+    def wrap(self, signal: str, fn: Callable) -> Callable:
+        """
+        Timed version of a scoring function.
+        """
+        @wraps(fn)
+        def timed_fn(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(signal, time.perf_counter() - start)
+        return timed_fn
+
+    def begin_request(self):
+        """
+        Start collecting this thread's signal timings for one request.
+        """
+        self._local.request = {}
+
+    def end_request(self) -> Dict[str, Dict[str, float]]:
+        """
+        This thread's signal timings since begin_request(): {signal: {calls, ms}}.
+        """
+        request = getattr(self._local, "request", None) or {}
+        self._local.request = None
+        return {
+            signal: {"calls": calls, "ms": round(seconds * 1000, 3)}
+            for signal, (calls, seconds) in sorted(request.items(), key=lambda x: x[1][1], reverse=True)
+        }
+
+    def observe_hits(self, hits: Iterable[Any]):
+        """
+        Accumulate the signal values of scored hits (SearchHit.signals).
+        """
+        with self._lock:
+            for hit in hits:
+                for name, value in hit.signals.items():
+                    self._observed[name] = self._observed.get(name, 0) + 1
+                    self._value_sum[name] = self._value_sum.get(name, 0.0) + value
+                    if value > self._value_max.get(name, 0.0):
+                        self._value_max[name] = value
+                    if value > 0:
+                        self._nonzero[name] = self._nonzero.get(name, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Current counters, to pass to get_stats(since=...) later.
+        """
+        with self._lock:
+            return {
+                "calls": dict(self._calls),
+                "seconds": dict(self._seconds),
+                "observed": dict(self._observed),
+                "value_sum": dict(self._value_sum),
+                "nonzero": dict(self._nonzero),
+            }
+
+    def get_stats(
+        self,
+        weights: Mapping[str, float] = SIGNAL_WEIGHTS,
+        since: Optional[Mapping[str, Mapping[str, float]]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Per signal (most expensive first): calls, total_ms, mean_us and, when
+        hits were observed, observed (hit count), mean_value, max_value,
+        nonzero_rate and expected_contribution (weight x mean_value).
+
+        Args:
+            weights: combiner weights for expected_contribution
+            since: a snapshot(); count only what was recorded after it
+                (max_value stays cumulative). Work recorded concurrently by
+                other callers of the same profiler is included.
+        """
+        before = since or {}
+
+        def delta(counter: str, values: Dict[str, Any], name: str):
+            return values.get(name, 0) - before.get(counter, {}).get(name, 0)
+
+        with self._lock:
+            names = set(self._calls) | set(self._observed)
+            stats = {}
+            for name in names:
+                calls = delta("calls", self._calls, name)
+                seconds = delta("seconds", self._seconds, name)
+                observed = delta("observed", self._observed, name)
+                if not calls and not observed:
+                    continue
+                entry: Dict[str, Any] = {
+                    "calls": calls,
+                    "total_ms": round(seconds * 1000, 3),
+                    "mean_us": round(seconds * 1e6 / calls, 3) if calls else 0.0,
+                }
+                if observed:
+                    mean_value = delta("value_sum", self._value_sum, name) / observed
+                    entry.update({
+                        "observed": observed,
+                        "mean_value": round(mean_value, 4),
+                        "max_value": round(self._value_max.get(name, 0.0), 4),
+                        "nonzero_rate": round(delta("nonzero", self._nonzero, name) / observed, 4),
+                        "expected_contribution": round(weights.get(name, 0.0) * mean_value, 4),
+                    })
+                stats[name] = entry
+        return dict(sorted(stats.items(), key=lambda x: x[1]["total_ms"], reverse=True))
+
+
+# Process-wide profiler that @profiled scoring functions report to
+PROFILER = SignalProfiler()
+
+
+def profiled(signal: str, profiler: Optional[SignalProfiler] = None):
+    """
+    Decorator: record each call of a signal function in `profiler` (default PROFILER).
+    """
+    def decorator(fn: Callable) -> Callable:
+        return (profiler or PROFILER).wrap(signal, fn)
+    return decorator
+
+
+@dataclass
+class SignalGatingConfig:
+    """
+    Which signals to skip or evaluate lazily.
+
+    Attributes:
+        disabled: never computed (treated as 0)
+        lazy: computed only for candidates that can still reach the top-k
+        max_values: upper bound on each lazy signal's value (default 1.0)
+        weights: combiner weights
+    """
+    disabled: FrozenSet[str] = frozenset()
+    lazy: FrozenSet[str] = frozenset()
+    max_values: Dict[str, float] = field(default_factory=dict)
+    weights: Dict[str, float] = field(default_factory=lambda: dict(SIGNAL_WEIGHTS))
+
+    @classmethod
+    def from_stats(
+        cls,
+        stats: Mapping[str, Mapping[str, Any]],
+        min_contribution: float = 0.02,
+        weights: Mapping[str, float] = SIGNAL_WEIGHTS,
+        min_samples: int = 1000
+    ) -> "SignalGatingConfig":
+        """
+        Derive a config from SignalProfiler.get_stats().
+
+        Signals that never produced a non-zero value are disabled; signals
+        whose weight x mean value is below min_contribution become lazy,
+        bounded by the largest value observed. Both are guesses from the
+        sample: a disabled signal that would have fired later scores 0, and a
+        lazy one above its observed maximum can change the top-k. Signals
+        observed on fewer than min_samples hits are left eager.
+
+        Args:
+            stats: profiler stats (need observed hits)
+            min_contribution: expected contribution below which a signal is lazy
+            weights: combiner weights
+            min_samples: observed hits a signal needs before it is gated
+        """
+        disabled, lazy, max_values = set(), set(), {}
+        for name, entry in stats.items():
+            if "mean_value" not in entry or entry.get("observed", 0) < min_samples:
+                continue
+            if entry["nonzero_rate"] == 0.0:
+                disabled.add(name)
+            elif entry["expected_contribution"] < min_contribution:
+                lazy.add(name)
+                max_values[name] = entry["max_value"]
+        return cls(frozenset(disabled), frozenset(lazy), max_values, dict(weights))
+
+    def lazy_headroom(self) -> float:
+        """
+        Product of (1 - w * max) over lazy signals: the soft-OR upper bound of a
+        candidate is 1 - (1 - eager_score) * headroom.
+        """
+        headroom = 1.0
+        for name in self.lazy:
+            headroom *= 1.0 - self.weights.get(name, 0.0) * self.max_values.get(name, 1.0)
+        return headroom
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"disabled": sorted(self.disabled), "lazy": sorted(self.lazy), "max_values": dict(self.max_values)}
+
+
+def score_candidates(
+    candidates: Iterable[Any],
+    signal_fns: Mapping[str, Callable[[Any], float]],
+    k: int,
+    config: Optional[SignalGatingConfig] = None,
+    profiler: Optional[SignalProfiler] = PROFILER
+) -> Tuple[List[Tuple[float, Dict[str, float], Any]], Dict[str, int]]:
+    """
+    Score candidates with gating; return the top-k and evaluation counts.
+
+    Eager signals are computed for every candidate. Lazy signals are
+    computed best-upper-bound first and stop once no remaining candidate's
+    bound can beat the current k-th score, so the top-k (scores included)
+    is the same as with every signal computed, as long as lazy signals stay
+    within their configured max_values.
+
+    Args:
+        candidates: documents to score
+        signal_fns: signal name -> fn(candidate) -> value in [0, 1]
+        k: number of results
+        config: gating config (None = compute everything)
+        profiler: where to record signal timings (None = no timing)
+
+    Returns:
+        ([(score, signals, candidate), ...] best first, {"scored", "lazy_evaluated", "lazy_skipped"})
+    """
+    config = config or SignalGatingConfig()
+    weights = config.weights
+    eager = {n: fn for n, fn in signal_fns.items() if n not in config.disabled and n not in config.lazy}
+    lazy = {n: fn for n, fn in signal_fns.items() if n in config.lazy and n not in config.disabled}
+
+    def evaluate(fns: Mapping[str, Callable], candidate, signals: Dict[str, float]):
+        for name, fn in fns.items():
+            if profiler is None:
+                signals[name] = fn(candidate)
+            else:
+                with profiler.timed(name):
+                    signals[name] = fn(candidate)
+
+    scored = []
+    for candidate in candidates:
+        signals: Dict[str, float] = {}
+        evaluate(eager, candidate, signals)
+        scored.append((combine_soft_or(signals, weights), signals, candidate))
+
+    counts = {"scored": len(scored), "lazy_evaluated": 0, "lazy_skipped": 0}
+    if k <= 0:
+        counts["lazy_skipped"] = len(scored) if lazy else 0
+        return [], counts
+    if lazy:
+        headroom = config.lazy_headroom()
+        scored.sort(key=lambda x: x[0], reverse=True)
+        top: List[float] = []  # min-heap of the k best complete scores
+        for position, (eager_score, signals, candidate) in enumerate(scored):
+            if len(top) >= k and 1.0 - (1.0 - eager_score) * headroom <= top[0]:
+                # Sorted by eager score: no later candidate can reach the top-k either
+                counts["lazy_skipped"] = len(scored) - position
+                break
+            evaluate(lazy, candidate, signals)
+            counts["lazy_evaluated"] += 1
+            score = combine_soft_or(signals, weights)
+            scored[position] = (score, signals, candidate)
+            if len(top) < k:
+                heapq.heappush(top, score)
+            else:
+                heapq.heappushpop(top, score)
+
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return scored[:k], counts
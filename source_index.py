@@ -0,0 +1,344 @@
+"""
+Compiled binary index of all DDC sources.
+
+`load_all_sources` parses every data_processed/**/*.json file on each start
+(~1-5s). This module compiles its output (Sch2/Sch3, ranges, ManSc/ManTB and
+flowcharts, T1/T2/T3A-C) into a single versioned file that is memory-mapped
+and loads in milliseconds. The file records a fingerprint of the source JSON
+(path, size, mtime) and is rebuilt automatically when the data changes.
+
+File layout (little-endian):
+    magic (8 bytes) | header length (u32) | header JSON | body, where the body is
+    per source: (count + 1) u64 offsets into the arena
+    arena: one compact JSON array per document (values in `doc_fields` order)
+Header positions (`offsets_at`, `arena_at`) are relative to the body start.
+
+The entry points (quick_classify.py, test_querier.py, run_classification.py,
+batch_classify.py, serve.py, process-pool workers) call use_compiled_index()
+before constructing a Querier, which points the Querier's load_all_sources
+hook at load_sources().
+
+Usage:
+    python -m detective_systemv3.source_index build [--data-dir DIR] [--output FILE]
+    python -m detective_systemv3.source_index info [--output FILE]
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import argparse
+import dataclasses
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Sequence
+
+from .retrieval.loaders import load_all_sources, find_data_processed_dir
+from .retrieval.schemas import DDCDoc
+
+
+INDEX_MAGIC = b"DDCIDX\r\n"
+INDEX_VERSION = 1
+INDEX_FILENAME = "sources.ddcidx"
+
+# Artifacts derived from the sources and written inside data_processed; they
+# must not count towards the fingerprint, or writing them would make every
+# artifact (including themselves) stale on the next start.
+DERIVED_DIRS = ("embeddings",)
+
+_HEADER_LEN = struct.Struct("<I")
+
+
+def source_fingerprint(data_dir: Path) -> str:
+    """
+    Fingerprint the source JSON tree (relative path, size, mtime of each file).
+
+    The compiled index and everything under DERIVED_DIRS are skipped.
+    """
+    digest = hashlib.sha1()
+    for path in sorted(Path(data_dir).rglob("*.json")):
+        rel_path = path.relative_to(data_dir)
+        if rel_path.parts[0] in DERIVED_DIRS or path.name.startswith(INDEX_FILENAME):
+            continue
+        stat = path.stat()
+        rel = rel_path.as_posix()
+        digest.update(f"{rel}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def default_index_path(data_dir: Optional[Path] = None) -> Path:
+    """
+    Default location of the compiled index: beside the data_processed tree.
+    """
+    data_dir = Path(data_dir) if data_dir else find_data_processed_dir()
+    return data_dir / INDEX_FILENAME
+
+
+def _doc_fields() -> List[str]:
+    """
+    DDCDoc field names, in the order values are stored.
+    """
+    return [f.name for f in dataclasses.fields(DDCDoc)]
+
+
+def build_index(
+    sources: Dict[str, List[DDCDoc]],
+    output_path: Path,
+    fingerprint: str = ""
+) -> Path:
+    """
+    Compile loaded sources into a binary index file.
+
+    The file is written to a temporary path and renamed, so readers never see
+    a partial index.
+
+    Raises:
+        ValueError: a document value does not survive a JSON round trip
+            unchanged (e.g. a tuple, set or date), so it is not indexed
+
+    Args:
+        sources: source name -> list of DDCDoc (as returned by load_all_sources)
+        output_path: index file to write
+        fingerprint: source_fingerprint() of the data the sources came from
+
+    Returns:
+        Path of the written index
+    """
+    output_path = Path(output_path)
+    fields = _doc_fields()
+
+    arena = bytearray()
+    offset_tables = []
+    source_meta = {}
+    for name, docs in sources.items():
+        offsets = [len(arena)]
+        for doc in docs:
+            values = [getattr(doc, field) for field in fields]
+            try:
+                encoded = json.dumps(values, ensure_ascii=False, separators=(",", ":"))
+            except TypeError as e:
+                raise ValueError(f"{name} {values[0]!r}: {e}") from e
+            if json.loads(encoded) != values:
+                raise ValueError(f"{name} {values[0]!r}: values change in a JSON round trip")
+            arena += encoded.encode("utf-8")
+            offsets.append(len(arena))
+        offset_tables.append(struct.pack(f"<{len(offsets)}Q", *offsets))
+        source_meta[name] = {"count": len(docs)}
+
+    # Positions are relative to the end of the header (start of the body)
+    position = 0
+    for name, table in zip(source_meta, offset_tables):
+        source_meta[name]["offsets_at"] = position
+        position += len(table)
+
+    header = {
+        "version": INDEX_VERSION,
+        "fingerprint": fingerprint,
+        "doc_fields": fields,
+        "sources": source_meta,
+        "arena_at": position,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_MAGIC)
+        f.write(_HEADER_LEN.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for table in offset_tables:
+            f.write(table)
+        f.write(arena)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class CompiledSource(Sequence):
+    """
+    Read-only, lazily decoded list of DDCDoc backed by the mapped index.
+
+    Documents are decoded on first access and then kept, so repeated scans
+    cost the same as a plain list.
+    """
+
+    def __init__(self, buffer: mmap.mmap, offsets: memoryview, arena_at: int, fields: List[str]):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._arena_at = arena_at
+        self._fields = fields
+        self._docs: List[Optional[DDCDoc]] = [None] * (len(offsets) - 1)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        doc = self._docs[index]
+        if doc is None:
+            start = self._arena_at + self._offsets[index]
+            end = self._arena_at + self._offsets[index + 1]
+            values = json.loads(self._buffer[start:end])
+            doc = DDCDoc(**dict(zip(self._fields, values)))
+            self._docs[index] = doc
+        return doc
+
+
+def read_header(path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Read the index header, or None if the file is missing or not an index.
+
+    The returned dict carries "body_at", the absolute offset all stored
+    positions are relative to.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                return None
+            (length,) = _HEADER_LEN.unpack(f.read(_HEADER_LEN.size))
+            header = json.loads(f.read(length))
+    except (OSError, struct.error, ValueError):
+        return None
+    header["body_at"] = len(INDEX_MAGIC) + _HEADER_LEN.size + length
+    return header
+
+
+def load_index(path: Path, expected_fingerprint: Optional[str] = None) -> Optional[Dict[str, CompiledSource]]:
+    """
+    Memory-map a compiled index.
+
+    Args:
+        path: index file
+        expected_fingerprint: reject the index unless it was built from this data
+
+    Returns:
+        Source name -> CompiledSource, or None if the index is missing, from
+        another format version / DDCDoc layout, or stale
+    """
+    header = read_header(path)
+    if header is None:
+        return None
+    if header.get("version") != INDEX_VERSION or header.get("doc_fields") != _doc_fields():
+        return None
+    if expected_fingerprint is not None and header.get("fingerprint") != expected_fingerprint:
+        return None
+
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    body_at = header["body_at"]
+    view = memoryview(buffer)
+    sources = {}
+    for name, meta in header["sources"].items():
+        start = body_at + meta["offsets_at"]
+        end = start + (meta["count"] + 1) * 8
+        sources[name] = CompiledSource(buffer, view[start:end].cast("Q"), body_at + header["arena_at"], header["doc_fields"])
+    return sources
+
+
+def load_sources(
+    data_dir: Optional[Path] = None,
+    index_path: Optional[Path] = None,
+    rebuild: bool = False,
+    compact: bool = False
+) -> Dict[str, Sequence[DDCDoc]]:
+    """
+    Drop-in replacement for load_all_sources backed by the compiled index.
+
+    Uses the index when it matches the current source JSON; otherwise parses
+    the JSON with load_all_sources and (re)builds the index for the next start.
+
+    Args:
+        data_dir: data_processed directory (auto-detected when omitted)
+        index_path: index file (default: data_processed/sources.ddcidx)
+        rebuild: ignore any existing index
+        compact: return doc_store.DocStore slices (columnar buffers,
+            DocView documents) instead of DDCDoc objects
+
+    Returns:
+        Source name -> sequence of DDCDoc
+    """
+    data_dir = Path(data_dir) if data_dir else find_data_processed_dir()
+    index_path = Path(index_path) if index_path else default_index_path(data_dir)
+    fingerprint = source_fingerprint(data_dir)
+
+    sources = None if rebuild else load_index(index_path, expected_fingerprint=fingerprint)
+    if sources is None:
+        sources = load_all_sources(data_dir)
+        try:
+            build_index(sources, index_path, fingerprint)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Could not write compiled index {index_path}: {e}")
+
+    if compact:
+        from .doc_store import DocStore
+
+        return DocStore.from_sources(sources).as_sources()
+    return sources
+
+
+def use_compiled_index(querier_module=None) -> bool:
+    """
+    Make Querier() load its sources through load_sources().
+
+    The Querier calls its module's load_all_sources (the same hook
+    orchestrator._init_worker_querier uses for shared corpora); this points
+    it at the compiled index. Calls with extra arguments, or without a
+    data_processed directory to fingerprint, still go to the JSON loader.
+
+    Args:
+        querier_module: module to patch (default: agents.querier)
+
+    Returns:
+        False if the Querier does not load through load_all_sources
+    """
+    if querier_module is None:
+        from .agents import querier as querier_module
+    original = getattr(querier_module, "load_all_sources", None)
+    if original is None:
+        return False
+    if getattr(original, "compiled_index", False):
+        return True
+
+    def load(*args, **kwargs):
+        if len(args) > 1 or kwargs:
+            return original(*args, **kwargs)
+        data_dir = (args[0] if args else None) or find_data_processed_dir()
+        if not data_dir:
+            return original(*args)
+        return load_sources(data_dir)
+
+    load.compiled_index = True
+    querier_module.load_all_sources = load
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the compiled DDC source index")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--data-dir", type=Path, default=None, help="data_processed directory")
+    parser.add_argument("--output", type=Path, default=None, help="Index file (default: data_processed/sources.ddcidx)")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or find_data_processed_dir()
+    index_path = args.output or default_index_path(data_dir)
+
+    if args.command == "build":
+        sources = load_all_sources(data_dir)
+        build_index(sources, index_path, source_fingerprint(data_dir))
+        print(f"[+] Wrote {index_path} ({index_path.stat().st_size / 1e6:.1f} MB)")
+
+    header = read_header(index_path)
+    if header is None:
+        print(f"[ERROR] No compiled index at {index_path}")
+        sys.exit(1)
+    fresh = header.get("fingerprint") == source_fingerprint(data_dir)
+    print(f"Index: {index_path} (version {header['version']}, {'fresh' if fresh else 'STALE'})")
+    for name, meta in header["sources"].items():
+        print(f"  {name:15s} {meta['count']:8d} docs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Incremental extraction of array elements from a streamed JSON response.
+
+The Analyzer's response schema emits "next_requests" before the long
+"reasoning" and "synthesis" fields. NextRequestsParser is fed SSE chunks as
+they arrive and returns each element of the top-level "next_requests" array
+as soon as its closing brace is seen, so Querier work can start while the
+LLM is still generating the rest of the response.
+
+Text before the first "{" (e.g. a ```json fence) is ignored.
+"""
+import json
+from typing import Dict, List, Any, Optional
+
+
+class NextRequestsParser:
+    """
+    Streaming scanner for one array-valued key of the top-level JSON object.
+    """
+
+    def __init__(self, key: str = "next_requests"):
+        """
+        Args:
+            key: top-level key whose array elements are emitted
+        """
+        self.key = key
+        self.done = False
+
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._element_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume a chunk; return the array elements completed by it.
+        """
+        completed: List[Dict[str, Any]] = []
+        if self.done:
+            return completed
+
+        self._text += chunk
+        text = self._text
+        pos = self._pos
+        while pos < len(text):
+            c = text[pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start + 1:pos]
+                pos += 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif c == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif c == "," and self._depth == 1:
+                self._current_key = None
+            elif c in "{[":
+                if c == "[" and self._depth == 1 and self._current_key == self.key:
+                    self._array_depth = self._depth + 1
+                elif c == "{" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._element_start = pos
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._array_depth is not None:
+                    if c == "}" and self._depth == self._array_depth and self._element_start is not None:
+                        element = self._decode(text[self._element_start:pos + 1])
+                        if element is not None:
+                            completed.append(element)
+                        self._element_start = None
+                    elif c == "]" and self._depth == self._array_depth - 1:
+                        self.done = True
+                        break
+            pos += 1
+
+        self._pos = pos
+        return completed
+
+    @staticmethod
+    def _decode(fragment: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(fragment)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
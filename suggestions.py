@@ -0,0 +1,211 @@
+"""
+Annif / Omikuji suggestion backends.
+
+The scripts used to call detective_system.omikuji.get_suggestions(...,
+use_docker=True), which starts a container (and loads the model) for every
+subject. A SuggestionBackend hides the transport:
+
+    "docker"                                  DockerOmikujiBackend (legacy, one container per call)
+    "http://localhost:5000/v1/projects/<id>"  AnnifHTTPBackend: long-lived `annif run` server
+                                              (model stays loaded; batches via suggest-batch)
+    "static:<file.json>"                      StaticSuggestionBackend: in-process stub for tests
+
+All backends return Suggestion(notation, label, score), best first, and
+raise RuntimeError when the service fails. Scripts take --annif-backend,
+falling back to the ANNIF_BACKEND environment variable, then "docker".
+"""
+import os
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+
+DEFAULT_BACKEND = "docker"
+
+# Annif's suggest-batch endpoint accepts at most 32 documents per call
+ANNIF_BATCH_LIMIT = 32
+
+
+@dataclass
+class Suggestion:
+    notation: str
+    label: str = ""
+    score: float = 0.0
+
+
+class SuggestionBackend(ABC):
+    """
+    Base class: suggest() for one subject, suggest_batch() for many.
+    """
+
+    @abstractmethod
+    def suggest(self, text: str, limit: int = 10) -> List[Suggestion]:
+        """
+        Suggestions for one text, best first; raises RuntimeError on service failure.
+        """
+
+    def suggest_batch(self, texts: Sequence[str], limit: int = 10) -> List[List[Suggestion]]:
+        """
+        Suggestions for each text, in input order (default: one call per text).
+        """
+        return [self.suggest(text, limit) for text in texts]
+
+    @property
+    def batches_natively(self) -> bool:
+        """
+        Whether suggest_batch() is overridden (one service call for many texts).
+        """
+        return type(self).suggest_batch is not SuggestionBackend.suggest_batch
+
+    def close(self):
+        pass
+
+
+class DockerOmikujiBackend(SuggestionBackend):
+    """
+    Per-call Docker container via detective_system.omikuji (previous behaviour).
+    """
+
+    def suggest(self, text: str, limit: int = 10) -> List[Suggestion]:
+        try:
+            from detective_system.omikuji import get_suggestions
+
+            return [
+                Suggestion(s.notation, getattr(s, "label", ""), getattr(s, "score", 0.0))
+                for s in get_suggestions(text, limit=limit, use_docker=True)
+            ]
+        except Exception as e:
+            raise RuntimeError(f"Docker omikuji suggestion failed: {e}") from e
+
+
+def _notation_from(result: Dict) -> str:
+    """
+    Annif result notation, falling back to the last URI segment.
+    """
+    notation = result.get("notation")
+    if notation:
+        return str(notation)
+    return str(result.get("uri", "")).rstrip("/").rsplit("/", 1)[-1]
+
+
+class AnnifHTTPBackend(SuggestionBackend):
+    """
+    Client for a long-lived Annif REST server (`annif run`, or its Docker
+    image started once with the port published).
+    """
+
+    def __init__(self, project_url: str, timeout: float = 30.0):
+        """
+        Args:
+            project_url: e.g. "http://localhost:5000/v1/projects/omikuji-ddc"
+            timeout: per-request timeout in seconds
+        """
+        import requests
+
+        self.project_url = project_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def suggest(self, text: str, limit: int = 10) -> List[Suggestion]:
+        data = self._post("/suggest", data={"text": text, "limit": limit})
+        return self._parse(data.get("results", []))
+
+    def suggest_batch(self, texts: Sequence[str], limit: int = 10) -> List[List[Suggestion]]:
+        """
+        Batched suggestions via suggest-batch (chunks of ANNIF_BATCH_LIMIT).
+        """
+        results: List[List[Suggestion]] = []
+        for start in range(0, len(texts), ANNIF_BATCH_LIMIT):
+            chunk = texts[start:start + ANNIF_BATCH_LIMIT]
+            documents = [{"text": text, "document_id": str(i)} for i, text in enumerate(chunk)]
+            data = self._post(f"/suggest-batch?limit={limit}", json={"documents": documents})
+            by_id = {item.get("document_id"): item.get("results", []) for item in data}
+            results.extend(self._parse(by_id.get(str(i), [])) for i in range(len(chunk)))
+        return results
+
+    def _post(self, path: str, **kwargs):
+        import requests
+
+        try:
+            resp = self.session.post(self.project_url + path, timeout=self.timeout, **kwargs)
+            resp.raise_for_status()
+            return resp.json()
+        except (requests.RequestException, ValueError) as e:
+            raise RuntimeError(f"Annif request to {self.project_url}{path} failed: {e}") from e
+
+    @staticmethod
+    def _parse(results: List[Dict]) -> List[Suggestion]:
+        suggestions = [
+            Suggestion(_notation_from(r), r.get("label", ""), float(r.get("score", 0.0)))
+            for r in results
+        ]
+        return sorted(suggestions, key=lambda s: s.score, reverse=True)
+
+    def close(self):
+        self.session.close()
+
+
+class StaticSuggestionBackend(SuggestionBackend):
+    """
+    In-process stub: fixed suggestions per subject (tests, offline runs).
+    """
+
+    def __init__(self, table: Dict[str, List[Suggestion]], default: Optional[List[Suggestion]] = None):
+        """
+        Args:
+            table: subject text -> suggestions (matched case-insensitively)
+            default: suggestions for unknown subjects (None = empty list)
+        """
+        self.table = {text.strip().lower(): list(sugg) for text, sugg in table.items()}
+        self.default = list(default or [])
+
+    @classmethod
+    def from_file(cls, path: str) -> "StaticSuggestionBackend":
+        """
+        Load {"subject": [["342", 0.9], ["340", 0.4]] | ["342", "340"], ...}.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+
+        table = {}
+        for text, entries in raw.items():
+            suggestions = []
+            for rank, entry in enumerate(entries):
+                if isinstance(entry, (list, tuple)):
+                    suggestions.append(Suggestion(str(entry[0]), "", float(entry[1])))
+                else:
+                    suggestions.append(Suggestion(str(entry), "", 1.0 / (rank + 1)))
+            table[text] = suggestions
+        return cls(table)
+
+    def suggest(self, text: str, limit: int = 10) -> List[Suggestion]:
+        return self.table.get(text.strip().lower(), self.default)[:limit]
+
+
+def get_backend(spec: Optional[str] = None) -> SuggestionBackend:
+    """
+    Build a backend from a spec string ("docker", an Annif project URL, or "static:<file>").
+
+    Args:
+        spec: backend spec (default: $ANNIF_BACKEND, then "docker")
+    """
+    spec = (spec or os.environ.get("ANNIF_BACKEND") or DEFAULT_BACKEND).strip()
+    if spec == "docker":
+        return DockerOmikujiBackend()
+    if spec.startswith(("http://", "https://")):
+        return AnnifHTTPBackend(spec)
+    if spec.startswith("static:"):
+        return StaticSuggestionBackend.from_file(spec[len("static:"):])
+    raise ValueError(f"Unknown suggestion backend {spec!r} (use 'docker', an Annif project URL or 'static:<file>')")
+
+
+def top2_notations(suggestions: List[Suggestion]) -> List[str]:
+    """
+    Annif top-2 notations, padding a single suggestion with "000".
+    """
+    if len(suggestions) >= 2:
+        return [suggestions[0].notation, suggestions[1].notation]
+    if len(suggestions) == 1:
+        return [suggestions[0].notation, "000"]
+    raise RuntimeError("Annif returned no suggestions")
@@ -8,9 +8,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from detective_systemv3.agents.querier import Querier
-from detective_systemv3.retrieval.schemas import QuerierRequest
-from detective_system.omikuji import get_suggestions
+from detective_systemv3.suggestions import get_backend, top2_notations
 
 
 def test_querier(
@@ -23,7 +21,11 @@ def test_querier(
     semantic_weight: float = 0.25
 ):
     """Test querier and display relevance statistics."""
-    
+    # Retrieval stack imported on first use so --help starts instantly
+    from detective_systemv3.agents.querier import Querier
+    from detective_systemv3.retrieval.schemas import QuerierRequest
+    from detective_systemv3.source_index import use_compiled_index
+
     print("\n" + "=" * 70)
     print("  Querier Relevance Test")
     print("=" * 70)
@@ -35,6 +37,7 @@ def test_querier(
 
     # Initialize Querier
     print("[*] Loading DDC sources...")
+    use_compiled_index()  # memory-mapped index instead of parsing the JSON
     querier = Querier()
     print(f"[+] Loaded {len(querier.all_sources)} source types\n")
 
@@ -123,6 +126,8 @@ def main():
     
     parser.add_argument("subject", help="Subject text to classify")
     parser.add_argument("--annif-top2", nargs=2, default=None, help="Override Annif top-2")
+    parser.add_argument("--annif-backend", type=str, default=None,
+                        help="Suggestion backend: docker, an Annif project URL or static:<file> (default: $ANNIF_BACKEND or docker)")
     parser.add_argument("--top-n", type=int, default=20, help="Number of results to display (default: 20)")
     parser.add_argument("--k-per-source", type=int, default=20, help="Top-k per source (default: 20)")
     parser.add_argument("--max-docs", type=int, default=100, help="Max total docs (default: 100)")
@@ -136,14 +141,11 @@ def main():
     if annif_top2 is None:
         print("[*] Fetching Annif suggestions...")
         try:
-            sugg = get_suggestions(args.subject, limit=2, use_docker=True)
-            if len(sugg) >= 2:
-                annif_top2 = [sugg[0].notation, sugg[1].notation]
-            elif len(sugg) == 1:
-                annif_top2 = [sugg[0].notation, "000"]
-            else:
-                print("[ERROR] No Annif suggestions")
-                sys.exit(1)
+            backend = get_backend(args.annif_backend)
+            try:
+                annif_top2 = top2_notations(backend.suggest(args.subject, limit=2))
+            finally:
+                backend.close()
         except RuntimeError as e:
             print(f"[ERROR] Annif failed: {e}")
             sys.exit(1)
@@ -0,0 +1,7 @@
+"""
+Shared pytest setup: make the package importable as detective_systemv3, as the scripts do.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
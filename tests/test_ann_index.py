@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from detective_systemv3.ann_index import INDEX_FILENAME, SemanticANNIndex, SemanticCandidateGenerator, recall_at_k
+from detective_systemv3.embeddings import EmbeddingMatrix
+
+
+def clustered_matrix(n_rows=3000, dim=32, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=n_rows)] + 0.3 * rng.normal(size=(n_rows, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    meta = {"model": "m", "dtype": "float32", "fingerprint": "abc", "rows": {"Sch2": [0, 2500], "T1": [2500, 500]}}
+    return EmbeddingMatrix(vectors.astype(np.float32), None, meta)
+
+
+def test_recall_against_exact_scoring():
+    embeddings = clustered_matrix()
+    index = SemanticANNIndex.build(embeddings)
+    assert index.partitions["Sch2"].nlist > 1
+    assert index.partitions["T1"].nlist == 1
+
+    queries = np.asarray(embeddings.matrix[::97])
+    exhaustive = recall_at_k(index, queries, k=10, nprobe=index.partitions["Sch2"].nlist)
+    assert exhaustive == {"Sch2": 1.0, "T1": 1.0}
+
+    probed = recall_at_k(index, queries, k=10, nprobe=16)
+    assert probed["T1"] == 1.0
+    assert probed["Sch2"] >= 0.9
+
+
+def test_load_rejects_index_built_from_other_embeddings(tmp_path):
+    embeddings = clustered_matrix()
+    path = tmp_path / "ivf.npz"
+    SemanticANNIndex.build(embeddings).save(path)
+
+    assert SemanticANNIndex.load(path, embeddings) is not None
+
+    rebuilt = clustered_matrix()
+    rebuilt.meta["fingerprint"] = "def"
+    assert SemanticANNIndex.load(path, rebuilt) is None
+
+    requantized = clustered_matrix()
+    requantized.meta["dtype"] = "float16"
+    assert SemanticANNIndex.load(path, requantized) is None
+
+
+def test_generator_persists_index_beside_the_embeddings(tmp_path, monkeypatch):
+    embeddings = clustered_matrix(n_rows=600)
+    embeddings.meta["rows"] = {"Sch2": [0, 500], "T1": [500, 100]}
+    embeddings.rows = {"Sch2": (0, 500), "T1": (500, 100)}
+    embeddings.directory = tmp_path
+    scorer = SimpleNamespace(embeddings=embeddings)
+
+    builds = []
+    build = SemanticANNIndex.build
+
+    def counting_build(embeddings, *args, **kwargs):
+        builds.append(embeddings)
+        return build(embeddings, *args, **kwargs)
+
+    monkeypatch.setattr(SemanticANNIndex, "build", counting_build)
+
+    first = SemanticCandidateGenerator.from_scorer(scorer)
+    assert (tmp_path / INDEX_FILENAME).exists()
+    second = SemanticCandidateGenerator.from_scorer(scorer)
+    assert len(builds) == 1
+    assert second.index.partitions["Sch2"].nlist == first.index.partitions["Sch2"].nlist
@@ -0,0 +1,121 @@
+import json
+
+from detective_systemv3.batch_classify import BatchClassifier, read_subjects, with_annif
+from detective_systemv3.suggestions import StaticSuggestionBackend, Suggestion
+
+
+class EchoClassifier(BatchClassifier):
+    """
+    BatchClassifier with the two-agent loop replaced by a canned result.
+    """
+
+    def __init__(self):
+        super().__init__(llm_manager=None, concurrency=2, querier=object(), cache_size=0, verbose=False)
+
+    def classify_record(self, record):
+        return {"id": record["id"], "subject": record["subject"], "final_ddc": record["annif_top2"][0], "confidence": 0.9}
+
+
+def write_lines(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_read_subjects_turns_malformed_lines_into_error_records(tmp_path):
+    path = write_lines(tmp_path / "in.jsonl", [
+        '{"id": "a", "subject": "constitutional law", "annif_top2": ["342", "340"]}',
+        '{"id": "b", "subject": ',
+        '{"id": "c"}',
+        '["not", "a", "record"]',
+        '{"id": "d", "subject": "library science", "annif_top2": ["020"]}',
+    ])
+    records = list(read_subjects(path))
+
+    assert [r["id"] for r in records] == ["a", "2", "c", "4", "d"]
+    assert [("error" in r) for r in records] == [False, True, True, True, False]
+    assert records[4]["annif_top2"] == ["020", "000"]
+
+
+def test_run_writes_error_rows_and_keeps_finished_results(tmp_path):
+    path = write_lines(tmp_path / "in.jsonl", [
+        '{"id": "a", "subject": "constitutional law", "annif_top2": ["342", "340"]}',
+        'not json',
+        '{"id": "c", "subject": "library science", "annif_top2": ["020", "025"]}',
+    ])
+    output = tmp_path / "out.jsonl"
+
+    summary = EchoClassifier().run(read_subjects(path), str(output))
+
+    rows = {row["id"]: row for row in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert set(rows) == {"a", "2", "c"}
+    assert "error" in rows["2"]
+    assert rows["c"]["final_ddc"] == "020"
+    assert summary["succeeded"] == 2 and summary["failed"] == 1
+
+    # Resume retries only the failed line
+    summary = EchoClassifier().run(read_subjects(path), str(output))
+    assert summary["skipped"] == 2 and summary["failed"] == 1
+
+
+def test_run_flushes_in_flight_results_when_the_input_fails(tmp_path):
+    def records():
+        yield {"id": "a", "subject": "constitutional law", "annif_top2": ["342", "340"]}
+        raise OSError("input went away")
+
+    output = tmp_path / "out.jsonl"
+    try:
+        EchoClassifier().run(records(), str(output))
+    except OSError:
+        pass
+    assert json.loads(output.read_text(encoding="utf-8"))["id"] == "a"
+
+
+def test_read_subjects_rejects_non_list_annif_top2(tmp_path):
+    path = write_lines(tmp_path / "in.jsonl", [
+        '{"id": "a", "subject": "constitutional law", "annif_top2": 5}',
+        '{"id": "b", "subject": "constitutional law", "annif_top2": "342"}',
+        '{"id": "c", "subject": "constitutional law", "annif_top2": []}',
+        '{"id": "d", "subject": "constitutional law", "annif_top2": [342, 340]}',
+    ])
+    records = list(read_subjects(path))
+
+    assert [("error" in r) for r in records] == [True, True, True, False]
+    assert "annif_top2" in records[1]["error"]
+    assert records[3]["annif_top2"] == ["342", "340"]
+
+
+class BatchingBackend(StaticSuggestionBackend):
+    def __init__(self, table, error=None):
+        super().__init__(table)
+        self.batches = []
+        self.error = error
+
+    def suggest_batch(self, texts, limit=10):
+        self.batches.append(list(texts))
+        if self.error:
+            raise self.error
+        return [self.suggest(text, limit) for text in texts]
+
+
+def test_with_annif_batches_only_for_native_batching_backends():
+    table = {"law": [Suggestion("340"), Suggestion("342")]}
+    records = [
+        {"id": "a", "subject": "law", "annif_top2": None},
+        {"id": "b", "subject": "law", "annif_top2": ["020", "025"]},
+        {"id": "c", "subject": "law", "annif_top2": None},
+    ]
+
+    per_record = StaticSuggestionBackend(table)
+    passed = list(with_annif(iter([dict(r) for r in records]), per_record))
+    assert [r["annif_top2"] for r in passed] == [None, ["020", "025"], None]
+
+    batching = BatchingBackend(table)
+    filled = list(with_annif(iter([dict(r) for r in records]), batching, batch_size=2, skip_ids={"c"}))
+    assert batching.batches == [["law"]]
+    assert [r["annif_top2"] for r in filled] == [["340", "342"], ["020", "025"], None]
+
+
+def test_with_annif_leaves_records_to_workers_when_a_batch_fails():
+    backend = BatchingBackend({}, error=ConnectionResetError("reset"))
+    records = list(with_annif(iter([{"id": "a", "subject": "law", "annif_top2": None}]), backend))
+    assert records == [{"id": "a", "subject": "law", "annif_top2": None}]
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+from detective_systemv3.context_budget import (
+    BudgetedContextLLM,
+    build_budgeted_context,
+    dedupe_artifacts,
+    estimate_tokens,
+    format_row,
+    select_rows,
+)
+from detective_systemv3.prompts import ANALYZER_FINAL_SYNTHESIS_PROMPT_TEMPLATE, ANALYZER_ROUND_PROMPT_TEMPLATE
+
+
+def artifact(ddc_number, source="Sch2", score=0.5, heading="", signals=None):
+    return {"ddc_number": ddc_number, "source": source, "score": score, "heading": heading, "signals": signals or {}}
+
+
+def test_dedupe_merges_sources_of_one_number():
+    rows = dedupe_artifacts([
+        artifact("340.1", "Sch2", 0.6, "Philosophy of law", {"exact_number": 1.0}),
+        artifact("340.1", "Sch2_ranges", 0.8, "", {"range_cover": 0.9}),
+        SimpleNamespace(ddc_number="340.1", source="ManSc", score=0.4, heading=None, snippet="Manual note", signals={}),
+        artifact("346", "Sch2", 0.3, "Private law"),
+    ])
+
+    assert [row["ddc_number"] for row in rows] == ["340.1", "346"]
+    merged = rows[0]
+    assert merged["sources"] == ["Sch2", "Sch2_ranges", "ManSc"]
+    assert merged["score"] == 0.8
+    assert merged["heading"] == "Philosophy of law"
+    assert merged["signals"] == {"exact_number": 1.0, "range_cover": 0.9}
+
+
+def test_context_stays_within_budget():
+    artifacts = [artifact(f"{300 + i}", score=1.0 - i / 100, heading=f"Heading number {i}") for i in range(80)]
+    context, stats = build_budgeted_context(artifacts, budget_tokens=300, sections={"Facets": "geo: France"})
+
+    assert stats["rows_after_dedupe"] == 80
+    assert 0 < stats["rows_selected"] < 80
+    assert estimate_tokens(context) <= 300
+    assert "## Facets\ngeo: France" in context
+
+
+def test_mmr_prefers_a_different_branch_over_a_near_duplicate():
+    rows = dedupe_artifacts([
+        artifact("340.1", score=0.90, heading="Philosophy of law"),
+        artifact("340.11", score=0.88, heading="Philosophy of law theory"),
+        artifact("610", score=0.80, heading="Medicine"),
+    ])
+    two_rows = sum(estimate_tokens(format_row(row)) + 1 for row in rows[:2])
+
+    by_score, _ = select_rows(rows, two_rows, mmr_lambda=1.0)
+    diverse, _ = select_rows(rows, two_rows, mmr_lambda=0.5)
+    assert [row["ddc_number"] for row in by_score] == ["340.1", "340.11"]
+    assert [row["ddc_number"] for row in diverse] == ["340.1", "610"]
+
+
+def test_pinned_rows_are_kept_and_counted_even_over_budget():
+    rows = dedupe_artifacts([
+        artifact("340", score=0.2, heading="Law"),
+        artifact("346", score=0.1, heading="Private law"),
+        artifact("610", score=0.9, heading="Medicine"),
+    ])
+    one_row = estimate_tokens(format_row(rows[-1])) + 1
+
+    selected, used = select_rows(rows, one_row, pinned_numbers=["340", "346"])
+    assert sorted(row["ddc_number"] for row in selected) == ["340", "346"]
+    assert used > one_row
+
+
+class RecordingLLM:
+    model = "fake"
+
+    def __init__(self):
+        self.messages = []
+
+    def generate(self, messages, **kwargs):
+        self.messages.append(messages)
+        return "{}"
+
+
+def test_budgeted_llm_rewrites_only_round_and_final_contexts():
+    inner = RecordingLLM()
+    llm = BudgetedContextLLM(inner, budget_tokens=200, sections=lambda: {"Facets": "{}"})
+    llm.reset(["340"])
+    hits = [SimpleNamespace(doc=SimpleNamespace(ddc_number="340", source="Sch2", heading="Law"), score=0.7, signals={})]
+    llm.add_response(SimpleNamespace(hits=hits))
+
+    system = {"role": "system", "content": "system prompt"}
+    round_prompt = ANALYZER_ROUND_PROMPT_TEMPLATE.format(round_number=2, context="x " * 5000)
+    final_prompt = ANALYZER_FINAL_SYNTHESIS_PROMPT_TEMPLATE.format(context="x " * 5000)
+    llm.generate([system, {"role": "user", "content": round_prompt}])
+    llm.generate([system, {"role": "user", "content": final_prompt}])
+    llm.generate([system, {"role": "user", "content": "# Initial Analysis"}])
+
+    round_sent, final_sent, initial_sent = (messages[1]["content"] for messages in inner.messages)
+    assert round_sent.startswith("# Round 2 Analysis\n\n## Facets")
+    assert "340 | Sch2 | 0.70" in round_sent and "x x" not in round_sent
+    assert round_sent.endswith(round_prompt[round_prompt.index("\n\n## Task\n"):])
+    assert final_sent.startswith("# Final Synthesis\n\n## Facets") and "x x" not in final_sent
+    assert initial_sent == "# Initial Analysis"
+    assert inner.messages[0][0] is system
+    assert [call["original_tokens"] > 2000 for call in llm.calls] == [True, True]
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from detective_systemv3.doc_store import CompactHit, DocStore, SignalVector
+
+
+def doc(number, heading, description, source):
+    return SimpleNamespace(ddc_number=number, heading=heading, description=description, source=source)
+
+
+SOURCES = {
+    "Sch2": [
+        doc("331", "Labor economics", "Work and workers", "Sch2"),
+        doc("331.381", "Workers in specific occupations", None, "Sch2"),
+        doc("332", "Financial economics", "", "Sch2"),
+    ],
+    "T2": [doc("T2--44", "France", None, "T2")],
+}
+
+
+def test_none_fields_stay_none():
+    store = DocStore.from_sources(SOURCES)
+    assert "description" in store.header["text_fields"]
+    assert store.header["nullable_fields"] == ["description"]
+
+    sch2 = store.as_sources()["Sch2"]
+    assert [view.description for view in sch2] == ["Work and workers", None, ""]
+    assert sch2.texts("description") == ["Work and workers", None, ""]
+    assert store.as_sources()["T2"][0].description is None
+    assert sch2[1].heading == "Workers in specific occupations"
+
+
+def test_buffers_round_trip():
+    header, buffers = DocStore.from_sources(SOURCES).to_buffers()
+    store = DocStore.from_buffers(header, {name: memoryview(buf) for name, buf in buffers.items()})
+    assert [(view.ddc_number, view.source, view.description) for view in store] == [
+        ("331", "Sch2", "Work and workers"),
+        ("331.381", "Sch2", None),
+        ("332", "Sch2", ""),
+        ("T2--44", "T2", None),
+    ]
+
+
+def test_lookup_and_prefix():
+    store = DocStore.from_sources(SOURCES)
+    assert [view.ddc_number for view in store.lookup("331.381")] == ["331.381"]
+    assert [view.ddc_number for view in store.with_prefix("331")] == ["331", "331.381"]
+    assert [view.ddc_number for view in store.with_prefix("T2--4", sources=["T2"])] == ["T2--44"]
+    assert store.with_prefix("331", sources=["T2"]) == []
+
+
+def test_signal_vector_reads_like_a_dict():
+    signals = SignalVector({"exact_number": 1.0, "custom": 0.5})
+    assert dict(signals) == {"exact_number": 1.0, "custom": 0.5}
+    assert signals.get("range_cover") is None
+    hit = CompactHit(doc("331", "Labor", None, "Sch2"), 0.9, {"heading_fuzzy": 0.25})
+    assert hit.signals["heading_fuzzy"] == 0.25
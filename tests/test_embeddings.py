@@ -0,0 +1,58 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from detective_systemv3 import embeddings
+from detective_systemv3.source_index import source_fingerprint
+
+
+class HashModel:
+    """
+    Deterministic stand-in for a SentenceTransformer.
+    """
+
+    def encode(self, texts, **kwargs):
+        vectors = np.array([[len(t), sum(map(ord, t)) % 17 + 1, 1.0] for t in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_data_dir(tmp_path):
+    data_dir = tmp_path / "data_processed"
+    (data_dir / "schedules").mkdir(parents=True)
+    (data_dir / "schedules" / "Sch2.json").write_text(json.dumps([{"ddc_number": "342"}]), encoding="utf-8")
+    return data_dir
+
+
+def test_fingerprint_ignores_derived_artifacts(tmp_path):
+    data_dir = make_data_dir(tmp_path)
+    before = source_fingerprint(data_dir)
+
+    (data_dir / "embeddings" / "model").mkdir(parents=True)
+    (data_dir / "embeddings" / "model" / "meta.json").write_text("{}", encoding="utf-8")
+    (data_dir / "sources.ddcidx").write_bytes(b"index")
+    assert source_fingerprint(data_dir) == before
+
+    (data_dir / "schedules" / "Sch3.json").write_text("[]", encoding="utf-8")
+    assert source_fingerprint(data_dir) != before
+
+
+def test_second_load_reuses_built_embeddings(tmp_path, monkeypatch):
+    data_dir = make_data_dir(tmp_path)
+    docs = {"Sch2": [SimpleNamespace(ddc_number="342", heading="Constitutional law", description="")]}
+    builds = []
+
+    def counting_build(*args, **kwargs):
+        builds.append(args)
+        return build(*args, **kwargs)
+
+    build = embeddings.build_embeddings
+    monkeypatch.setitem(embeddings._MODELS, "hash-model", HashModel())
+    monkeypatch.setattr(embeddings, "load_sources", lambda data_dir: docs)
+    monkeypatch.setattr(embeddings, "build_embeddings", counting_build)
+
+    first = embeddings.SemanticScorer.from_data_dir("hash-model", data_dir)
+    second = embeddings.SemanticScorer.from_data_dir("hash-model", data_dir, build_missing=False)
+
+    assert len(builds) == 1
+    assert first.embeddings.rows == second.embeddings.rows == {"Sch2": (0, 1)}
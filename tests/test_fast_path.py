@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+from detective_systemv3.fast_path import FastPathConfig, TieredClassifier, calibrate_margin, fast_path_decision
+
+
+def hit(number, score, **signals):
+    return SimpleNamespace(doc=SimpleNamespace(ddc_number=number, source="Sch2"), score=score, signals=signals)
+
+
+def response(*hits):
+    return SimpleNamespace(hits=list(hits))
+
+
+class RecordingQuerier:
+    def __init__(self, result):
+        self.result = result
+        self.requests = []
+
+    def execute(self, request):
+        self.requests.append(request)
+        return self.result
+
+    def get_stats(self):
+        return {}
+
+
+def test_probe_is_not_seeded_with_annif_numbers():
+    querier = RecordingQuerier(response(hit("342", 0.9, heading_fuzzy=0.9), hit("340", 0.5)))
+    classifier = TieredClassifier(None, querier=querier, cache_size=0)
+    result = classifier.classify("constitutional law", ["342", "340"])
+    assert querier.requests[0].numbers == []
+    assert querier.requests[0].keywords == ["constitutional"]
+    assert result["metadata"]["tier"] == "retrieval"
+
+
+def test_default_config_needs_no_number_signals():
+    decision = fast_path_decision(response(hit("342", 0.9), hit("340", 0.5)), ["342", "340"], FastPathConfig())
+    assert decision["accepted"]
+
+
+def test_disagreement_with_annif_escalates():
+    decision = fast_path_decision(response(hit("340", 0.9), hit("342", 0.5)), ["342", "340"], FastPathConfig())
+    assert decision["failed"] == ["annif_agreement"]
+
+
+def test_missing_annif_suggestion_escalates():
+    decision = fast_path_decision(response(hit("342", 0.9), hit("340", 0.5)), [], FastPathConfig())
+    assert not decision["accepted"] and decision["failed"] == ["annif_agreement"]
+
+
+def test_calibrate_margin_picks_smallest_precise_margin():
+    samples = [
+        (response(hit("342", 0.9), hit("340", 0.5)), ["342", "340"], "342"),
+        (response(hit("020", 0.8), hit("025", 0.75)), ["020", "025"], "025"),
+    ]
+    result = calibrate_margin(samples, target_precision=1.0, margins=[0.0, 0.1, 0.3])
+    assert result == {"min_margin": 0.1, "precision": 1.0, "coverage": 0.5}
@@ -0,0 +1,66 @@
+import pytest
+
+from detective_systemv3.llm_cache import CachedLLM, LLMCacheMiss, generate_defaults, prompt_key
+
+
+MESSAGES = [{"role": "user", "content": "classify constitutional law"}]
+
+
+class EchoLLM:
+    model = "echo-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, messages, temperature=0.2, max_tokens=1200, response_format=None, stream=False, stream_callback=None):
+        self.calls.append((temperature, max_tokens, response_format))
+        return f"response {len(self.calls)}"
+
+
+class KwargsLLM:
+    model = "kwargs-model"
+
+    def generate(self, messages, **kwargs):
+        return "ok"
+
+
+def test_omitted_params_match_explicit_defaults():
+    defaults = generate_defaults(EchoLLM())
+    assert defaults == {"temperature": 0.2, "max_tokens": 1200, "response_format": None}
+
+    omitted = prompt_key("m", MESSAGES, {}, defaults)
+    assert omitted == prompt_key("m", MESSAGES, {"temperature": 0.2}, defaults)
+    assert omitted == prompt_key("m", MESSAGES, {"temperature": None, "max_tokens": 1200}, defaults)
+    assert omitted != prompt_key("m", MESSAGES, {"temperature": 0.7}, defaults)
+    assert omitted != prompt_key("other", MESSAGES, {}, defaults)
+
+
+def test_defaults_fall_back_without_a_readable_signature():
+    assert generate_defaults(None) == generate_defaults(KwargsLLM()) == generate_defaults(EchoLLM())
+
+
+def test_cached_llm_serves_equivalent_calls_from_one_entry(tmp_path):
+    llm = EchoLLM()
+    cached = CachedLLM(llm, str(tmp_path / "cache.sqlite"))
+
+    first = cached.generate(MESSAGES)
+    assert cached.generate(MESSAGES, temperature=0.2, max_tokens=1200) == first
+    assert len(llm.calls) == 1
+    assert cached.generate(MESSAGES, temperature=0.9) != first
+    assert len(llm.calls) == 2
+    cached.close()
+
+    replay = CachedLLM(None, str(tmp_path / "cache.sqlite"), mode="replay", model="echo-model")
+    assert replay.generate(MESSAGES, temperature=0.2) == first
+    with pytest.raises(LLMCacheMiss):
+        replay.generate(MESSAGES, temperature=0.5)
+    replay.close()
+
+
+def test_stream_callback_receives_cached_response(tmp_path):
+    cached = CachedLLM(EchoLLM(), str(tmp_path / "cache.sqlite"))
+    response = cached.generate(MESSAGES)
+    chunks = []
+    assert cached.generate(MESSAGES, stream=True, stream_callback=chunks.append) == response
+    assert chunks == [response]
+    cached.close()
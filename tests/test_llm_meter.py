@@ -0,0 +1,46 @@
+from detective_systemv3.llm_meter import MeteredLLM
+
+
+class StreamingLLM:
+    model = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, messages, stream=False, stream_callback=None, **kwargs):
+        self.calls.append(stream)
+        if stream and stream_callback:
+            for chunk in ("o", "k"):
+                stream_callback(chunk)
+        return "ok"
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_does_not_stream_unless_asked():
+    inner = StreamingLLM()
+    llm = MeteredLLM(inner)
+    assert llm.generate(MESSAGES) == "ok"
+    assert inner.calls == [False]
+    assert llm.get_stats()["calls"][0]["ttft_seconds"] is None
+
+
+def test_streams_when_caller_asks():
+    inner = StreamingLLM()
+    llm = MeteredLLM(inner)
+    chunks = []
+    llm.generate(MESSAGES, stream=True, stream_callback=chunks.append)
+    assert inner.calls == [True]
+    assert chunks == ["o", "k"]
+    assert llm.get_stats()["calls"][0]["ttft_seconds"] is not None
+
+
+def test_measure_ttft_opts_in_and_feeds_listener():
+    inner = StreamingLLM()
+    llm = MeteredLLM(inner, measure_ttft=True)
+    heard = []
+    llm.chunk_listener = heard.append
+    llm.generate(MESSAGES)
+    assert inner.calls == [True]
+    assert heard == ["o", "k"]
@@ -0,0 +1,140 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from detective_systemv3 import llm_openrouter
+from detective_systemv3.llm_openrouter import OpenRouterLLM
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body or {"choices": [{"message": {"content": "ok"}}]}
+        self.content = b""
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        import requests
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}")
+
+
+def make_llm(monkeypatch, responses, deadline=180.0):
+    llm = OpenRouterLLM(api_key="test", deadline=deadline, backoff_max=20.0)
+    queue = list(responses)
+    monkeypatch.setattr(llm.session, "post", lambda *args, **kwargs: queue.pop(0))
+    sleeps = []
+    monkeypatch.setattr(llm_openrouter.time, "sleep", sleeps.append)
+    return llm, sleeps
+
+
+def test_retry_after_is_honoured_beyond_backoff_max(monkeypatch):
+    llm, sleeps = make_llm(monkeypatch, [FakeResponse(429, {"Retry-After": "60"}), FakeResponse(200)])
+    assert llm.generate([{"role": "user", "content": "hi"}]) == "ok"
+    assert sleeps == [60.0]
+
+
+def test_retry_after_past_the_deadline_gives_up(monkeypatch):
+    import requests
+    llm, sleeps = make_llm(monkeypatch, [FakeResponse(429, {"Retry-After": "60"}), FakeResponse(200)], deadline=30.0)
+    with pytest.raises(requests.HTTPError):
+        llm.generate([{"role": "user", "content": "hi"}])
+    assert sleeps == []
+
+
+def test_backoff_without_retry_after_is_capped(monkeypatch):
+    llm, sleeps = make_llm(monkeypatch, [FakeResponse(503)] * 3 + [FakeResponse(200)])
+    assert llm.generate([{"role": "user", "content": "hi"}]) == "ok"
+    assert len(sleeps) == 3 and all(0 <= s <= llm.backoff_max for s in sleeps)
+
+
+class FakeStream(FakeResponse):
+    def __init__(self, lines):
+        super().__init__(200)
+        self.lines = lines
+
+    def iter_lines(self):
+        return iter(line.encode("utf-8") for line in self.lines)
+
+
+def test_stream_concatenates_deltas(monkeypatch):
+    stream = FakeStream([
+        ": OPENROUTER PROCESSING",
+        'data: {"choices": [{"delta": {"content": "o"}}]}',
+        'data: {"choices": [{"delta": {"content": "k"}}]}',
+        "data: [DONE]",
+    ])
+    llm, _ = make_llm(monkeypatch, [stream])
+    chunks = []
+    assert llm.generate([{"role": "user", "content": "hi"}], stream=True, stream_callback=chunks.append) == "ok"
+    assert chunks == ["o", "k"]
+
+
+def test_stream_error_payload_raises(monkeypatch):
+    stream = FakeStream([
+        'data: {"choices": [{"delta": {"content": "partial"}}]}',
+        'data: {"error": {"code": 502, "message": "provider disconnected"}}',
+    ])
+    llm, _ = make_llm(monkeypatch, [stream])
+    with pytest.raises(RuntimeError, match="provider disconnected"):
+        llm.generate([{"role": "user", "content": "hi"}], stream=True)
+
+
+def test_unparseable_stream_chunk_raises():
+    with pytest.raises(RuntimeError):
+        llm_openrouter._parse_sse_line("data: {not json")
+
+
+class FakeAsyncStream:
+    def __init__(self, status, lines, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.lines = lines
+        self.released = False
+
+    @property
+    def content(self):
+        async def iterate():
+            for line in self.lines:
+                yield (line + "\n").encode("utf-8")
+        return iterate()
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"{self.status}")
+
+    async def read(self):
+        return b""
+
+    def release(self):
+        self.released = True
+
+
+def test_agenerate_streams_like_generate(monkeypatch):
+    pytest.importorskip("aiohttp")
+    import asyncio
+
+    responses = [
+        FakeAsyncStream(429, [], {"Retry-After": "0"}),
+        FakeAsyncStream(200, [
+            'data: {"choices": [{"delta": {"content": "o"}}]}',
+            'data: {"choices": [{"delta": {"content": "k"}}]}',
+            "data: [DONE]",
+        ]),
+    ]
+    queue = list(responses)
+
+    async def post(*args, **kwargs):
+        return queue.pop(0)
+
+    llm = OpenRouterLLM(api_key="test")
+    monkeypatch.setattr(llm, "_get_async_session", lambda: type("Session", (), {"post": staticmethod(post)})())
+    chunks = []
+    text = asyncio.run(llm.agenerate([{"role": "user", "content": "hi"}], stream=True, stream_callback=chunks.append))
+    assert text == "ok"
+    assert chunks == ["o", "k"]
+    assert llm.retry_count == 1
+    assert all(resp.released for resp in responses)
@@ -0,0 +1,145 @@
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from detective_systemv3.orchestrator import TwoAgentOrchestrator, _time_breakdown
+from detective_systemv3.prompts import ANALYZER_FINAL_SYNTHESIS_PROMPT_TEMPLATE
+
+
+class SleepyQuerier:
+    def execute(self, request):
+        time.sleep(0.05)
+        return SimpleNamespace(hits=[])
+
+    def get_stats(self):
+        return {}
+
+
+def run_round(parallel_workers):
+    orchestrator = TwoAgentOrchestrator(
+        None, verbose=False, parallel_workers=parallel_workers, querier=SleepyQuerier(), cache_size=0
+    )
+    orchestrator.analyzer = SimpleNamespace(integrate_response=lambda response: None)
+    try:
+        orchestrator._execute_round([SimpleNamespace(numbers=[], keywords=["law"], sources=["Sch2"]) for _ in range(4)])
+    finally:
+        orchestrator.close()
+    return _time_breakdown(orchestrator.tracer.summary())
+
+
+def test_serial_wait_matches_execution_time():
+    breakdown = run_round(parallel_workers=1)
+    assert breakdown["querier_ms"] >= 200
+    assert breakdown["querier_worker_ms"] <= breakdown["querier_ms"]
+
+
+def test_parallel_reports_wall_wait_and_summed_worker_time():
+    breakdown = run_round(parallel_workers=4)
+    assert breakdown["querier_worker_ms"] >= 200
+    assert breakdown["querier_ms"] < breakdown["querier_worker_ms"] / 2
+
+
+class AsyncLLM:
+    model = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, messages, **kwargs):
+        self.calls.append(("generate", threading.get_ident()))
+        return "{}"
+
+    async def agenerate(self, messages, **kwargs):
+        self.calls.append(("agenerate", threading.get_ident()))
+        await asyncio.sleep(0)
+        return "{}"
+
+
+class ScriptedAnalyzer:
+    def __init__(self, llm):
+        self.llm = llm
+        self.state = SimpleNamespace(relevance_history=[], facets={})
+
+    def initialize(self, subject_text, annif_top2):
+        pass
+
+    def plan_initial_round(self):
+        self.llm.generate([{"role": "user", "content": "plan"}])
+        return [SimpleNamespace(numbers=["340"], keywords=["law"], sources=["Sch2"])]
+
+    def plan_next_round(self, facet_candidates):
+        self.llm.generate([{"role": "user", "content": "next"}])
+        return []
+
+    def integrate_response(self, response):
+        pass
+
+    def synthesize_final(self):
+        self.llm.generate([{"role": "user", "content": "final"}])
+        return {"final_ddc": "340.1", "confidence": 0.8}
+
+    def get_memory_stats(self):
+        return {}
+
+
+def test_aclassify_awaits_agenerate_on_the_loop():
+    inner = AsyncLLM()
+    orchestrator = TwoAgentOrchestrator(inner, verbose=False, querier=SleepyQuerier())
+    orchestrator.analyzer = ScriptedAnalyzer(orchestrator.llm)
+
+    async def run():
+        return await orchestrator.aclassify("Contract law", ["340", "346"]), threading.get_ident()
+
+    try:
+        result, loop_thread = asyncio.run(run())
+    finally:
+        orchestrator.close()
+
+    assert result["final_ddc"] == "340.1"
+    assert inner.calls == [("agenerate", loop_thread)] * 3
+    assert len(result["metadata"]["llm_usage"]["calls"]) == 3
+    assert orchestrator.llm.loop is None
+
+
+class OneHitQuerier:
+    def execute(self, request):
+        doc = SimpleNamespace(ddc_number="340.1", source="Sch2", heading="Philosophy of law")
+        return SimpleNamespace(hits=[SimpleNamespace(doc=doc, score=0.9, signals={"exact_number": 1.0})])
+
+    def get_stats(self):
+        return {}
+
+
+class FinalPromptAnalyzer(ScriptedAnalyzer):
+    def synthesize_final(self):
+        prompt = ANALYZER_FINAL_SYNTHESIS_PROMPT_TEMPLATE.format(context="memory dump " * 1000)
+        self.llm.generate([{"role": "user", "content": prompt}])
+        return {"final_ddc": "340.1", "confidence": 0.8}
+
+
+def test_context_budget_rewrites_the_analyzer_prompt_with_round_evidence():
+    inner = AsyncLLM()
+    sent = []
+    inner.generate = lambda messages, **kwargs: sent.append(messages[-1]["content"]) or "{}"
+    orchestrator = TwoAgentOrchestrator(inner, verbose=False, querier=OneHitQuerier(), context_budget=300)
+    orchestrator.analyzer = FinalPromptAnalyzer(orchestrator.llm)
+    try:
+        result = orchestrator.classify("Philosophy of law", ["340.1", "346"])
+    finally:
+        orchestrator.close()
+
+    final_prompt = sent[-1]
+    assert "memory dump" not in final_prompt
+    assert "340.1 | Sch2 | 0.90 | ex1.00 | Philosophy of law" in final_prompt
+    assert result["metadata"]["context_budget"][0]["rows_pinned"] == 1
+
+
+def test_stream_only_mode_drops_untaken_requests_each_round():
+    orchestrator = TwoAgentOrchestrator(None, verbose=False, querier=SleepyQuerier(), stream_requests=True)
+    try:
+        orchestrator.prefetcher.add(SimpleNamespace(numbers=["340"], keywords=[], sources=["Sch2"], limits={}, options={}, facets={}))
+        orchestrator._start_prefetch()
+        assert orchestrator.prefetcher._pending == {}
+    finally:
+        orchestrator.close()
@@ -0,0 +1,109 @@
+import threading
+import dataclasses
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from detective_systemv3.prefetch import SpeculativePrefetcher, best_schedule_number, parent_number, speculative_requests
+
+
+@dataclasses.dataclass
+class Request:
+    numbers: List[str] = dataclasses.field(default_factory=list)
+    keywords: List[str] = dataclasses.field(default_factory=list)
+    facets: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    sources: List[str] = dataclasses.field(default_factory=lambda: ["Sch2"])
+    limits: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    options: Dict[str, Any] = dataclasses.field(default_factory=dict)
+
+
+class RecordingQuerier:
+    def __init__(self, gate=None):
+        self.executed = []
+        self.gate = gate
+
+    def execute(self, request):
+        if self.gate is not None:
+            self.gate.wait()
+        self.executed.append(request)
+        return SimpleNamespace(request=request, hits=[])
+
+
+def test_parent_number():
+    assert parent_number("005.13") == "005.1"
+    assert parent_number("005.1") == "005"
+    assert parent_number("342") == "340"
+    assert parent_number("340") == "300"
+    assert parent_number("300") is None
+
+
+def test_best_schedule_number_ignores_tables():
+    def hit(number, source, score):
+        return SimpleNamespace(doc=SimpleNamespace(ddc_number=number, source=source), score=score)
+
+    responses = [
+        SimpleNamespace(hits=[hit("342", "Sch2", 0.7), hit("-44", "T2", 0.95)]),
+        SimpleNamespace(hits=[hit("342.44", "Sch2_ranges", 0.8)]),
+    ]
+    assert best_schedule_number(responses) == "342.44"
+    assert best_schedule_number([]) is None
+
+
+def test_speculative_requests_cover_parent_subdivisions_and_facets():
+    template = Request(numbers=["342"], keywords=["constitution"], limits={"max_docs": 30}, options={"semantic": True})
+    facets = {"subject": "constitutional law", "geo": "France", "form": "dictionaries", "time": " "}
+
+    parent, subdivisions, t1, t2 = speculative_requests("342.44", facets, template)
+
+    assert parent.numbers == ["342.4"] and parent.keywords == ["constitution"] and parent.limits == {"max_docs": 30}
+    assert subdivisions.numbers == ["342.44"]
+    assert subdivisions.options == {"semantic": True, "include_std_subdivisions": True}
+    assert template.options == {"semantic": True}
+    assert (t1.sources, t1.numbers, t1.keywords) == (["T1"], [], ["dictionaries"])
+    assert (t2.sources, t2.keywords) == (["T2"], ["France"])
+
+    assert len(speculative_requests("342.44", facets, template, max_probes=2)) == 2
+    assert [p.sources for p in speculative_requests("-44", facets, template)] == [["T1"], ["T2"]]
+    assert speculative_requests(None, {}, template) == []
+
+
+def test_take_hit_and_miss_update_hit_rate():
+    prefetcher = SpeculativePrefetcher(RecordingQuerier())
+    try:
+        prefetcher.start([Request(numbers=["340"]), Request(numbers=["342"])])
+        prefetcher.add(Request(numbers=["346"]))
+
+        response = prefetcher.take(Request(numbers=["340"]))
+        assert response.request.numbers == ["340"]
+        assert prefetcher.take(Request(numbers=["340"])) is None  # handed over once
+        assert prefetcher.take(Request(numbers=["610"])) is None
+        assert prefetcher.take(Request(numbers=["346"])) is not None
+
+        stats = prefetcher.get_stats()
+        assert stats["speculative"] == {"issued": 2, "used": 1, "hit_rate": 0.5}
+        assert stats["streamed"] == {"issued": 1, "used": 1, "hit_rate": 1.0}
+    finally:
+        prefetcher.close()
+
+
+def test_start_replaces_the_previous_round():
+    gate = threading.Event()
+    querier = RecordingQuerier(gate)
+    prefetcher = SpeculativePrefetcher(querier, max_workers=1)
+    try:
+        prefetcher.start([Request(numbers=["100"]), Request(numbers=["340"]), Request(numbers=["342"])])
+        prefetcher.add(Request(numbers=["346"]))
+        prefetcher.start([Request(numbers=["342"])])
+        gate.set()
+
+        assert prefetcher.take(Request(numbers=["342"])) is not None
+        assert prefetcher.take(Request(numbers=["340"])) is None
+        assert prefetcher.take(Request(numbers=["346"])) is None
+
+        prefetcher.add(Request(numbers=["346"]))
+        prefetcher.clear()
+        assert prefetcher.take(Request(numbers=["346"])) is None
+        # Kept probe is not issued twice; the queued ones never ran
+        assert prefetcher.get_stats()["speculative"]["issued"] == 3
+        assert Request(numbers=["340"]) not in querier.executed
+    finally:
+        prefetcher.close()
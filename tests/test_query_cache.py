@@ -0,0 +1,139 @@
+import time
+import threading
+import dataclasses
+from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from detective_systemv3.query_cache import CachingQuerier, LRUCache, canonical_request_key
+
+
+@dataclasses.dataclass
+class Doc:
+    ddc_number: str
+    source: str
+
+
+@dataclasses.dataclass
+class Hit:
+    doc: Doc
+    score: float
+    signals: Dict[str, float]
+
+
+@dataclasses.dataclass
+class Request:
+    numbers: List[str] = dataclasses.field(default_factory=list)
+    keywords: List[str] = dataclasses.field(default_factory=list)
+    facets: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    sources: List[str] = dataclasses.field(default_factory=lambda: ["Sch2"])
+    limits: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    options: Dict[str, Any] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class Response:
+    hits: List[Hit]
+    numbers_found: List[str]
+    diagnostics: Dict[str, Any]
+    facet_candidates: Dict[str, List[Any]] = dataclasses.field(default_factory=dict)
+
+
+class CountingQuerier:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def execute(self, request):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        hits = [Hit(Doc(n, s), 0.9 - 0.1 * i, {"exact_number": 1.0}) for i, n in enumerate(request.numbers) for s in request.sources]
+        return Response(hits, list(request.numbers), {"top_signals": {"exact_number": 1.0}})
+
+    def get_stats(self):
+        return {"sources": 1}
+
+
+def test_canonical_key_ignores_order_case_and_duplicates():
+    a = Request(numbers=["005", "620", "005"], keywords=["Software", "law"], sources=["T1", "Sch2"])
+    b = Request(numbers=["620", "005"], keywords=["law", "software "], sources=["Sch2", "T1"])
+    assert canonical_request_key(a) == canonical_request_key(b)
+    assert canonical_request_key(a) != canonical_request_key(Request(numbers=["005"]))
+
+
+def test_lru_evicts_least_recently_used_and_expires():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+    assert cache.get_stats()["evictions"] == 1
+
+    expiring = LRUCache(ttl_seconds=0.0)
+    expiring.put("a", 1)
+    time.sleep(0.001)
+    assert expiring.get("a") is None
+
+
+def test_callers_cannot_corrupt_cached_hits():
+    querier = CachingQuerier(CountingQuerier(), profiler=None)
+    first = querier.execute(Request(numbers=["005"]))
+    first.hits[0].signals["exact_number"] = 0.0
+    first.hits.append(first.hits[0])
+    first.diagnostics["top_signals"].clear()
+
+    second = querier.execute(Request(numbers=["005"]))
+    assert querier.querier.calls == 1
+    assert len(second.hits) == 1
+    assert second.hits[0].signals == {"exact_number": 1.0}
+    assert second.diagnostics["top_signals"] == {"exact_number": 1.0}
+
+
+@pytest.mark.parametrize("split_sources", [False, True])
+def test_concurrent_misses_execute_once(split_sources):
+    querier = CachingQuerier(CountingQuerier(delay=0.05), split_sources=split_sources, profiler=None)
+    request = Request(numbers=["342"], sources=["Sch2", "T1"])
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(lambda _: querier.execute(request), range(8)))
+
+    assert querier.querier.calls == (2 if split_sources else 1)
+    assert all(len(r.hits) == 2 for r in responses)
+    assert len({id(r.hits[0].signals) for r in responses}) == 8
+    assert querier.get_stats()["cache"]["coalesced"] >= 1
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    class Failing(CountingQuerier):
+        def execute(self, request):
+            super().execute(request)
+            raise RuntimeError("boom")
+
+    querier = CachingQuerier(Failing(delay=0.05), profiler=None)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(querier.execute, Request(numbers=["1"])) for _ in range(4)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+    calls = querier.querier.calls
+    with pytest.raises(RuntimeError):
+        querier.execute(Request(numbers=["1"]))
+    assert querier.querier.calls == calls + 1
+
+
+def test_signal_stats_since_snapshot_cover_only_later_requests():
+    from detective_systemv3.signal_profile import SignalProfiler
+
+    querier = CachingQuerier(CountingQuerier(), profiler=SignalProfiler())
+    querier.execute(Request(numbers=["005", "006"]))
+    assert querier.get_stats()["signals"]["exact_number"]["mean_value"] == 1.0
+
+    since = querier.signal_snapshot()
+    assert querier.get_stats(signals_since=since)["signals"] == {}
+    querier.execute(Request(numbers=["620"]))
+    signals = querier.get_stats(signals_since=since)["signals"]
+    assert signals["exact_number"]["nonzero_rate"] == 1.0
+    assert querier.get_stats()["signals"]["exact_number"]["calls"] == 0
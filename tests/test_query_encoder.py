@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from detective_systemv3.query_encoder import QueryEncoder
+
+
+class FakeModel:
+    """Deterministic encode(): one row per text, optionally held until released."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False):
+        self.release.wait(5)
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model failed")
+        rows = np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+        return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def make_encoder():
+    encoders = []
+
+    def make(**kwargs):
+        kwargs.setdefault("model", FakeModel())
+        encoder = QueryEncoder("fake", **kwargs)
+        encoders.append(encoder)
+        return encoder
+
+    yield make
+    for encoder in encoders:
+        encoder.close()
+
+
+def test_texts_queued_together_share_a_batch(make_encoder):
+    encoder = make_encoder(max_wait_ms=50)
+    vectors = encoder.encode_many(["law", "library science", "history"])
+    assert vectors.shape == (3, 2)
+    assert encoder._model.batches == [["law", "library science", "history"]]
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+
+def test_max_batch_splits_batches(make_encoder):
+    encoder = make_encoder(max_batch=2, max_wait_ms=50)
+    encoder.encode_many(["a", "bb", "ccc"])
+    assert [len(batch) for batch in encoder._model.batches] == [2, 1]
+
+
+def test_identical_texts_are_coalesced_then_cached(make_encoder):
+    model = FakeModel()
+    model.release.clear()
+    encoder = make_encoder(model=model, max_wait_ms=0)
+    first = encoder.submit("law")
+    second = encoder.submit("law")
+    assert second is first
+    model.release.set()
+    vector = first.result(5)
+    assert not vector.flags.writeable
+
+    assert np.array_equal(encoder.submit("law").result(5), vector)
+    stats = encoder.get_stats()
+    assert (stats["requests"], stats["coalesced"], stats["encoded"]) == (3, 1, 1)
+    assert stats["cache"]["hits"] == 1
+
+
+def test_model_errors_reach_callers_and_are_not_cached(make_encoder):
+    encoder = make_encoder(model=FakeModel(fail=True))
+    with pytest.raises(RuntimeError, match="model failed"):
+        encoder.encode("law")
+    encoder._model.fail = False
+    assert encoder.encode("law").shape == (2,)
+    assert encoder.get_stats()["errors"] == 1
+
+
+def test_close_finishes_queued_texts(make_encoder):
+    model = FakeModel()
+    model.release.clear()
+    encoder = make_encoder(model=model, max_wait_ms=0)
+    future = encoder.submit("law")
+    model.release.set()
+    encoder.close()
+    assert future.done() and future.result().shape == (2,)
+
+
+class ShortModel(FakeModel):
+    def encode(self, texts, **kwargs):
+        return super().encode(texts[:-1], **kwargs)
+
+
+class BrokenCache:
+    def get(self, text):
+        return None
+
+    def put(self, text, row):
+        raise MemoryError("cache full")
+
+    def get_stats(self):
+        return {}
+
+
+def test_wrong_row_count_and_cache_failures_still_resolve_every_future(make_encoder):
+    encoder = make_encoder(model=ShortModel(), max_wait_ms=50)
+    futures = [encoder.submit(text) for text in ("law", "history")]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="for 2 texts"):
+            future.result(5)
+
+    encoder = make_encoder(max_wait_ms=0)
+    encoder.cache = BrokenCache()
+    with pytest.raises(MemoryError):
+        encoder.submit("law").result(5)
+    assert encoder._pending == {}
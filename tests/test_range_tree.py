@@ -0,0 +1,88 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from detective_systemv3.range_tree import (
+    IntervalTree, NotationTrie, RangeIndex, key_successor, notation_key, parse_range_key,
+)
+
+
+def doc(number):
+    return SimpleNamespace(ddc_number=number, heading="", description="")
+
+
+@pytest.mark.parametrize("notation, key", [
+    ("331.381", ("", "331381")),
+    ("T1--0922", ("T1", "0922")),
+    ("t2—44", None),
+    ("342.", ("", "342")),
+    ("001-008", None),
+    ("", None),
+])
+def test_notation_key(notation, key):
+    assert notation_key(notation) == key
+
+
+def test_key_successor_carries():
+    assert key_successor("008") == "009"
+    assert key_successor("099") == "1"
+    assert key_successor("999") > "9999999"
+
+
+@pytest.mark.parametrize("notation, parsed", [
+    ("001-008", ("", "001", "009")),
+    ("920.03-.09", ("", "92003", "9201")),
+    ("822.3301-822.2", ("", "8222", "8223302")),
+    ("220.1-220.Summary", ("", "2201", None)),
+    ("T1--01-09", ("T1", "01", "1")),
+    ("342", None),
+])
+def test_parse_range_key(notation, parsed):
+    assert parse_range_key(notation) == parsed
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(0)
+    intervals = []
+    for i in range(300):
+        lo = f"{rng.randint(0, 999):03d}"
+        intervals.append((lo, key_successor(max(lo, f"{rng.randint(0, 999):03d}")), i))
+    tree = IntervalTree.build(intervals)
+
+    for point in [f"{rng.randint(0, 999):03d}{rng.randint(0, 9)}" for _ in range(200)]:
+        expected = sorted(p for lo, hi, p in intervals if lo <= point < hi)
+        assert sorted(tree.stab(point)) == expected
+
+    assert IntervalTree.build([]) is None
+
+
+def test_notation_trie_ancestors_and_descendants():
+    trie = NotationTrie()
+    for digits in ("005", "0051", "00513", "0052", "006"):
+        trie.insert(digits, digits)
+    assert trie.ancestors("005133") == ["005", "0051", "00513"]
+    assert trie.descendants("005") == ["005", "0051", "0052", "00513"]
+    assert trie.descendants("005", limit=2) == ["005", "0051"]
+    assert trie.descendants("007") == []
+
+
+def test_range_index_lookups():
+    sources = {
+        "Sch2_ranges": [doc("001-008"), doc("220.1-220.Summary"), doc("T1--01-09")],
+        "Sch2": [doc("005"), doc("005.1"), doc("005.13"), doc("006")],
+        "T1": [doc("T1--0922")],
+    }
+    index = RangeIndex.build(sources)
+
+    assert index.covering("005.1") == [("Sch2_ranges", 0)]
+    assert index.covering("009") == []
+    assert index.covering("220.15") == [("Sch2_ranges", 1)]
+    assert index.covering("T1--0922") == [("Sch2_ranges", 2)]
+    assert index.covering("005.1", sources=["ManSc"]) == []
+
+    assert index.with_prefix("005") == [("Sch2", 0), ("Sch2", 1), ("Sch2", 2)]
+    assert index.with_prefix("005", limit=2) == [("Sch2", 0), ("Sch2", 1)]
+    assert index.ancestors("005.139") == [("Sch2", 0), ("Sch2", 1), ("Sch2", 2)]
+    assert index.ancestors("T1--0922") == [("T1", 0)]
+    assert index.with_prefix("not a number") == []
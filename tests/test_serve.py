@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from detective_systemv3.serve import ClassificationService, Coalescer, QueueFull
+from detective_systemv3.suggestions import StaticSuggestionBackend, Suggestion
+
+
+@pytest.fixture
+def coalescer():
+    coalescer = Coalescer(workers=1, queue_size=1)
+    yield coalescer
+    coalescer.close()
+
+
+def test_identical_in_flight_requests_share_one_execution(coalescer):
+    release = threading.Event()
+    calls = []
+
+    def work(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    first = coalescer.submit("a", work, 21)
+    second = coalescer.submit("a", work, 21)
+    assert second is first
+    release.set()
+    assert first.result(5) == 42 and second.result(5) == 42
+    assert calls == [21]
+    assert coalescer.get_stats()["coalesced"] == 1
+
+
+def test_finished_requests_are_executed_again(coalescer):
+    assert coalescer.submit("a", lambda: 1).result(5) == 1
+    coalescer.executor.submit(lambda: None).result(5)  # let the done callback run
+    assert coalescer.get_stats()["in_flight"] == 0
+    assert coalescer.submit("a", lambda: 2).result(5) == 2
+    assert coalescer.get_stats()["submitted"] == 2
+
+
+def test_rejects_beyond_workers_plus_queue(coalescer):
+    release = threading.Event()
+    running = coalescer.submit("a", release.wait, 5)
+    queued = coalescer.submit("b", lambda: "b")
+    with pytest.raises(QueueFull):
+        coalescer.submit("c", lambda: "c")
+    # A duplicate of an in-flight request is still served
+    assert coalescer.submit("b", lambda: "other") is queued
+    stats = coalescer.get_stats()
+    assert (stats["in_flight"], stats["queued"], stats["rejected"]) == (2, 1, 1)
+    release.set()
+    assert running.result(5) and queued.result(5) == "b"
+
+
+def test_errors_reach_every_waiter(coalescer):
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    first = coalescer.submit("a", fail)
+    second = coalescer.submit("a", fail)
+    release.set()
+    for future in (first, second):
+        with pytest.raises(RuntimeError, match="boom"):
+            future.result(5)
+
+
+class StubQuerier:
+    def execute(self, request):
+        raise AssertionError("search should be rejected before querying")
+
+    def get_stats(self):
+        return {}
+
+
+@pytest.fixture
+def service():
+    backend = StaticSuggestionBackend({}, default=[Suggestion("340"), Suggestion("342")])
+    service = ClassificationService(None, querier=StubQuerier(), backend=backend, workers=1, queue_size=4, cache_size=0)
+    yield service
+    service.close()
+
+
+def test_classify_coalesces_across_client_ids(service):
+    release = threading.Event()
+    calls = []
+
+    def classify_record(record):
+        calls.append(record)
+        release.wait(5)
+        return {"id": record["id"], "subject": record["subject"], "annif_top2": record["annif_top2"], "final_ddc": "342"}
+
+    service.classifier.classify_record = classify_record
+    results = {}
+
+    def request(client_id):
+        payload = {"subject": "constitutional law", "annif_top2": ["342"], "id": client_id}
+        results[client_id] = service.handle("classify", payload)
+
+    threads = [threading.Thread(target=request, args=(client_id,)) for client_id in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    while service.coalescer.get_stats()["coalesced"] < 1:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1 and calls[0]["annif_top2"] == ["342", "000"]
+    assert {client_id: row["id"] for client_id, row in results.items()} == {"a": "a", "b": "b"}
+    assert results["a"]["final_ddc"] == results["b"]["final_ddc"] == "342"
+
+
+@pytest.mark.parametrize("annif_top2", ["342", ["342", "340", "341"], [], [342], ["342", " "], {"a": 1}])
+def test_invalid_annif_top2_is_a_client_error(service, annif_top2):
+    for endpoint in ("classify", "search"):
+        with pytest.raises(ValueError, match="annif_top2"):
+            service.handle(endpoint, {"subject": "law", "annif_top2": annif_top2})
@@ -0,0 +1,119 @@
+import os
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+from detective_systemv3.shared_corpus import attach_corpus, publish_corpus, use_shared_corpus
+from detective_systemv3.token_index import SourceTokenIndex
+
+
+def doc(number, heading, description, source):
+    return SimpleNamespace(ddc_number=number, heading=heading, description=description, source=source)
+
+
+SOURCES = {
+    "Sch2": [doc("331", "Labor economics", "Work and workers", "Sch2"), doc("331.381", "Occupations", None, "Sch2")],
+    "T1": [doc("T1--03", "Dictionaries", "Encyclopedias, concordances", "T1")],
+}
+
+
+def rows(corpus):
+    return {
+        name: [(view.ddc_number, view.heading, view.description) for view in docs]
+        for name, docs in corpus.sources.items()
+    }
+
+
+EXPECTED = {
+    "Sch2": [("331", "Labor economics", "Work and workers"), ("331.381", "Occupations", None)],
+    "T1": [("T1--03", "Dictionaries", "Encyclopedias, concordances")],
+}
+
+
+def test_file_bundle_round_trip(tmp_path):
+    path = str(tmp_path / "corpus.bundle")
+    token_index = SourceTokenIndex.build(SOURCES)
+    published = publish_corpus(SOURCES, path, token_index=token_index)
+    published.close()
+    assert not os.path.exists(path + ".tmp")
+
+    corpus = attach_corpus(path)
+    try:
+        assert rows(corpus) == EXPECTED
+        assert [view.ddc_number for view in corpus.store.with_prefix("331")] == ["331", "331.381"]
+        for keywords in (["labor"], ["occupations"], ["encyclopedias"]):
+            for source in SOURCES:
+                assert corpus.token_index.candidates(source, keywords) == token_index.candidates(source, keywords)
+        assert corpus.embeddings is None
+        assert corpus.fingerprint is None
+    finally:
+        corpus.close()
+
+
+def test_embeddings_round_trip(tmp_path):
+    np = pytest.importorskip("numpy")
+    from detective_systemv3.embeddings import EmbeddingMatrix
+
+    matrix = np.arange(12, dtype=np.int8).reshape(3, 4)
+    scales = np.array([0.5, 1.0, 2.0], dtype=np.float32)
+    meta = {"model": "hash", "rows": {"Sch2": [0, 2], "T1": [2, 3]}}
+    path = str(tmp_path / "corpus.bundle")
+    publish_corpus(SOURCES, path, embeddings=EmbeddingMatrix(matrix, scales, meta)).close()
+
+    corpus = attach_corpus(path)
+    try:
+        assert np.array_equal(corpus.embeddings.matrix, matrix)
+        assert np.array_equal(corpus.embeddings.scales, scales)
+        assert corpus.embeddings.rows == {"Sch2": (0, 2), "T1": (2, 3)}
+    finally:
+        corpus.close()
+
+
+def test_shared_memory_round_trip():
+    pytest.importorskip("multiprocessing.shared_memory")
+    spec = f"shm:ddc-test-{os.getpid()}"
+    published = publish_corpus(SOURCES, spec)
+    try:
+        corpus = attach_corpus(spec)
+        assert rows(corpus) == EXPECTED
+        corpus.close()
+    finally:
+        published.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.bundle"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        attach_corpus(str(path))
+
+
+def test_fingerprint_is_checked_on_attach(tmp_path):
+    path = str(tmp_path / "corpus.bundle")
+    publish_corpus(SOURCES, path, fingerprint="abc").close()
+
+    corpus = attach_corpus(path, expected_fingerprint="abc")
+    assert corpus.fingerprint == "abc"
+    corpus.close()
+    attach_corpus(path).close()
+    with pytest.raises(ValueError, match="stale"):
+        attach_corpus(path, expected_fingerprint="def")
+
+
+def test_use_shared_corpus_serves_sources_and_token_index(tmp_path):
+    path = str(tmp_path / "corpus.bundle")
+    publish_corpus(SOURCES, path, token_index=SourceTokenIndex.build(SOURCES)).close()
+    querier_module = ModuleType("querier")
+    querier_module.load_all_sources = lambda: SOURCES
+    build = SourceTokenIndex.build
+
+    corpus = attach_corpus(path)
+    try:
+        assert use_shared_corpus(corpus, querier_module) == ["sources", "token_index"]
+        sources = querier_module.load_all_sources()
+        assert sources is corpus.sources
+        assert SourceTokenIndex.build(sources) is corpus.token_index
+        assert SourceTokenIndex.build(SOURCES) is not corpus.token_index
+    finally:
+        SourceTokenIndex.build = build
+        corpus.close()
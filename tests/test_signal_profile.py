@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from detective_systemv3.signal_profile import SignalGatingConfig, SignalProfiler, score_candidates
+
+
+def test_stats_since_a_snapshot_are_a_delta():
+    profiler = SignalProfiler()
+    profiler.record("heading_fuzzy", 0.002, calls=2)
+    profiler.observe_hits([SimpleNamespace(signals={"heading_fuzzy": 0.8})])
+    since = profiler.snapshot()
+
+    profiler.record("heading_fuzzy", 0.001)
+    profiler.record("desc_fuzzy", 0.003)
+    profiler.observe_hits([SimpleNamespace(signals={"heading_fuzzy": 0.0})])
+
+    stats = profiler.get_stats(since=since)
+    assert stats["heading_fuzzy"]["calls"] == 1
+    assert stats["heading_fuzzy"]["total_ms"] == 1.0
+    assert stats["heading_fuzzy"]["mean_value"] == 0.0
+    assert stats["heading_fuzzy"]["nonzero_rate"] == 0.0
+    assert stats["desc_fuzzy"]["calls"] == 1
+
+    lifetime = profiler.get_stats()
+    assert lifetime["heading_fuzzy"]["calls"] == 3
+    assert lifetime["heading_fuzzy"]["mean_value"] == 0.4
+
+
+def test_signals_idle_since_the_snapshot_are_omitted():
+    profiler = SignalProfiler()
+    profiler.record("table_alignment", 0.001)
+    assert profiler.get_stats(since=profiler.snapshot()) == {}
+
+
+def test_score_candidates_with_no_room_scores_nothing_lazily():
+    config = SignalGatingConfig(lazy=frozenset({"desc_fuzzy"}))
+    fns = {"heading_fuzzy": lambda doc: doc, "desc_fuzzy": lambda doc: doc / 2}
+
+    assert score_candidates([0.2, 0.9], fns, k=0, config=config, profiler=None) == (
+        [], {"scored": 2, "lazy_evaluated": 0, "lazy_skipped": 2}
+    )
+    top, counts = score_candidates([0.2, 0.9], fns, k=1, config=config, profiler=None)
+    assert [candidate for _, _, candidate in top] == [0.9]
+
+
+def test_from_stats_gates_only_well_sampled_signals():
+    profiler = SignalProfiler()
+    hits = [SimpleNamespace(signals={"table_alignment": 0.0, "keyword_proximity": 0.01})] * 20
+    profiler.observe_hits(hits)
+    stats = profiler.get_stats()
+    assert stats["table_alignment"]["observed"] == 20
+
+    assert SignalGatingConfig.from_stats(stats).to_dict() == {"disabled": [], "lazy": [], "max_values": {}}
+    gated = SignalGatingConfig.from_stats(stats, min_samples=20)
+    assert gated.disabled == {"table_alignment"} and gated.lazy == {"keyword_proximity"}
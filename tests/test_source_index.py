@@ -0,0 +1,98 @@
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+from detective_systemv3 import source_index
+from detective_systemv3.source_index import (
+    INDEX_FILENAME, build_index, load_index, load_sources, source_fingerprint, use_compiled_index,
+)
+
+
+VALUES = [
+    {"ddc_number": "342", "heading": "Constitutional law", "description": "Laws of jurisdictions", "source": "Sch2"},
+    {"ddc_number": "342.73", "heading": "United States – Verfassung", "description": None, "source": "Sch2"},
+]
+
+
+def make_doc(values):
+    return SimpleNamespace(**{name: values.get(name) for name in source_index._doc_fields()})
+
+
+def as_dicts(docs):
+    return [{name: getattr(doc, name) for name in source_index._doc_fields()} for doc in docs]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / "Sch2").mkdir()
+    (tmp_path / "Sch2" / "normal.json").write_text("[]", encoding="utf-8")
+    return tmp_path
+
+
+def test_build_and_load_round_trip(tmp_path):
+    sources = {"Sch2": [make_doc(v) for v in VALUES], "T1": []}
+    path = build_index(sources, tmp_path / INDEX_FILENAME, fingerprint="abc")
+    loaded = load_index(path, expected_fingerprint="abc")
+
+    assert list(loaded) == ["Sch2", "T1"]
+    assert as_dicts(loaded["Sch2"]) == as_dicts(sources["Sch2"])
+    assert len(loaded["T1"]) == 0
+    assert loaded["Sch2"][-1] is loaded["Sch2"][1]
+
+
+def test_stale_or_foreign_index_is_rejected(tmp_path):
+    path = build_index({"Sch2": [make_doc(VALUES[0])]}, tmp_path / INDEX_FILENAME, fingerprint="old")
+    assert load_index(path, expected_fingerprint="new") is None
+    assert load_index(tmp_path / "missing.ddcidx") is None
+    (tmp_path / "junk").write_bytes(b"not an index")
+    assert load_index(tmp_path / "junk") is None
+
+
+def test_values_that_change_in_json_are_refused(tmp_path):
+    doc = make_doc(dict(VALUES[0], heading=("Constitutional", "law")))
+    with pytest.raises(ValueError):
+        build_index({"Sch2": [doc]}, tmp_path / INDEX_FILENAME)
+    doc = make_doc(dict(VALUES[0], heading={"law"}))
+    with pytest.raises(ValueError):
+        build_index({"Sch2": [doc]}, tmp_path / INDEX_FILENAME)
+
+
+def test_fingerprint_tracks_sources_but_not_derived_files(data_dir):
+    before = source_fingerprint(data_dir)
+    (data_dir / "embeddings").mkdir()
+    (data_dir / "embeddings" / "meta.json").write_text("{}", encoding="utf-8")
+    (data_dir / (INDEX_FILENAME + ".json")).write_text("{}", encoding="utf-8")
+    assert source_fingerprint(data_dir) == before
+
+    (data_dir / "Sch2" / "normal.json").write_text("[{}]", encoding="utf-8")
+    assert source_fingerprint(data_dir) != before
+
+
+def test_load_sources_parses_once_then_rebuilds_when_stale(data_dir, monkeypatch):
+    parses = []
+
+    def parse(path):
+        parses.append(path)
+        return {"Sch2": [make_doc(v) for v in VALUES]}
+
+    monkeypatch.setattr(source_index, "load_all_sources", parse)
+    first = load_sources(data_dir)
+    second = load_sources(data_dir)
+    assert len(parses) == 1
+    assert as_dicts(second["Sch2"]) == as_dicts(first["Sch2"])
+
+    (data_dir / "Sch2" / "ranges.json").write_text("[]", encoding="utf-8")
+    load_sources(data_dir)
+    assert len(parses) == 2
+
+
+def test_use_compiled_index_patches_the_querier_hook(data_dir, monkeypatch):
+    module = ModuleType("fake_querier")
+    module.load_all_sources = lambda *args, **kwargs: ("json", args, kwargs)
+    monkeypatch.setattr(source_index, "load_sources", lambda data_dir: ("index", data_dir))
+
+    assert use_compiled_index(module)
+    assert use_compiled_index(module)
+    assert module.load_all_sources(data_dir) == ("index", data_dir)
+    assert module.load_all_sources(data_dir, strict=True) == ("json", (data_dir,), {"strict": True})
+    assert not use_compiled_index(ModuleType("other_querier"))
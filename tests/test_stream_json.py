@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from detective_systemv3.stream_json import NextRequestsParser
+
+
+RESPONSE = {
+    "facets": {"subject": "law", "next_requests": [{"numbers": ["999"]}]},
+    "next_requests": [
+        {"numbers": ["342"], "keywords": ["constitutional {law}"]},
+        {"numbers": [], "keywords": ["say \"hi\"", "back\\slash ]"], "limits": {"k": [1, 2]}},
+    ],
+    "reasoning": "the {next_requests} key [is] done",
+}
+TEXT = "```json\n" + json.dumps(RESPONSE, indent=2) + "\n```"
+
+
+def feed_all(parser, chunks):
+    elements = []
+    for chunk in chunks:
+        elements.extend(parser.feed(chunk))
+    return elements
+
+
+def test_whole_response_in_one_chunk():
+    parser = NextRequestsParser()
+    assert feed_all(parser, [TEXT]) == RESPONSE["next_requests"]
+    assert parser.done
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_any_chunking_gives_the_same_elements(size):
+    parser = NextRequestsParser()
+    chunks = [TEXT[i:i + size] for i in range(0, len(TEXT), size)]
+    assert feed_all(parser, chunks) == RESPONSE["next_requests"]
+
+
+def test_elements_are_emitted_as_soon_as_they_close():
+    parser = NextRequestsParser()
+    prefix = '{"next_requests": [{"numbers": ["342"]}'
+    assert parser.feed(prefix) == [{"numbers": ["342"]}]
+    assert not parser.done
+    assert parser.feed(', {"numbers": ["340"]}]') == [{"numbers": ["340"]}]
+    assert parser.done
+    assert parser.feed(', "next_requests": [{"numbers": ["1"]}]}') == []
+
+
+def test_nested_key_of_the_same_name_is_ignored():
+    parser = NextRequestsParser()
+    text = '{"facets": {"next_requests": [{"numbers": ["999"]}]}, "stop": true}'
+    assert parser.feed(text) == []
+    assert not parser.done
+
+
+def test_non_object_elements_are_skipped():
+    parser = NextRequestsParser()
+    assert parser.feed('{"next_requests": ["342", 7, {"numbers": ["342"]}]}') == [{"numbers": ["342"]}]
+
+
+def test_custom_key():
+    parser = NextRequestsParser(key="alternatives")
+    text = '{"next_requests": [{"numbers": ["1"]}], "alternatives": [{"ddc": "340"}]}'
+    assert parser.feed(text) == [{"ddc": "340"}]
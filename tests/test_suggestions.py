@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from detective_systemv3.suggestions import (
+    ANNIF_BATCH_LIMIT,
+    AnnifHTTPBackend,
+    DockerOmikujiBackend,
+    StaticSuggestionBackend,
+    Suggestion,
+    SuggestionBackend,
+    get_backend,
+    top2_notations,
+)
+
+
+def write_table(tmp_path, table):
+    path = tmp_path / "annif.json"
+    path.write_text(json.dumps(table), encoding="utf-8")
+    return str(path)
+
+
+def test_backend_requires_suggest():
+    with pytest.raises(TypeError):
+        SuggestionBackend()
+
+
+def test_get_backend_parses_specs(tmp_path, monkeypatch):
+    pytest.importorskip("requests")
+    monkeypatch.delenv("ANNIF_BACKEND", raising=False)
+    assert isinstance(get_backend(), DockerOmikujiBackend)
+    assert isinstance(get_backend(" docker "), DockerOmikujiBackend)
+
+    http = get_backend("http://localhost:5000/v1/projects/omikuji-ddc/")
+    assert isinstance(http, AnnifHTTPBackend)
+    assert http.project_url == "http://localhost:5000/v1/projects/omikuji-ddc"
+
+    path = write_table(tmp_path, {"Law": ["340"]})
+    monkeypatch.setenv("ANNIF_BACKEND", f"static:{path}")
+    assert isinstance(get_backend(), StaticSuggestionBackend)
+
+    with pytest.raises(ValueError):
+        get_backend("ftp://annif")
+
+
+def test_static_backend_from_file(tmp_path):
+    backend = StaticSuggestionBackend.from_file(write_table(tmp_path, {
+        "Constitutional law": [["342", 0.9], ["340", 0.4]],
+        "Library science": ["020", "025"],
+    }))
+
+    assert backend.suggest("  constitutional LAW ") == [Suggestion("342", "", 0.9), Suggestion("340", "", 0.4)]
+    assert backend.suggest("Library science", limit=1) == [Suggestion("020", "", 1.0)]
+    assert backend.suggest("Library science")[1].score == 0.5
+    assert backend.suggest("unknown") == []
+    assert not backend.batches_natively
+
+
+def test_top2_notations_pads_and_rejects_empty():
+    assert top2_notations([Suggestion("342"), Suggestion("340"), Suggestion("341")]) == ["342", "340"]
+    assert top2_notations([Suggestion("342")]) == ["342", "000"]
+    with pytest.raises(RuntimeError):
+        top2_notations([])
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, timeout=None, json=None, **kwargs):
+        self.posts.append((url, json))
+        # Answer out of order, with scores ascending, to check reordering
+        return FakeResponse([
+            {"document_id": doc["document_id"], "results": [
+                {"notation": "340", "label": "Law", "score": 0.2},
+                {"uri": f"http://dewey.info/class/{doc['text']}/", "score": 0.9},
+            ]}
+            for doc in reversed(json["documents"])
+        ])
+
+    def close(self):
+        pass
+
+
+def test_http_suggest_batch_chunks_and_keeps_input_order():
+    pytest.importorskip("requests")
+    backend = AnnifHTTPBackend("http://annif/v1/projects/ddc")
+    backend.session = FakeSession()
+    texts = [str(100 + i) for i in range(ANNIF_BATCH_LIMIT + 3)]
+
+    results = backend.suggest_batch(texts, limit=2)
+
+    assert [len(documents["documents"]) for _, documents in backend.session.posts] == [ANNIF_BATCH_LIMIT, 3]
+    assert backend.session.posts[0][0] == "http://annif/v1/projects/ddc/suggest-batch?limit=2"
+    assert [suggestions[0].notation for suggestions in results] == texts
+    assert results[0][1] == Suggestion("340", "Law", 0.2)
+    assert backend.batches_natively
+
+
+def test_http_failure_is_a_runtime_error():
+    requests = pytest.importorskip("requests")
+    backend = AnnifHTTPBackend("http://annif/v1/projects/ddc")
+
+    def refuse(*args, **kwargs):
+        raise requests.ConnectionError("refused")
+
+    backend.session.post = refuse
+    with pytest.raises(RuntimeError, match="refused"):
+        backend.suggest("Law")
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+from detective_systemv3.token_index import SourceTokenIndex, TokenIndex, tokenize
+
+
+def doc(heading, description=""):
+    return SimpleNamespace(ddc_number="000", heading=heading, description=description)
+
+
+DOCS = [doc(f"library science topic {i}", "collections and catalogs") for i in range(40)] + [
+    doc("Information management", "records"),
+    doc("Constitutional law", "United States"),
+    doc("Dictionaries of library science", None),
+]
+
+
+def test_tokenize_drops_stopwords_and_short_tokens():
+    assert tokenize("The law of the U.S.") == ["law"]
+    assert tokenize(None) == []
+
+
+def test_candidates_are_limited_when_the_index_matches_enough():
+    index = TokenIndex.build(DOCS)
+    positions = index.candidates(["library"], limit=10, min_candidates=5)
+    assert len(positions) == 10
+    assert all("library" in DOCS[pos].heading.lower() for pos in positions)
+
+
+def test_inflections_match_through_trigrams():
+    index = TokenIndex.build(DOCS)
+    assert 42 in index.candidates(["dictionary"], min_candidates=0)
+
+
+def test_too_few_matches_fall_back_to_a_full_scan():
+    index = TokenIndex.build(DOCS)
+    # "info" shares no token and too few trigrams with "information"
+    assert index.candidates(["info"], min_candidates=0) == []
+    positions = index.candidates(["info"])
+    assert sorted(positions) == list(range(len(DOCS)))
+
+    # Indexed matches come first, then the rest of the source
+    positions = index.candidates(["constitutional"])
+    assert positions[0] == 41 and len(positions) == len(DOCS)
+
+
+def test_source_index_passes_the_threshold_through():
+    index = SourceTokenIndex.build({"Sch2": DOCS})
+    assert len(index.candidates("Sch2", ["info"])) == len(DOCS)
+    assert index.candidates("T1", ["info"]) == []
+
+
+def test_recall_against_full_scan_fuzzy_scoring():
+    fuzz = pytest.importorskip("rapidfuzz.fuzz")
+
+    def score(d, keywords):
+        return max(max(fuzz.partial_ratio(kw, (d.heading or "").lower()),
+                       0.5 * fuzz.partial_ratio(kw, (d.description or "").lower())) for kw in keywords)
+
+    index = TokenIndex.build(DOCS)
+    for keywords in (["library"], ["info"], ["constitution"], ["dictionaries", "science"], ["records"]):
+        full = sorted(range(len(DOCS)), key=lambda pos: -score(DOCS[pos], keywords))
+        tenth = score(DOCS[full[9]], keywords)
+        positions = index.candidates(keywords, limit=20)
+        assert sum(score(DOCS[pos], keywords) >= tenth for pos in positions) >= 10, keywords
+
+
+def test_flat_buffers_answer_like_the_built_index():
+    built = SourceTokenIndex.build({"Sch2": DOCS, "T1": [doc("Dictionaries", "encyclopedias")], "T2": []})
+    header, buffers = built.to_buffers()
+    attached = SourceTokenIndex.from_buffers(header, {name: memoryview(buf) for name, buf in buffers.items()})
+
+    for keywords in (["library"], ["dictionary"], ["constitutional", "records"], ["info"], ["zzz"]):
+        for source in ("Sch2", "T1", "T2"):
+            assert attached.candidates(source, keywords, limit=10) == built.candidates(source, keywords, limit=10)
+    sch2 = attached.indexes["Sch2"]
+    assert sch2.expand_token("libraries") == built.indexes["Sch2"].expand_token("libraries")
+    assert "library" in sch2.heading_postings and "records" not in sch2.heading_postings
+    assert list(sch2.desc_postings["records"]) == [40]
+    reexported = {name: bytes(buf) for name, buf in sch2.to_buffers()[1].items()}
+    assert reexported == {name[len("Sch2/"):]: buf for name, buf in buffers.items() if name.startswith("Sch2/")}
@@ -0,0 +1,319 @@
+"""
+Inverted token index for narrowing fuzzy matching.
+
+`heading_fuzzy` and `desc_fuzzy` run RapidFuzz over every document of each
+requested source: O(docs x keywords) per request. This index maps
+tokens -> posting lists of document positions (per source, heading and
+description separately) plus character trigrams -> vocabulary tokens for typo
+and inflection tolerance ("library" ~ "libraries"). A request's keywords are
+resolved to a few hundred candidate documents, and RapidFuzz only scores those.
+
+Build once at load time:
+    index = SourceTokenIndex.build(all_sources)
+    positions = index.candidates("Sch2", ["library", "dictionaries"], limit=300)
+    docs = [all_sources["Sch2"][i] for i in positions]
+
+to_buffers() / from_buffers() flatten an index into a few arrays (vocabulary
+arena, u64 offsets, u32 postings; see doc_store), so a shared_corpus bundle
+can carry it and workers attach without rebuilding or unpickling it.
+"""
+import re
+import math
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Iterable, Mapping, Optional, Sequence, Set, Tuple
+
+from .retrieval.schemas import DDCDoc
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into",
+    "is", "it", "its", "of", "on", "or", "see", "the", "to", "with", "also",
+})
+
+HEADING_BOOST = 2.0
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase alphanumeric tokens, without stopwords and 1-char tokens.
+    """
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def trigrams(token: str) -> Set[str]:
+    """
+    Character trigrams of a token, padded so short tokens still get some.
+    """
+    padded = f"^{token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _join(words: Sequence[str]) -> bytes:
+    # Tokens and trigrams never contain "\n"
+    return "\n".join(words).encode("utf-8")
+
+
+def _split(buffer: Any) -> List[str]:
+    data = bytes(buffer)
+    return data.decode("utf-8").split("\n") if data else []
+
+
+def _flatten(lists: Iterable[Iterable[int]]) -> Tuple[bytes, bytes]:
+    """
+    (u64 end offsets starting with 0, u32 values) of a list of int lists.
+    """
+    offsets = array("Q", [0])
+    values = array("I")
+    for items in lists:
+        values.extend(items)
+        offsets.append(len(values))
+    return offsets.tobytes(), values.tobytes()
+
+
+class _FlatPostings(Mapping):
+    """
+    Read-only key -> list mapping over flattened lists; keys whose list is
+    empty are absent, like in the dicts TokenIndex.build() produces.
+    """
+
+    def __init__(self, ids: Dict[str, int], offsets: Any, values: Any, labels: Optional[List[str]] = None):
+        self._ids = ids
+        self._offsets = memoryview(offsets).cast("B").cast("Q")
+        self._values = memoryview(values).cast("B").cast("I")
+        self._labels = labels
+
+    def __getitem__(self, key: str):
+        i = self._ids[key]
+        start, stop = self._offsets[i], self._offsets[i + 1]
+        if start == stop:
+            raise KeyError(key)
+        values = self._values[start:stop]
+        if self._labels is not None:
+            return [self._labels[v] for v in values]
+        return values
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, i in self._ids.items() if self._offsets[i] != self._offsets[i + 1])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _FlatColumn(Mapping):
+    """
+    Read-only key -> u32 mapping over one flat column.
+    """
+
+    def __init__(self, ids: Dict[str, int], values: Any):
+        self._ids = ids
+        self._values = memoryview(values).cast("B").cast("I")
+
+    def __getitem__(self, key: str) -> int:
+        return self._values[self._ids[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class TokenIndex:
+    """
+    Inverted index over the documents of one source.
+
+    Attributes:
+        heading_postings: token -> sorted doc positions with the token in the heading
+        desc_postings: token -> sorted doc positions with the token in the description
+        gram_vocab: trigram -> vocabulary tokens containing it
+    """
+
+    def __init__(self, doc_count: int):
+        self.doc_count = doc_count
+        self.heading_postings: Dict[str, List[int]] = defaultdict(list)
+        self.desc_postings: Dict[str, List[int]] = defaultdict(list)
+        self.gram_vocab: Dict[str, List[str]] = defaultdict(list)
+        self._gram_counts: Dict[str, int] = {}
+        # Set by from_buffers(): the flat columns backing the mappings above
+        self._header: Optional[Dict[str, Any]] = None
+        self._buffers: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def build(cls, docs: Sequence[DDCDoc]) -> "TokenIndex":
+        """
+        Index headings and descriptions of a source's documents.
+        """
+        index = cls(len(docs))
+        for pos, doc in enumerate(docs):
+            for token in set(tokenize(doc.heading)):
+                index.heading_postings[token].append(pos)
+            for token in set(tokenize(doc.description)):
+                index.desc_postings[token].append(pos)
+
+        for token in set(index.heading_postings) | set(index.desc_postings):
+            grams = trigrams(token)
+            index._gram_counts[token] = len(grams)
+            for gram in grams:
+                index.gram_vocab[gram].append(token)
+
+        # Freeze into plain dicts so lookups of unknown keys do not insert
+        index.heading_postings = dict(index.heading_postings)
+        index.desc_postings = dict(index.desc_postings)
+        index.gram_vocab = dict(index.gram_vocab)
+        return index
+
+    def to_buffers(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        (header, column name -> bytes-like) for persisting or sharing the index.
+        """
+        if self._buffers is not None:
+            return dict(self._header), dict(self._buffers)
+        vocab = sorted(set(self.heading_postings) | set(self.desc_postings))
+        token_ids = {token: i for i, token in enumerate(vocab)}
+        grams = sorted(self.gram_vocab)
+
+        buffers = {"vocab": _join(vocab), "grams": _join(grams)}
+        for name, postings in (("heading", self.heading_postings), ("desc", self.desc_postings)):
+            buffers[f"{name}.offsets"], buffers[f"{name}.positions"] = _flatten(postings.get(token, ()) for token in vocab)
+        buffers["grams.offsets"], buffers["grams.tokens"] = _flatten(
+            (token_ids[token] for token in self.gram_vocab[gram]) for gram in grams
+        )
+        buffers["gram_counts"] = array("I", (self._gram_counts[token] for token in vocab)).tobytes()
+        return {"doc_count": self.doc_count}, buffers
+
+    @classmethod
+    def from_buffers(cls, header: Dict[str, Any], buffers: Mapping[str, Any]) -> "TokenIndex":
+        """
+        Attach to buffers produced by to_buffers() (bytes, mmap slices, shared memory).
+        """
+        index = cls(header["doc_count"])
+        vocab = _split(buffers["vocab"])
+        token_ids = {token: i for i, token in enumerate(vocab)}
+        gram_ids = {gram: i for i, gram in enumerate(_split(buffers["grams"]))}
+        index.heading_postings = _FlatPostings(token_ids, buffers["heading.offsets"], buffers["heading.positions"])
+        index.desc_postings = _FlatPostings(token_ids, buffers["desc.offsets"], buffers["desc.positions"])
+        index.gram_vocab = _FlatPostings(gram_ids, buffers["grams.offsets"], buffers["grams.tokens"], labels=vocab)
+        index._gram_counts = _FlatColumn(token_ids, buffers["gram_counts"])
+        index._header, index._buffers = dict(header), dict(buffers)
+        return index
+
+    def expand_token(self, token: str, min_similarity: float = 0.5, max_expansions: int = 8) -> List[str]:
+        """
+        Vocabulary tokens similar to `token` by trigram Dice coefficient.
+
+        The token itself comes first when it is in the vocabulary.
+        """
+        grams = trigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self.gram_vocab.get(gram, ()):
+                shared[candidate] += 1
+
+        scored = []
+        for candidate, overlap in shared.items():
+            dice = 2.0 * overlap / (len(grams) + self._gram_counts[candidate])
+            if dice >= min_similarity:
+                scored.append((dice, candidate))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [candidate for _, candidate in scored[:max_expansions]]
+
+    def _idf(self, postings: List[int]) -> float:
+        return math.log(1.0 + self.doc_count / (1.0 + len(postings)))
+
+    def candidates(
+        self,
+        keywords: Iterable[str],
+        limit: int = 300,
+        min_similarity: float = 0.5,
+        min_candidates: int = 20
+    ) -> List[int]:
+        """
+        Rank documents by weighted token overlap with the keywords.
+
+        Fuzzy scoring also matches substrings and prefixes that share no token
+        or trigram neighbour with any keyword, so when the index finds fewer
+        than `min_candidates` documents every position is returned (indexed
+        matches first) and the caller scans the whole source as before.
+
+        Args:
+            keywords: request keywords (phrases are split into tokens)
+            limit: maximum candidates returned when the index is used
+            min_similarity: trigram Dice threshold for typo/inflection matches
+            min_candidates: below this many matches, fall back to a full scan
+
+        Returns:
+            Document positions, best first (at most `limit`, or all on fallback)
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for token in {t for keyword in keywords for t in tokenize(keyword)}:
+            for variant in self.expand_token(token, min_similarity):
+                closeness = 1.0 if variant == token else 0.7
+                postings = self.heading_postings.get(variant)
+                if postings:
+                    weight = HEADING_BOOST * closeness * self._idf(postings)
+                    for pos in postings:
+                        scores[pos] += weight
+                postings = self.desc_postings.get(variant)
+                if postings:
+                    weight = closeness * self._idf(postings)
+                    for pos in postings:
+                        scores[pos] += weight
+
+        if len(scores) < min(min_candidates, self.doc_count):
+            matched = sorted(scores, key=lambda pos: (-scores[pos], pos))
+            return matched + [pos for pos in range(self.doc_count) if pos not in scores]
+        if len(scores) <= limit:
+            return sorted(scores, key=lambda pos: (-scores[pos], pos))
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return [pos for pos, _ in ranked[:limit]]
+
+
+class SourceTokenIndex:
+    """
+    One TokenIndex per source, built from the output of load_all_sources.
+    """
+
+    def __init__(self, indexes: Dict[str, TokenIndex]):
+        self.indexes = indexes
+
+    @classmethod
+    def build(cls, all_sources: Dict[str, Sequence[DDCDoc]]) -> "SourceTokenIndex":
+        return cls({source: TokenIndex.build(docs) for source, docs in all_sources.items()})
+
+    def to_buffers(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        (header, "<source>/<column>" -> bytes-like) of every per-source index.
+        """
+        header: Dict[str, Any] = {"sources": {}}
+        buffers: Dict[str, Any] = {}
+        for source, index in self.indexes.items():
+            header["sources"][source], columns = index.to_buffers()
+            buffers.update({f"{source}/{name}": buf for name, buf in columns.items()})
+        return header, buffers
+
+    @classmethod
+    def from_buffers(cls, header: Dict[str, Any], buffers: Mapping[str, Any]) -> "SourceTokenIndex":
+        """
+        Attach to buffers produced by to_buffers().
+        """
+        indexes = {}
+        for source, index_header in header["sources"].items():
+            prefix = f"{source}/"
+            columns = {name[len(prefix):]: buf for name, buf in buffers.items() if name.startswith(prefix)}
+            indexes[source] = TokenIndex.from_buffers(index_header, columns)
+        return cls(indexes)
+
+    def candidates(self, source: str, keywords: Iterable[str], limit: int = 300, min_candidates: int = 20) -> List[int]:
+        """
+        Candidate document positions in `source` for fuzzy scoring (all of
+        them when the index finds fewer than min_candidates).
+        """
+        index = self.indexes.get(source)
+        if index is None:
+            return []
+        return index.candidates(keywords, limit, min_candidates=min_candidates)
@@ -0,0 +1,125 @@
+"""
+Lightweight span tracing with Chrome trace export.
+
+A Tracer records named spans (start, duration, thread, args) from any
+thread. The orchestrator wraps each pipeline stage (Annif fetch, Analyzer
+planning/synthesis, LLM calls with time-to-first-token, Querier requests,
+memory integration) so a classification's time can be attributed:
+
+    tracer = Tracer()
+    with tracer.span("annif.suggest", cat="annif"):
+        ...
+    result = classify_subject(..., tracer=tracer)
+    tracer.save("trace.json")    # open in chrome://tracing or https://ui.perfetto.dev
+
+summary() aggregates spans by name (count, total/mean/max ms) and is what
+ends up in result["metadata"]["trace_summary"].
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+
+class Tracer:
+    """
+    Thread-safe span recorder.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        """
+        perf_counter() timestamp, for add_span() of externally timed work.
+        """
+        return time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "", **args):
+        """
+        Time the enclosed block; `args` (and keys added to the yielded dict)
+        are attached to the span.
+        """
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add_span(name, start, time.perf_counter() - start, cat, args)
+
+    def add_span(self, name: str, start: float, duration: float, cat: str = "", args: Optional[Dict[str, Any]] = None):
+        """
+        Record a span timed elsewhere (start is a perf_counter() value).
+        """
+        with self._lock:
+            self._spans.append({
+                "name": name,
+                "cat": cat,
+                "start": start - self._origin,
+                "duration": duration,
+                "tid": threading.get_ident(),
+                "args": dict(args or {}),
+            })
+
+    def clear(self):
+        with self._lock:
+            self._spans = []
+            self._origin = time.perf_counter()
+
+    @property
+    def spans(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._spans)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per span name: count, total_ms, mean_ms, max_ms (slowest total first).
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            ms = span["duration"] * 1000
+            entry = totals.setdefault(span["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+
+        return {
+            name: {
+                "count": e["count"],
+                "total_ms": round(e["total_ms"], 3),
+                "mean_ms": round(e["total_ms"] / e["count"], 3),
+                "max_ms": round(e["max_ms"], 3),
+            }
+            for name, e in sorted(totals.items(), key=lambda x: x[1]["total_ms"], reverse=True)
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Chrome trace-event JSON (complete "X" events, microseconds).
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": span["name"],
+                "cat": span["cat"] or "default",
+                "ph": "X",
+                "ts": round(span["start"] * 1e6, 1),
+                "dur": round(span["duration"] * 1e6, 1),
+                "pid": pid,
+                "tid": span["tid"],
+                "args": span["args"],
+            }
+            for span in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str):
+        """
+        Write the Chrome trace JSON to path.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)